@@ -0,0 +1,304 @@
+"""
+Offline load benchmark of the tick pipeline (no Binance connection).
+
+    python -m app.bench --symbols 10,100,1000 --ticks 200
+    python -m app.bench --baseline              # vs the committed backend/bench_baseline.json
+    python -m app.bench --replay ticks.jsonl --baseline other_baseline.json
+    python -m app.bench --save-baseline          # refresh the committed baseline
+    python -m app.bench --indicators
+    python -m app.bench --bus-workers 1,2,4
+    python -m app.bench --protocol
+
+Feeds a seeded random walk (or a TickRecorder file) through the same
+compute_tick() the producer runs and reports ticks/sec, mean latency per
+pipeline stage and peak traced memory for each universe size. With
+--baseline it exits non-zero when throughput drops or memory grows by more
+than --tolerance against the stored numbers. Numbers are machine specific:
+refresh the committed baseline on the machine that runs the check. --indicators times one
+symbol's per-tick indicator update: IndicatorState vs a pandas recompute of
+the window. --bus-workers measures client deliveries per second through the
+snapshot bus for each number of reader processes (TRADING_ROLE=api workers).
+--protocol compares bytes per tick and serialization time of the v1
+per-symbol JSON messages and the v2 delta frames in each encoding.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault("TICK_STORE_DIR", "")
+os.environ.setdefault("STRATEGY_TIMEFRAME", "tick")
+os.environ.setdefault("TRADING_SEED", "0")
+
+from app import main
+from app.engine.binance_client import BinanceManager
+from app.engine.indicators import IndicatorState
+from app.engine.protocol import ENCODINGS, DeltaEncoder
+from app.engine.replay import load_recording
+from app.engine.snapshot_bus import SnapshotPublisher, SnapshotSubscriber, _dumps
+
+# Default --baseline / --save-baseline file, kept in the repo
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench_baseline.json")
+
+
+def synthetic_snapshots(n_symbols, n_ticks, seed=0):
+    rng = random.Random(seed)
+    symbols = [f"BENCH{n_symbols}X{i}USDT" for i in range(n_symbols)]
+    prices = [rng.uniform(0.5, 500) for _ in symbols]
+    snapshots = []
+    for _ in range(n_ticks):
+        prices = [p * (1 + rng.gauss(0, 0.001)) for p in prices]
+        snapshots.append([BinanceManager.format_ticker(s, p) for s, p in zip(symbols, prices)])
+    return snapshots
+
+
+def replay_snapshots(path, n_symbols, n_ticks):
+    """n_ticks snapshots from a recording (looped when it is shorter)."""
+    snapshots = [tickers[:n_symbols] for _, tickers in load_recording(path) if tickers]
+    if not snapshots:
+        raise ValueError(f"Recording {path} has no tickers")
+    while len(snapshots) < n_ticks:
+        snapshots.extend(snapshots)
+    return snapshots[:n_ticks]
+
+
+def stage_totals():
+    return {key[0]: (sum(series[:-1]), series[-1]) for key, series in main.STAGE_SECONDS.series.items()}
+
+
+def run_case(snapshots, warmup=60, repeats=5):
+    """Best of `repeats` passes over the measured ticks (stage means cover all passes)."""
+    for snapshot in snapshots[:warmup]:
+        main.compute_tick(snapshot)
+    measured = snapshots[warmup:]
+
+    before = stage_totals()
+    elapsed = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for snapshot in measured:
+            main.compute_tick(snapshot)
+        took = time.perf_counter() - started
+        elapsed = took if elapsed is None else min(elapsed, took)
+    after = stage_totals()
+
+    stages = {}
+    for stage, (count, total) in after.items():
+        count -= before.get(stage, (0, 0.0))[0]
+        total -= before.get(stage, (0, 0.0))[1]
+        if count:
+            stages[stage] = round(total / count * 1000, 4)  # mean ms
+
+    tracemalloc.start()
+    for snapshot in measured[:20]:
+        main.compute_tick(snapshot)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "ticks_per_sec": round(len(measured) / elapsed, 2),
+        "stage_ms": stages,
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def indicator_microbench(window=50, n_ticks=2000, seed=0):
+    """Mean microseconds per tick for the incremental state and the pandas recompute."""
+    rng = np.random.default_rng(seed)
+    closes = (100 * np.exp(np.cumsum(rng.normal(0, 0.002, n_ticks)))).tolist()
+    state = IndicatorState(window_size=window)
+    for close in closes[:window]:
+        state.update(close)  # fills the window
+    started = time.perf_counter()
+    for close in closes[window:]:
+        state.update(close)
+    incremental = (time.perf_counter() - started) / (n_ticks - window) * 1e6
+
+    strategy = main.strategy_eng
+    sample = closes[-200:]
+    started = time.perf_counter()
+    for t in range(len(sample)):
+        window_closes = np.array(closes[n_ticks - 200 + t - window + 1:n_ticks - 200 + t + 1])
+        strategy.calculate_indicators(pd.DataFrame({"close": window_closes, "high": window_closes, "low": window_closes}))
+    recompute = (time.perf_counter() - started) / len(sample) * 1e6
+    return {"window": window, "incremental_us": round(incremental, 2), "pandas_recompute_us": round(recompute, 2)}
+
+
+def _bus_worker(name, clients, seconds, results):
+    """One API worker: every new bus message is serialized once per client it serves."""
+    subscriber = SnapshotSubscriber(name)
+    seen = torn = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            message = subscriber.poll()
+        except FileNotFoundError:
+            continue
+        if message is None:
+            time.sleep(0.0005)
+            continue
+        seen += 1
+        if len({payload["seq"] for payload in message.values()}) != 1:
+            torn += 1
+        for _ in range(clients):
+            _dumps(message)
+    subscriber.close()
+    results.put({"seen": seen, "torn": torn, "delivered": seen * clients})
+
+
+def _bus_publisher(name, n_symbols, rate, stop, results):
+    """The ingest process: publishes an n_symbols tick `rate` times per second until stopped."""
+    publisher = SnapshotPublisher(name, size=1024 * 1024)
+    published = 0
+    try:
+        while not stop.is_set():
+            publisher.publish({f"BUS{i}USDT": {"seq": published, "price": 100.0 + i} for i in range(n_symbols)})
+            published += 1
+            time.sleep(1 / rate)
+    finally:
+        publisher.close()
+    results.put(published)
+
+
+def bus_throughput(workers=1, clients=100, seconds=2.0, n_symbols=100, rate=500):
+    """
+    Client deliveries per second through the snapshot bus with `workers`
+    reader processes fanning every message out to `clients` each. Publisher
+    and readers are separate processes, as in a TRADING_ROLE=ingest/api
+    deployment (this process never maps the segment itself).
+    """
+    name = f"bench_bus_{os.getpid()}_{workers}"
+    stop = multiprocessing.Event()
+    published, results = multiprocessing.Queue(), multiprocessing.Queue()
+    writer = multiprocessing.Process(target=_bus_publisher, args=(name, n_symbols, rate, stop, published))
+    readers = [multiprocessing.Process(target=_bus_worker, args=(name, clients, seconds, results)) for _ in range(workers)]
+    writer.start()
+    for reader in readers:
+        reader.start()
+    stats = [results.get(timeout=seconds + 30) for _ in readers]
+    stop.set()
+    total = published.get(timeout=30)
+    for process in [writer] + readers:
+        process.join()
+    return {
+        "workers": workers,
+        "clients_per_worker": clients,
+        "published": total,
+        "deliveries_per_sec": round(sum(s["delivered"] for s in stats) / seconds, 1),
+        "min_seen": min(s["seen"] for s in stats),
+        "torn_reads": sum(s["torn"] for s in stats),
+    }
+
+
+def protocol_ticks(n_symbols=100, n_ticks=120, moving=0.3, seed=0):
+    """Dashboard-shaped ticks where a `moving` share of prices changes per tick."""
+    rng = random.Random(seed)
+    prices = {f"PROTO{i}USDT": rng.uniform(0.5, 500) for i in range(n_symbols)}
+    prediction = {"signal": "HOLD", "confidence_score": 55.0, "reason": "Consolidation zone.", "setup": "RAPID X Neural Terminal V3.0"}
+    ticks = []
+    for n in range(n_ticks):
+        tick = {}
+        for symbol in prices:
+            if rng.random() < moving:
+                prices[symbol] *= 1 + rng.gauss(0, 0.001)
+            price = prices[symbol]
+            tick[symbol] = {
+                "symbol": symbol, "current_price": price, "bid": price * 0.9999, "ask": price * 1.0001,
+                "trend": "SIDEWAYS", "ai_prediction": prediction, "rsi": 50.0,
+                "timestamp": f"2026-01-01T00:00:{n:02d}",
+            }
+        ticks.append(tick)
+    return ticks
+
+
+def protocol_bench(n_symbols=100, n_ticks=120):
+    """Mean bytes and serialization ms per tick: v1 (json per symbol) vs v2 frames."""
+    ticks = protocol_ticks(n_symbols, n_ticks)
+    results = {}
+    started = time.perf_counter()
+    total = sum(len(json.dumps(payload)) for tick in ticks for payload in tick.values())
+    results["v1_json"] = {"bytes": round(total / n_ticks), "ms": round((time.perf_counter() - started) / n_ticks * 1000, 3)}
+    for encoding in ENCODINGS:
+        encoder = DeltaEncoder(encoding)
+        started = time.perf_counter()
+        total = 0
+        for tick in ticks:
+            frame = encoder.build_frame(tick)
+            if frame is not None:
+                total += len(encoder.encode(frame)[0])
+        results[f"v2_{encoder.encoding}"] = {"bytes": round(total / n_ticks), "ms": round((time.perf_counter() - started) / n_ticks * 1000, 3)}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    failures = []
+    for size, result in results.items():
+        base = baseline.get(size)
+        if not base:
+            continue
+        if result["ticks_per_sec"] < base["ticks_per_sec"] * (1 - tolerance):
+            failures.append(f"{size} symbols: {result['ticks_per_sec']} ticks/s vs baseline {base['ticks_per_sec']}")
+        if result["peak_memory_kb"] > base["peak_memory_kb"] * (1 + tolerance):
+            failures.append(f"{size} symbols: {result['peak_memory_kb']}KB peak vs baseline {base['peak_memory_kb']}KB")
+    return failures
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Tick pipeline benchmark")
+    parser.add_argument("--symbols", default="10,100,1000", help="comma separated universe sizes")
+    parser.add_argument("--ticks", type=int, default=200, help="measured ticks per size")
+    parser.add_argument("--replay", help="TickRecorder file to use instead of a random walk")
+    parser.add_argument("--baseline", nargs="?", const=BASELINE_PATH, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", nargs="?", const=BASELINE_PATH, help="write the results as a new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--indicators", action="store_true", help="only run the indicator update microbenchmark")
+    parser.add_argument("--bus-workers", help="only run the snapshot bus fan-out for these worker counts (e.g. 1,2,4)")
+    parser.add_argument("--protocol", action="store_true", help="only compare the v1 and v2 WebSocket payloads")
+    args = parser.parse_args()
+
+    if args.indicators:
+        for window in (50, 200):
+            print(json.dumps(indicator_microbench(window)))
+        return 0
+    if args.protocol:
+        for name, result in protocol_bench().items():
+            print(f"{name:>12}: {json.dumps(result)}")
+        return 0
+    if args.bus_workers:
+        print(f"cpus: {os.cpu_count()}")
+        for workers in [int(w) for w in args.bus_workers.split(",")]:
+            print(json.dumps(bus_throughput(workers)))
+        return 0
+
+    results = {}
+    for size in [int(s) for s in args.symbols.split(",")]:
+        n_ticks = args.ticks + 60
+        if args.replay:
+            snapshots = replay_snapshots(args.replay, size, n_ticks)
+        else:
+            snapshots = synthetic_snapshots(size, n_ticks)
+        results[str(size)] = run_case(snapshots)
+        print(f"{size:>5} symbols: {json.dumps(results[str(size)])}")
+
+    if args.save_baseline:
+        meta = {"cpus": os.cpu_count(), "python": sys.version.split()[0], "ticks": args.ticks, "replay": args.replay}
+        with open(args.save_baseline, "w") as f:
+            json.dump(dict(results, _meta=meta), f, indent=2)
+            f.write("\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(results, json.load(f), args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION: {failure}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
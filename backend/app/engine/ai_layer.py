@@ -1,14 +1,69 @@
+import asyncio
+import json
 import os
+import time
+from collections import OrderedDict
 import openai
 from dotenv import load_dotenv
+from app.engine.metrics import REGISTRY
+from app.engine.rate_limit import TokenBucket
 
 load_dotenv()
 
+DECISIONS = REGISTRY.counter("ai_decisions_total", "AI decisions by source", ("source",))
+DECISION_SECONDS = REGISTRY.histogram("ai_decision_seconds", "Time to answer one decision request", ("source",))
+MODEL_SECONDS = REGISTRY.histogram("ai_model_seconds", "Latency of one batched model call")
+MODEL_CALLS = REGISTRY.counter("ai_model_calls_total", "Batched model calls", ("status",))
+MODEL_TOKENS = REGISTRY.counter("ai_model_tokens_total", "Tokens reported by the model endpoint", ("kind",))
+DECISION_LABELS = ("BUY", "SELL", "HOLD")
+# Quantization step for RSI in the cache key / model context
+RSI_STEP = 5.0
+
+SYSTEM_PROMPT = (
+    "You are a crypto trading assistant. For every market state in the user message return "
+    'a JSON object {"decisions": [{"id": <id>, "decision": "BUY"|"SELL"|"HOLD", '
+    '"reason": <one sentence>, "confidence": <0-100>}]} with one entry per id.'
+)
+
+
 class AIDecisionLayer:
-    def __init__(self):
-        self.api_key = os.getenv("OPENAI_API_KEY")
-        if self.api_key:
-            openai.api_key = self.api_key
+    """
+    BUY/SELL/HOLD decisions with optional model-backed reasoning.
+    get_decision() is the synchronous rule engine. decide() is the async
+    service: decisions are cached on quantized indicator state (TTL + LRU),
+    misses wait in a queue that a batcher sends as one chat completion per
+    `batch_size` states to an OpenAI-compatible endpoint (OPENAI_BASE_URL),
+    with at most `max_concurrency` calls in flight and a tokens-per-minute
+    budget. Timeouts, errors and an exhausted budget fall back to the rules.
+    """
+
+    def __init__(self, api_key=None, base_url=None, model=None, batch_size=20, max_wait=0.05,
+                 max_concurrency=2, tokens_per_minute=60_000, tokens_per_decision=60,
+                 cache_size=4096, cache_ttl=60.0, timeout=3.0, max_pending=1000):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self.model = model or os.getenv("AI_MODEL", "gpt-4o-mini")
+        # A base URL alone is enough: local/stub servers usually don't check keys
+        self.enabled = bool(self.api_key or self.base_url)
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.max_concurrency = max_concurrency
+        self.tokens_per_decision = tokens_per_decision
+        self.budget = TokenBucket(tokens_per_minute / 60, tokens_per_minute)
+        self.cache = OrderedDict()  # {state key: (expires_at, decision)}, least recently used first
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.pending = OrderedDict()  # {state key: (market_data, future, queued_at)} waiting for a batch
+        self.latest = {}  # {symbol: last decision from schedule()}
+        self.hits = 0
+        self.misses = 0
+        self.client = None
+        self._wakeup = None
+        self._slots = None
+        self._batcher = None
+        self._tasks = set()
 
     def get_decision(self, market_data):
         """
@@ -17,23 +72,261 @@ class AIDecisionLayer:
         """
         trend = market_data.get("trend")
         rsi = market_data.get("rsi")
-        ema_cross = market_data.get("ema_9") > market_data.get("ema_21")
-        
+        ema_9, ema_21 = market_data.get("ema_9"), market_data.get("ema_21")
+        if rsi is None or ema_9 is None or ema_21 is None:
+            return {"decision": "HOLD", "reason": "Not enough indicator data for a signal yet.", "confidence": 50}
+        ema_cross = ema_9 > ema_21
+
         # Rule-based fallback or primary logic
         decision = "HOLD"
         reason = "Market is currently stable with no strong directional signals."
-        
+
         if trend == "BULLISH" and rsi < 70 and ema_cross:
             decision = "BUY"
             reason = f"Trend is Bullish with EMA 9/21 cross-up confirmation and RSI at {rsi:.2f} (not overbought)."
         elif trend == "BEARISH" and rsi > 30 and not ema_cross:
             decision = "SELL"
             reason = f"Trend is Bearish with EMA 9/21 cross-down and RSI at {rsi:.2f} (not oversold)."
-        
-        # If OpenAI is available, we could enhance the 'reason' or the 'decision'
-        # For now, we return the structured logic
+
+        # Structured rule result; decide() uses it whenever the model can't answer in time
         return {
             "decision": decision,
             "reason": reason,
             "confidence": 85 if decision != "HOLD" else 50
         }
+
+    @staticmethod
+    def state_key(market_data):
+        """
+        Quantized indicator state: trend, RSI bucket, EMA 9/21 side and MACD histogram sign.
+        Raises ValueError when RSI or an EMA is missing or NaN.
+        """
+        rsi, ema_9, ema_21 = market_data.get("rsi"), market_data.get("ema_9"), market_data.get("ema_21")
+        if rsi is None or ema_9 is None or ema_21 is None:
+            raise ValueError("market_data needs rsi, ema_9 and ema_21")
+        macd_hist = market_data.get("macd_hist") or 0.0
+        return (
+            market_data.get("trend"),
+            int(rsi // RSI_STEP),  # ValueError for NaN
+            ema_9 > ema_21,
+            (macd_hist > 0) - (macd_hist < 0),
+        )
+
+    @staticmethod
+    def describe_state(key):
+        """What the model sees for a state key (so a cached answer fits every state with that key)."""
+        trend, rsi_bucket, ema_up, macd_sign = key
+        return {
+            "trend": trend,
+            "rsi": f"{rsi_bucket * RSI_STEP:.0f}-{(rsi_bucket + 1) * RSI_STEP:.0f}",
+            "ema_9_vs_21": "above" if ema_up else "below",
+            "macd_histogram": {1: "positive", -1: "negative"}.get(macd_sign, "flat"),
+        }
+
+    def _cache_get(self, key):
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self.cache[key]
+            return None
+        self.cache.move_to_end(key)
+        return entry[1]
+
+    def _cache_put(self, key, decision):
+        self.cache[key] = (time.monotonic() + self.cache_ttl, decision)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _enqueue(self, key, market_data):
+        """Future for a state's model decision; identical states share one queue entry."""
+        entry = self.pending.get(key)
+        if entry is not None:
+            # A new caller gives the entry a fresh timeout before the batcher drops it as stale
+            self.pending[key] = (entry[0], entry[1], time.monotonic())
+            return entry[1]
+        loop = asyncio.get_running_loop()
+        if self._batcher is None or self._batcher.done():
+            self._wakeup = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._batcher = loop.create_task(self._run())
+        future = loop.create_future()
+        if len(self.pending) >= self.max_pending:
+            future.set_exception(RuntimeError("AI decision queue is full"))
+        else:
+            self.pending[key] = (market_data, future, time.monotonic())
+            self._wakeup.set()
+        return future
+
+    async def decide(self, market_data):
+        """Cached, batched model decision for one market state; the rule engine on any failure."""
+        started = time.perf_counter()
+        try:
+            key = self.state_key(market_data)
+        except (TypeError, ValueError):
+            key = None  # incomplete indicators: nothing to cache or ask the model about
+        decision = None if key is None else self._cache_get(key)
+        if decision is not None:
+            self.hits += 1
+            source = "cache"
+        elif key is None or not self.enabled:
+            decision, source = self.get_decision(market_data), "rules"
+        else:
+            self.misses += 1
+            try:
+                # shield: a caller that gives up doesn't cancel the batch others are waiting on
+                decision = await asyncio.wait_for(asyncio.shield(self._enqueue(key, market_data)), self.timeout)
+                source = "model"
+            except Exception:
+                decision, source = self.get_decision(market_data), "fallback"
+        DECISIONS.inc(source=source)
+        DECISION_SECONDS.observe(time.perf_counter() - started, source=source)
+        return dict(decision, source=source)
+
+    async def decide_many(self, contexts):
+        """{symbol: market_data} -> {symbol: decision}; misses from one call share batches."""
+        symbols = list(contexts)
+        decisions = await asyncio.gather(*(self.decide(contexts[s]) for s in symbols))
+        return dict(zip(symbols, decisions))
+
+    def schedule(self, contexts):
+        """Refreshes `latest` for {symbol: market_data} in the background (producer side)."""
+        task = asyncio.get_running_loop().create_task(self.decide_many(contexts))
+        self._tasks.add(task)
+        task.add_done_callback(self._scheduled_done)
+        return task
+
+    def _scheduled_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is None:
+            self.latest.update(task.result())
+
+    async def _run(self):
+        """Batcher: drains the queue into model calls, at most max_concurrency at a time."""
+        while True:
+            await self._wakeup.wait()
+            if len(self.pending) < self.batch_size:
+                await asyncio.sleep(self.max_wait)  # let the rest of this tick's misses join
+            await self._slots.acquire()
+            batch = []
+            stale = time.monotonic() - self.timeout
+            while self.pending and len(batch) < self.batch_size:
+                key, (market_data, future, queued_at) = self.pending.popitem(last=False)
+                if queued_at < stale and not future.done():
+                    # Every caller already fell back; don't spend tokens on it
+                    future.set_exception(asyncio.TimeoutError())
+                    future.exception()
+                    continue
+                batch.append((key, market_data, future))
+            if not self.pending:
+                self._wakeup.clear()
+            if not batch:
+                self._slots.release()
+                continue
+            task = asyncio.get_running_loop().create_task(self._call(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._call_done)
+
+    def _call_done(self, task):
+        self._tasks.discard(task)
+        self._slots.release()
+
+    def _messages(self, batch):
+        states = [dict(self.describe_state(key), id=i) for i, (key, _, _) in enumerate(batch)]
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": json.dumps({"markets": states}, separators=(",", ":"))},
+        ]
+
+    def _client(self):
+        if self.client is None:
+            self.client = openai.AsyncOpenAI(
+                api_key=self.api_key or "none",
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=0,  # a late answer is worthless: the rules take over instead
+            )
+        return self.client
+
+    @staticmethod
+    def _fail(batch, error):
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+                future.exception()  # callers may have timed out and never retrieve it
+
+    async def _call(self, batch):
+        messages = self._messages(batch)
+        max_tokens = self.tokens_per_decision * len(batch)
+        # ~4 characters per prompt token
+        estimate = sum(len(m["content"]) for m in messages) // 4 + max_tokens
+        if not self.budget.try_acquire(estimate):
+            MODEL_CALLS.inc(status="budget")
+            print(f"DEBUG: AI token budget exhausted, {len(batch)} decisions fall back to rules")
+            self._fail(batch, RuntimeError("AI token budget exhausted"))
+            return
+        started = time.perf_counter()
+        try:
+            response = await self._client().chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"},
+            )
+            answers = json.loads(response.choices[0].message.content)["decisions"]
+        except Exception as e:
+            MODEL_CALLS.inc(status="error")
+            print(f"DEBUG: AI model call failed, {len(batch)} decisions fall back to rules: {e}")
+            self._fail(batch, e)
+            return
+        finally:
+            MODEL_SECONDS.observe(time.perf_counter() - started)
+        MODEL_CALLS.inc(status="ok")
+        if response.usage is not None:
+            MODEL_TOKENS.inc(response.usage.prompt_tokens, kind="prompt")
+            MODEL_TOKENS.inc(response.usage.completion_tokens, kind="completion")
+
+        by_id = {a.get("id"): a for a in answers if isinstance(a, dict)}
+        for i, (key, _, future) in enumerate(batch):
+            answer = by_id.get(i)
+            if answer is None or answer.get("decision") not in DECISION_LABELS:
+                self._fail([(key, None, future)], RuntimeError(f"No valid model decision for state {i}"))
+                continue
+            decision = {
+                "decision": answer["decision"],
+                "reason": str(answer.get("reason", "")),
+                "confidence": max(0.0, min(100.0, float(answer.get("confidence", 50)))),
+            }
+            self._cache_put(key, decision)
+            if not future.done():
+                future.set_result(decision)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "model": self.model,
+            "cache_size": len(self.cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+            "pending": len(self.pending),
+            "token_budget": self.budget.snapshot(),
+        }
+
+    async def close(self):
+        if self._batcher:
+            self._batcher.cancel()
+            self._batcher = None
+        for task in list(self._tasks):
+            task.cancel()
+        self._fail([(None, None, future) for _, future, _ in self.pending.values()], RuntimeError("AI decision layer closed"))
+        self.pending.clear()
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
@@ -0,0 +1,233 @@
+import bisect
+import os
+import numpy as np
+import pandas as pd
+from app.engine.batch_strategy import BatchStrategyEngine
+from app.engine.harmonics import scan_series
+from app.engine.indicators import IndicatorState
+from app.engine.risk_manager import RiskManager
+from app.engine.strategy import StrategyEngine
+
+# Column layout of Binance kline dumps (data.binance.vision) without a header
+KLINE_COLUMNS = [
+    "open_time", "open", "high", "low", "close", "volume",
+    "close_time", "quote_volume", "trades", "taker_buy_base", "taker_buy_quote", "ignore",
+]
+
+
+def load_klines(path):
+    """Loads klines from a CSV (with or without header) or Parquet file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".parquet", ".pq"):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+        if "close" not in df.columns:
+            df = pd.read_csv(path, header=None, names=KLINE_COLUMNS[:len(df.columns)])
+    for col in ("open", "high", "low", "close", "volume"):
+        if col in df.columns:
+            df[col] = df[col].astype(np.float64)
+    return df.reset_index(drop=True)
+
+
+class Backtester:
+    """
+    Event-driven backtest of StrategyEngine signals with RiskManager exits.
+
+    Long-only: enter on BUY, exit on RiskManager.evaluate_exit (dynamic stop
+    from get_dynamic_stop_loss, take profit at take_profit_distance) or on a
+    SELL signal. Fills happen at the bar close with slippage and fees.
+
+    mode="exact" walks bar by bar through IndicatorState and the scalar
+    StrategyEngine/RiskManager calls. mode="fast" computes indicators and
+    signals for the whole series at once and jumps from trade to trade with
+    vectorized exit searches. Both produce the same trades.
+
+    With harmonic_pct set, the bars are scanned once for XABCD patterns
+    (ZigZag of harmonic_pct %, see harmonics.scan_series): the result gets
+    the pattern list and every trade the pattern active at its entry (if
+    confirmed at most harmonic_ttl bars before), like the live scanner.
+    """
+
+    def __init__(self, strategy=None, risk_manager=None, initial_balance=10000.0,
+                 fee_rate=0.001, slippage=0.0005, warmup=26, exit_chunk=4096,
+                 harmonic_pct=None, harmonic_ttl=10):
+        self.strategy = strategy or StrategyEngine()
+        self.risk_manager = risk_manager or RiskManager()
+        self.batch = BatchStrategyEngine(self.strategy)
+        self.initial_balance = initial_balance
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.warmup = warmup
+        self.exit_chunk = exit_chunk
+        self.harmonic_pct = harmonic_pct
+        self.harmonic_ttl = harmonic_ttl
+
+    def run(self, bars: pd.DataFrame, mode="fast"):
+        if mode == "exact":
+            trades = self._run_exact(bars)
+        elif mode == "fast":
+            trades = self._run_fast(bars)
+        else:
+            raise ValueError(f"Unknown backtest mode: {mode}")
+        result = {"trades": trades, "summary": self.summarize(trades)}
+        if self.harmonic_pct:
+            closes = bars["close"].to_numpy(dtype=np.float64)
+            highs = bars["high"].to_numpy(dtype=np.float64) if "high" in bars else closes
+            lows = bars["low"].to_numpy(dtype=np.float64) if "low" in bars else closes
+            result["harmonics"] = scan_series(highs, lows, self.harmonic_pct)
+            self.tag_harmonics(trades, result["harmonics"])
+        return result
+
+    def tag_harmonics(self, trades, patterns):
+        """Sets trade["harmonic"] to the pattern name active at the entry bar (or None)."""
+        confirmed = [p["confirmed_bar"] for p in patterns]
+        for trade in trades:
+            i = bisect.bisect_right(confirmed, trade["entry_index"]) - 1
+            active = i >= 0 and trade["entry_index"] - confirmed[i] <= self.harmonic_ttl
+            trade["harmonic"] = patterns[i]["pattern"] if active else None
+
+    # --- shared fill / accounting ---
+
+    def _open(self, balance, price):
+        entry = price * (1 + self.slippage)
+        qty = self.risk_manager.calculate_position_size(balance, entry)
+        take_profit = entry * (1 + self.risk_manager.take_profit_distance / 100)
+        return entry, qty, take_profit
+
+    def _close(self, balance, entry_idx, exit_idx, entry, qty, price, reason):
+        exit_price = price * (1 - self.slippage)
+        fees = (entry + exit_price) * qty * self.fee_rate
+        pnl = (exit_price - entry) * qty - fees
+        trade = {
+            "entry_index": entry_idx,
+            "exit_index": exit_idx,
+            "entry_price": entry,
+            "exit_price": exit_price,
+            "quantity": qty,
+            "fees": fees,
+            "pnl": pnl,
+            "reason": reason,
+        }
+        return balance + pnl, trade
+
+    # --- bar-by-bar exact path ---
+
+    def _run_exact(self, bars):
+        closes = bars["close"].to_numpy(dtype=np.float64)
+        highs = bars["high"].to_numpy(dtype=np.float64) if "high" in bars else closes * 1.002
+        lows = bars["low"].to_numpy(dtype=np.float64) if "low" in bars else closes * 0.998
+        # Full-history EMAs: the fast path runs calculate_indicators() over the whole series
+        state = IndicatorState(ema_fast=self.strategy.ema_fast, ema_slow=self.strategy.ema_slow, windowed=False)
+        risk = self.risk_manager
+        balance = self.initial_balance
+        trades = []
+        position = None  # (entry_idx, entry, qty, take_profit)
+
+        for i in range(len(closes)):
+            close = closes[i]
+            snapshot = state.update(close, highs[i], lows[i])
+            if i < self.warmup:
+                continue
+            trend = self.strategy.detect_trend(snapshot)
+            signal = self.strategy.get_ai_prediction(snapshot)["signal"]
+
+            if position is not None:
+                entry_idx, entry, qty, take_profit = position
+                stop_loss = risk.get_dynamic_stop_loss(entry, trend, close)
+                reason = risk.evaluate_exit(close, stop_loss, take_profit)
+                if reason == "HOLD" and signal == "SELL":
+                    reason = "EXIT_SIGNAL"
+                if reason != "HOLD":
+                    balance, trade = self._close(balance, entry_idx, i, entry, qty, close, reason)
+                    trades.append(trade)
+                    risk.active_position = None
+                    position = None
+            elif signal == "BUY":
+                entry, qty, take_profit = self._open(balance, close)
+                risk.active_position = {"entry_price": entry, "amount": qty, "is_open": True}
+                position = (i, entry, qty, take_profit)
+
+        risk.active_position = None
+        return trades
+
+    # --- vectorized fast path ---
+
+    def _signals(self, bars):
+        closes = bars["close"].to_numpy(dtype=np.float64)
+        df = pd.DataFrame({
+            "close": closes,
+            "high": bars["high"].to_numpy(dtype=np.float64) if "high" in bars else closes * 1.002,
+            "low": bars["low"].to_numpy(dtype=np.float64) if "low" in bars else closes * 0.998,
+        })
+        df = self.strategy.calculate_indicators(df)
+        ind = {k: df[k].to_numpy() for k in ("ema_9", "ema_21", "rsi")}
+        return closes, self.batch.detect_trend(ind), self.batch.get_signals(ind)
+
+    def _run_fast(self, bars):
+        closes, trends, signals = self._signals(bars)
+        n = len(closes)
+        risk = self.risk_manager
+        balance = self.initial_balance
+        trades = []
+
+        buy_idx = np.flatnonzero(signals == "BUY")
+        buy_idx = buy_idx[buy_idx >= self.warmup]
+        is_sell = signals == "SELL"
+
+        i = self.warmup
+        while True:
+            # Next entry at or after bar i
+            pos = np.searchsorted(buy_idx, i)
+            if pos >= len(buy_idx):
+                break
+            entry_idx = int(buy_idx[pos])
+            entry, qty, take_profit = self._open(balance, closes[entry_idx])
+
+            # First exit bar after entry, searched chunk by chunk
+            exit_idx, reason = None, None
+            start = entry_idx + 1
+            while start < n:
+                end = min(n, start + self.exit_chunk)
+                px = closes[start:end]
+                stop = risk.get_dynamic_stop_loss_array(entry, trends[start:end], px)
+                hit_sl = px <= stop
+                hit_tp = px >= take_profit
+                hit = hit_sl | hit_tp | is_sell[start:end]
+                if hit.any():
+                    k = int(np.argmax(hit))
+                    exit_idx = start + k
+                    if hit_sl[k]:
+                        reason = "EXIT_STOP_LOSS"
+                    elif hit_tp[k]:
+                        reason = "EXIT_TAKE_PROFIT"
+                    else:
+                        reason = "EXIT_SIGNAL"
+                    break
+                start = end
+            if exit_idx is None:
+                break
+
+            balance, trade = self._close(balance, entry_idx, exit_idx, entry, qty, closes[exit_idx], reason)
+            trades.append(trade)
+            i = exit_idx + 1
+
+        return trades
+
+    # --- reporting ---
+
+    def summarize(self, trades):
+        pnl = np.array([t["pnl"] for t in trades], dtype=np.float64)
+        equity = self.initial_balance + np.concatenate([[0.0], np.cumsum(pnl)])
+        peak = np.maximum.accumulate(equity)
+        drawdown = (peak - equity) / peak
+        wins = int((pnl > 0).sum())
+        return {
+            "trades": len(trades),
+            "total_pnl": float(pnl.sum()),
+            "return_pct": float(pnl.sum() / self.initial_balance * 100),
+            "final_balance": float(equity[-1]),
+            "max_drawdown_pct": float(drawdown.max() * 100),
+            "win_rate": float(wins / len(trades) * 100) if trades else 0.0,
+            "fees": float(sum(t["fees"] for t in trades)),
+        }
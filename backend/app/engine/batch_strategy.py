@@ -0,0 +1,116 @@
+import numpy as np
+from app.engine.strategy import StrategyEngine, build_prediction
+
+
+def ema_matrix(values: np.ndarray, span: int):
+    """
+    EMA (pandas ewm(span, adjust=False)) along axis 1 of a symbols x window matrix.
+    Loops over the window once; every step is vectorized across symbols.
+    """
+    alpha = 2.0 / (span + 1.0)
+    out = np.empty_like(values)
+    ema = values[:, 0].copy()
+    out[:, 0] = ema
+    for j in range(1, values.shape[1]):
+        ema = (1 - alpha) * ema + alpha * values[:, j]
+        out[:, j] = ema
+    return out
+
+
+class BatchStrategyEngine:
+    """
+    Cross-symbol version of StrategyEngine.
+    Takes a whole poll snapshot as a (symbols x window) matrix and returns the
+    same last-row indicators, trend labels and BUY/SELL/HOLD predictions as
+    calculate_indicators() + detect_trend() + get_ai_prediction() per symbol.
+    """
+
+    def __init__(self, strategy=None, rsi_period=14):
+        # Thresholds, EMA spans and targets come from the scalar engine
+        self.strategy = strategy or StrategyEngine()
+        self.rsi_period = rsi_period
+
+    def calculate_indicators(self, closes: np.ndarray, highs: np.ndarray = None, lows: np.ndarray = None):
+        """Returns {field: array of shape (symbols,)} for the latest row."""
+        closes = np.asarray(closes, dtype=np.float64)
+        highs = closes * 1.002 if highs is None else np.asarray(highs, dtype=np.float64)
+        lows = closes * 0.998 if lows is None else np.asarray(lows, dtype=np.float64)
+        n_symbols, window = closes.shape
+
+        ema_9 = ema_matrix(closes, self.strategy.ema_fast)[:, -1]
+        ema_21 = ema_matrix(closes, self.strategy.ema_slow)[:, -1]
+        macd = ema_matrix(closes, 12) - ema_matrix(closes, 26)
+        macd_signal = ema_matrix(macd, 9)[:, -1]
+        macd = macd[:, -1]
+
+        # RSI: rolling mean of the last `rsi_period` gains/losses (first delta counts as 0)
+        if window >= self.rsi_period:
+            delta = np.diff(closes[:, -(self.rsi_period + 1):], axis=1)
+            if window == self.rsi_period:
+                delta = np.hstack([np.zeros((n_symbols, 1)), delta])
+            gain = np.where(delta > 0, delta, 0.0).sum(axis=1) / self.rsi_period
+            loss = np.where(delta < 0, -delta, 0.0).sum(axis=1) / self.rsi_period
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rsi = 100 - (100 / (1 + gain / loss))
+            rsi = np.where(np.isnan(rsi), 50.0, rsi)
+        else:
+            rsi = np.full(n_symbols, 50.0)
+
+        # Fibonacci Retracement
+        high = highs.max(axis=1)
+        low = lows.min(axis=1)
+        diff = high - low
+
+        return {
+            "close": closes[:, -1],
+            "ema_9": ema_9,
+            "ema_21": ema_21,
+            "rsi": rsi,
+            "MACD_12_26_9": macd,
+            "MACDh_12_26_9": macd - macd_signal,
+            "MACDs_12_26_9": macd_signal,
+            "fib_0": high,
+            "fib_236": high - 0.236 * diff,
+            "fib_382": high - 0.382 * diff,
+            "fib_500": high - 0.5 * diff,
+            "fib_618": high - 0.618 * diff,
+            "fib_100": low,
+        }
+
+    def detect_trend(self, ind):
+        """Vectorized StrategyEngine.detect_trend over all symbols."""
+        s = self.strategy
+        bullish = (ind["ema_9"] > ind["ema_21"]) & (ind["rsi"] > s.trend_rsi_bull)
+        bearish = (ind["ema_9"] < ind["ema_21"]) & (ind["rsi"] < s.trend_rsi_bear)
+        return np.where(bullish, "BULLISH", np.where(bearish, "BEARISH", "SIDEWAYS"))
+
+    def get_signals(self, ind):
+        """Vectorized BUY/SELL/HOLD labels of StrategyEngine.get_ai_prediction."""
+        rsi_level = self.strategy.signal_rsi
+        bullish = (ind["rsi"] > rsi_level) & (ind["ema_9"] > ind["ema_21"])
+        bearish = (ind["rsi"] < rsi_level) & (ind["ema_9"] < ind["ema_21"])
+        return np.where(bullish, "BUY", np.where(bearish, "SELL", "HOLD"))
+
+    def evaluate(self, symbols, closes, highs=None, lows=None):
+        """
+        Runs the whole pipeline for one poll snapshot.
+        Returns {symbol: {"indicators": dict, "trend": str, "ai_prediction": dict}}.
+        """
+        return self.build_results(symbols, self.calculate_indicators(closes, highs, lows))
+
+    def build_results(self, symbols, ind):
+        """Trend, signal and prediction per symbol from calculate_indicators() output."""
+        trends = self.detect_trend(ind)
+        signals = self.get_signals(ind)
+
+        fields = list(ind.keys())
+        columns = [ind[f].tolist() for f in fields]
+        results = {}
+        for i, symbol in enumerate(symbols):
+            row = {f: col[i] for f, col in zip(fields, columns)}
+            results[symbol] = {
+                "indicators": row,
+                "trend": str(trends[i]),
+                "ai_prediction": build_prediction(str(signals[i]), row["close"], self.strategy.profiles),
+            }
+        return results
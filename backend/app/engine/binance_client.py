@@ -3,10 +3,20 @@ import asyncio
 from dotenv import load_dotenv
 import aiohttp
 import json
+import time
+from app.engine.binance_stream import BinanceStreamClient
+from app.engine.exchange_info import ExchangeInfoCache
+from app.engine.metrics import REGISTRY
+from app.engine.rate_limit import RequestWeightTracker
 
 load_dotenv()
 
 DEFAULT_SYMBOLS = ["BTCUSDT", "ETHUSDT", "DOGEUSDT", "SHIBUSDT", "PEPEUSDT"]
+# Symbols per /api/v3/ticker/price?symbols=[...] request (keeps URLs short)
+PRICE_BATCH_SIZE = 100
+
+REST_LATENCY = REGISTRY.histogram("binance_rest_seconds", "Binance REST request latency", ("path",))
+REST_REQUESTS = REGISTRY.counter("binance_rest_requests_total", "Binance REST requests", ("path", "status"))
 
 class BinanceManager:
 
@@ -14,49 +24,88 @@ class BinanceManager:
         self.api_key = api_key or os.getenv("BINANCE_API_KEY")
         self.api_secret = api_secret or os.getenv("BINANCE_API_SECRET")
         self.testnet = testnet
-        self.base_url = "https://api.binance.com"
+        self.base_url = os.getenv("BINANCE_BASE_URL", "https://api.binance.com")
         self.session = None
+        self.stream = None  # BinanceStreamClient, started on demand
+        self.exchange_info = ExchangeInfoCache(os.getenv("EXCHANGE_INFO_CACHE", "data/exchange_info.json"))
+        self.weights = RequestWeightTracker(limit=6000)
+        self.bytes_received = 0
+        self.fallback_symbols = set()  # symbols whose last REST price was made up (emergency seed / missing)
 
     async def init_client(self):
         """Initialize aiohttp session for REST API calls"""
         if not self.session:
-            self.session = aiohttp.ClientSession()
+            # Keep-alive pool with DNS caching so polls reuse warm connections
+            connector = aiohttp.TCPConnector(
+                limit=20,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+                enable_cleanup_closed=True,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=10),
+            )
         return self.session
 
-    async def get_top_usdt_pairs(self):
-        """Fetches all active USDT pairs from Binance ExchangeInfo."""
+    async def _get_json(self, path, params=None, weight=1):
+        """GET with request-weight accounting; returns (status, json or None)."""
+        if not self.session:
+            await self.init_client()
+        await self.weights.acquire(weight)
+        started = time.perf_counter()
+        async with self.session.get(f"{self.base_url}{path}", params=params) as response:
+            self.weights.update_from_headers(response.headers)
+            body = await response.read()
+            self.bytes_received += len(body)
+            REST_LATENCY.observe(time.perf_counter() - started, path=path)
+            REST_REQUESTS.inc(path=path, status=response.status)
+            if response.status != 200:
+                return response.status, None
+            return response.status, json.loads(body)
+
+    async def get_top_usdt_pairs(self, limit=100):
+        """Fetches active USDT pairs from Binance ExchangeInfo (all of them if limit is None)."""
         try:
-            if not self.session:
-                await self.init_client()
-            
-            async with self.session.get(f"{self.base_url}/api/v3/exchangeInfo") as response:
-                data = await response.json()
-                pairs = [s['symbol'] for s in data['symbols'] if s['status'] == 'TRADING' and s['symbol'].endswith('USDT')]
-                return pairs[:100]
+            if not self.exchange_info.is_fresh():
+                status, data = await self._get_json("/api/v3/exchangeInfo", {"symbolStatus": "TRADING"}, weight=20)
+                if data is None:
+                    raise Exception(f"API returned status {status}")
+                self.exchange_info.update(data)
         except Exception as e:
             print(f"DEBUG: Exchange info fetch failed: {e}")
+        
+        # Stale cache beats the hard-coded list
+        pairs = self.exchange_info.usdt_pairs()
+        if not pairs:
             return ["BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "XRPUSDT", "DOGEUSDT", "SHIBUSDT", "PEPEUSDT"]
+        return pairs[:limit] if limit else pairs
 
     async def get_latest_prices_rest(self, symbols):
         """Fetches REAL latest prices via Binance public REST API - NO AUTH REQUIRED"""
         try:
-            if not self.session:
-                await self.init_client()
-            
-            # Binance public API endpoint - no authentication needed
-            async with self.session.get(f"{self.base_url}/api/v3/ticker/price") as response:
-                if response.status == 200:
-                    data = await response.json()
-                    price_map = {item['symbol']: float(item['price']) for item in data}
-                    result = {}
-                    for symbol in symbols:
-                        if symbol in price_map:
-                            result[symbol] = price_map[symbol]
-                        else:
-                            result[symbol] = 1.0
-                    return result
+            # Binance public API endpoint - no authentication needed.
+            # Only the tracked symbols are requested, in batches.
+            price_map = {}
+            for i in range(0, len(symbols), PRICE_BATCH_SIZE):
+                batch = symbols[i:i + PRICE_BATCH_SIZE]
+                params = {"symbols": json.dumps(batch, separators=(",", ":"))}
+                status, data = await self._get_json("/api/v3/ticker/price", params, weight=4)
+                if status == 400:
+                    # An unknown/delisted symbol fails the whole batch: fall back to all tickers
+                    status, data = await self._get_json("/api/v3/ticker/price", weight=4)
+                if data is None:
+                    raise Exception(f"API returned status {status}")
+                price_map.update({item['symbol']: float(item['price']) for item in data})
+
+            result = {}
+            for symbol in symbols:
+                if symbol in price_map:
+                    result[symbol] = price_map[symbol]
                 else:
-                    raise Exception(f"API returned status {response.status}")
+                    result[symbol] = 1.0
+            self.fallback_symbols = {s for s in symbols if s not in price_map}
+            return result
         except Exception as e:
             print(f"DEBUG: REST API failed ({e}). Using emergency seeds.")
             # Last resort emergency seeds
@@ -71,10 +120,45 @@ class BinanceManager:
                 "SHIBUSDT": 0.000025,
                 "PEPEUSDT": 0.000018
             }
+            self.fallback_symbols = set(symbols)
             return {s: emergency_seeds.get(s, 100.0) for s in symbols}
 
-    async def get_ticker_stream(self, symbols=None):
-        """Streams real-time ticker data using REST polling (no WebSocket auth issues)"""
+    def rest_snapshot(self, symbols, prices):
+        """Tickers for one REST poll; made-up prices are flagged "fallback": True."""
+        snapshot = [self.format_ticker(symbol, prices.get(symbol, 1.0)) for symbol in symbols]
+        if self.fallback_symbols:
+            for ticker in snapshot:
+                if ticker["symbol"] in self.fallback_symbols or ticker["symbol"] not in prices:
+                    ticker["fallback"] = True
+        return snapshot
+
+    @staticmethod
+    def format_ticker(symbol, price, bid=None, ask=None):
+        """Formats a price tick appropriately based on price magnitude (bid/ask default to +/-0.01%)."""
+        bid = price * 0.9999 if bid is None else bid
+        ask = price * 1.0001 if ask is None else ask
+        if price < 0.01:
+            decimals = 8
+        elif price < 1:
+            decimals = 6
+        else:
+            decimals = 2
+        price_str = f"{price:.{decimals}f}"
+        bid_str = f"{bid:.{decimals}f}"
+        ask_str = f"{ask:.{decimals}f}"
+
+        return {
+            "symbol": symbol,
+            "price": price_str,
+            "bid": bid_str,
+            "ask": ask_str,
+            "spread": abs(float(ask_str) - float(bid_str)),
+            "high": price_str,
+            "low": price_str
+        }
+
+    async def get_snapshot_stream(self, symbols=None):
+        """Streams one list of tickers (all symbols) per REST poll."""
         if not symbols:
             symbols = await self.get_top_usdt_pairs()
             
@@ -84,32 +168,7 @@ class BinanceManager:
         while True:
             try:
                 prices = await self.get_latest_prices_rest(symbols)
-                for symbol in symbols:
-                    price = prices.get(symbol, 1.0)
-                    
-                    # Format appropriately based on price magnitude
-                    if price < 0.01:
-                        price_str = f"{price:.8f}"
-                        bid_str = f"{price * 0.9999:.8f}"
-                        ask_str = f"{price * 1.0001:.8f}"
-                    elif price < 1:
-                        price_str = f"{price:.6f}"
-                        bid_str = f"{price * 0.9999:.6f}"
-                        ask_str = f"{price * 1.0001:.6f}"
-                    else:
-                        price_str = f"{price:.2f}"
-                        bid_str = f"{price * 0.9999:.2f}"
-                        ask_str = f"{price * 1.0001:.2f}"
-                    
-                    yield {
-                        "symbol": symbol,
-                        "price": price_str,
-                        "bid": bid_str,
-                        "ask": ask_str,
-                        "spread": abs(float(ask_str) - float(bid_str)),
-                        "high": price_str,
-                        "low": price_str
-                    }
+                yield self.rest_snapshot(symbols, prices)
                 
                 # Update every 2 seconds for real-time feel without hammering API
                 await asyncio.sleep(2.0)
@@ -118,6 +177,54 @@ class BinanceManager:
                 print(f"DEBUG: Stream error: {e}")
                 await asyncio.sleep(3.0)
 
+    async def get_ticker_stream(self, symbols=None):
+        """Streams real-time ticker data one symbol at a time (REST polling)"""
+        async for snapshot in self.get_snapshot_stream(symbols):
+            for ticker in snapshot:
+                yield ticker
+
+    async def get_live_snapshot_stream(self, symbols=None, interval=0.5):
+        """
+        Streams snapshots from the Binance WebSocket market streams (real bid/ask,
+        sub-second updates). Falls back to REST polling while the socket is down.
+        """
+        if not symbols:
+            symbols = await self.get_top_usdt_pairs()
+        if not self.session:
+            await self.init_client()
+        if self.stream is None:
+            self.stream = BinanceStreamClient()
+        self.stream.start(self.session)
+
+        print(f"DEBUG: Starting live market stream for {len(symbols)} symbols")
+        while True:
+            if self.stream.is_fresh():
+                snapshot = []
+                for symbol in symbols:
+                    ticker = self.stream.tickers.get(symbol)
+                    book = self.stream.book.get(symbol)
+                    if ticker is None and book is None:
+                        continue
+                    price = ticker["price"] if ticker else (book["bid"] + book["ask"]) / 2
+                    snapshot.append(self.format_ticker(
+                        symbol, price,
+                        book["bid"] if book else None,
+                        book["ask"] if book else None,
+                    ))
+                if snapshot:
+                    yield snapshot
+                await asyncio.sleep(interval)
+            else:
+                # Socket down (or still connecting): one REST poll, then re-check
+                try:
+                    prices = await self.get_latest_prices_rest(symbols)
+                    yield self.rest_snapshot(symbols, prices)
+                except Exception as e:
+                    print(f"DEBUG: Stream error: {e}")
+                await asyncio.sleep(2.0)
+
     async def close(self):
+        if self.stream:
+            await self.stream.stop()
         if self.session:
             await self.session.close()
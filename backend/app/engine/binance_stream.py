@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+import random
+import time
+from collections import deque
+import aiohttp
+import numpy as np
+
+DEFAULT_STREAM_URL = "wss://stream.binance.com:9443/stream?streams=!bookTicker/!miniTicker@arr"
+
+
+class BinanceStreamClient:
+    """
+    Keeps the latest book ticker and mini ticker of every symbol from the
+    combined Binance market streams, reconnecting with exponential backoff.
+    """
+
+    def __init__(self, url=None, max_backoff=30.0, latency_samples=5000):
+        self.url = url or os.getenv("BINANCE_STREAM_URL", DEFAULT_STREAM_URL)
+        self.max_backoff = max_backoff
+        self.book = {}    # {symbol: {"bid", "ask", "bid_qty", "ask_qty"}}
+        self.tickers = {}  # {symbol: {"price", "open", "high", "low", "volume", "quote_volume", "event_time"}}
+        self.connected = False
+        self.last_message = 0.0
+        self.reconnects = 0
+        self.latencies = deque(maxlen=latency_samples)  # ms from exchange event to receipt
+        self._task = None
+
+    def start(self, session=None):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(session))
+        return self._task
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self.connected = False
+
+    async def run(self, session=None):
+        own_session = session is None
+        session = session or aiohttp.ClientSession()
+        backoff = 1.0
+        try:
+            while True:
+                try:
+                    async with session.ws_connect(self.url, heartbeat=20.0) as ws:
+                        print(f"DEBUG: Market stream connected ({self.url})")
+                        self.connected = True
+                        backoff = 1.0
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                self.handle_message(msg.data)
+                            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"DEBUG: Market stream error: {e}")
+                self.connected = False
+                self.reconnects += 1
+                delay = min(backoff, self.max_backoff) * (1 + random.random() * 0.2)
+                print(f"DEBUG: Market stream down, reconnecting in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                backoff = min(backoff * 2, self.max_backoff)
+        finally:
+            self.connected = False
+            if own_session:
+                await session.close()
+
+    def handle_message(self, raw):
+        """Applies one combined-stream frame ({"stream": ..., "data": ...})."""
+        now_ms = time.time() * 1000
+        self.last_message = now_ms / 1000
+        msg = json.loads(raw)
+        data = msg.get("data", msg)
+
+        if isinstance(data, list):
+            # !miniTicker@arr
+            for t in data:
+                self.tickers[t["s"]] = {
+                    "price": float(t["c"]),
+                    "open": float(t["o"]),
+                    "high": float(t["h"]),
+                    "low": float(t["l"]),
+                    "volume": float(t["v"]),
+                    "quote_volume": float(t["q"]),
+                    "event_time": t["E"],
+                }
+                self.latencies.append(now_ms - t["E"])
+        elif "b" in data and "a" in data:
+            # !bookTicker / <symbol>@bookTicker
+            self.book[data["s"]] = {
+                "bid": float(data["b"]),
+                "bid_qty": float(data["B"]),
+                "ask": float(data["a"]),
+                "ask_qty": float(data["A"]),
+            }
+            if "E" in data:
+                self.latencies.append(now_ms - data["E"])
+
+    def is_fresh(self, max_age=5.0):
+        return self.connected and time.time() - self.last_message < max_age
+
+    def latency_percentiles(self):
+        """End-to-end tick latency (exchange event -> local receipt) in ms."""
+        if not self.latencies:
+            return {"p50": None, "p90": None, "p99": None, "samples": 0}
+        p50, p90, p99 = np.percentile(np.fromiter(self.latencies, dtype=np.float64), [50, 90, 99])
+        return {"p50": float(p50), "p90": float(p90), "p99": float(p99), "samples": len(self.latencies)}
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+from app.engine.market_history import RingBuffer
+
+# Supported bar sizes in milliseconds
+TIMEFRAMES = {
+    "1m": 60_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "30m": 1_800_000,
+    "1h": 3_600_000,
+}
+
+
+class CandleSeries:
+    """
+    OHLCV bars of one symbol/timeframe.
+    The forming bar is kept in plain attributes; closed bars go to ring
+    buffers so they can be read back as zero-copy array views.
+    """
+
+    FIELDS = ("open_time", "open", "high", "low", "close", "volume")
+
+    def __init__(self, timeframe, capacity=500):
+        self.timeframe = timeframe
+        self.interval = TIMEFRAMES[timeframe]
+        self.bars = {field: RingBuffer(capacity) for field in self.FIELDS}
+        self.open_time = None
+        self.open = self.high = self.low = self.close = None
+        self.volume = 0.0
+        self.partial = True  # the first bar starts mid-interval, whenever the first tick arrives
+
+    def update(self, ts, price, volume=0.0):
+        """
+        Applies one tick in O(1). Returns the bar that just closed, if any;
+        the first bar after startup is flagged "partial": True.
+        """
+        bucket = ts - ts % self.interval
+        closed = None
+        if self.open_time is None or bucket > self.open_time:
+            if self.open_time is not None:
+                closed = self.current()
+                for field in self.FIELDS:
+                    self.bars[field].append(closed[field])
+                closed["partial"] = self.partial
+                self.partial = False
+            self.open_time = bucket
+            self.open = self.high = self.low = price
+            self.volume = 0.0
+        elif bucket < self.open_time:
+            return None  # late tick for an already closed bar
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += volume
+        return closed
+
+    def current(self):
+        """The forming (not yet closed) bar."""
+        return {
+            "open_time": self.open_time,
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "volume": self.volume,
+        }
+
+    def load(self, bars):
+        """Appends already closed bars ({field: array}, oldest first), e.g. rebuilt from the tick store."""
+        for field in self.FIELDS:
+            self.bars[field].extend(bars[field])
+
+    def view(self, field, n=None):
+        return self.bars[field].view(n)
+
+    def __len__(self):
+        return len(self.bars["close"])
+
+
+class CandleAggregator:
+    """
+    Builds 1m/5m/15m/30m/1h OHLCV bars per symbol from the tick stream and
+    notifies listeners only when a bar closes.
+    """
+
+    def __init__(self, timeframes=("1m", "5m", "15m", "30m", "1h"), capacity=500):
+        self.timeframes = tuple(timeframes)
+        self.capacity = capacity
+        self.series = {}  # {symbol: {timeframe: CandleSeries}}
+        self.listeners = []  # callables(symbol, timeframe, bar)
+
+    def on_close(self, callback):
+        self.listeners.append(callback)
+        return callback
+
+    def update(self, symbol, ts, price, volume=0.0):
+        """Feeds one tick (ts in ms) to every timeframe of a symbol."""
+        series = self.series.get(symbol)
+        if series is None:
+            series = self.series[symbol] = {tf: CandleSeries(tf, self.capacity) for tf in self.timeframes}
+        for tf, candles in series.items():
+            closed = candles.update(ts, price, volume)
+            if closed is not None:
+                for callback in self.listeners:
+                    callback(symbol, tf, closed)
+
+    def load(self, symbol, timeframe, bars):
+        """Seeds one symbol/timeframe with closed bars (see ticks_to_bars)."""
+        series = self.series.get(symbol)
+        if series is None:
+            series = self.series[symbol] = {tf: CandleSeries(tf, self.capacity) for tf in self.timeframes}
+        series[timeframe].load(bars)
+
+    def get_bars(self, symbol, timeframe, n=None):
+        """Closed bars as {field: read-only array view}."""
+        candles = self.series[symbol][timeframe]
+        return {field: candles.view(field, n) for field in CandleSeries.FIELDS}
+
+    def get_df(self, symbol, timeframe, n=None):
+        """Closed bars as a DataFrame over the ring buffer views (for StrategyEngine)."""
+        return pd.DataFrame(self.get_bars(symbol, timeframe, n), copy=False)
+
+    def has_bars(self, symbol, timeframe):
+        series = self.series.get(symbol)
+        return series is not None and len(series[timeframe]) > 0
+
+
+def ticks_to_bars(ts, prices, timeframe):
+    """
+    Complete OHLC bars from time-ordered ticks, vectorized. The first and
+    last buckets are dropped: ticks may only cover part of them (recording
+    started or stopped mid-bar).
+    """
+    interval = TIMEFRAMES[timeframe]
+    ts = np.asarray(ts, dtype=np.int64)
+    prices = np.asarray(prices, dtype=np.float64)
+    buckets = ts - ts % interval
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]]) if len(ts) else np.empty(0, dtype=np.int64)
+    if len(starts) < 3:
+        return {field: np.empty(0) for field in CandleSeries.FIELDS}
+    ends = np.r_[starts[1:], len(prices)]
+    keep = slice(1, -1)
+    return {
+        "open_time": buckets[starts][keep],
+        "open": prices[starts][keep],
+        "high": np.maximum.reduceat(prices, starts)[keep],
+        "low": np.minimum.reduceat(prices, starts)[keep],
+        "close": prices[ends - 1][keep],
+        "volume": np.zeros(len(starts))[keep],
+    }
@@ -0,0 +1,58 @@
+import json
+import os
+import time
+
+
+class ExchangeInfoCache:
+    """
+    Cached Binance exchange metadata (trimmed to what we use) with a TTL and
+    a JSON file on disk so restarts start warm without downloading
+    /api/v3/exchangeInfo again.
+    """
+
+    def __init__(self, path=None, ttl=3600.0):
+        self.path = path
+        self.ttl = ttl
+        self.symbols = []  # [{"symbol", "status", "baseAsset", "quoteAsset"}]
+        self.fetched_at = 0.0
+        self._load()
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self.symbols = data["symbols"]
+            self.fetched_at = data["fetched_at"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"symbols": self.symbols, "fetched_at": self.fetched_at}, f)
+        os.replace(tmp, self.path)
+
+    def is_fresh(self):
+        return bool(self.symbols) and time.time() - self.fetched_at < self.ttl
+
+    def update(self, exchange_info):
+        """Stores a raw /api/v3/exchangeInfo response."""
+        self.symbols = [
+            {
+                "symbol": s["symbol"],
+                "status": s["status"],
+                "baseAsset": s.get("baseAsset"),
+                "quoteAsset": s.get("quoteAsset"),
+            }
+            for s in exchange_info["symbols"]
+        ]
+        self.fetched_at = time.time()
+        self._save()
+
+    def usdt_pairs(self):
+        return [s["symbol"] for s in self.symbols if s["status"] == "TRADING" and s["symbol"].endswith("USDT")]
@@ -0,0 +1,203 @@
+from collections import deque
+
+# XABCD ratio windows (low, high) per pattern; a single value is a point target.
+#   ab: AB retracement of XA     bc: BC retracement of AB
+#   cd: CD extension of BC       xd: D's retracement of XA, measured from A
+HARMONIC_PATTERNS = {
+    "GARTLEY": {"ab": (0.618, 0.618), "bc": (0.382, 0.886), "cd": (1.272, 1.618), "xd": (0.786, 0.786)},
+    "BAT": {"ab": (0.382, 0.5), "bc": (0.382, 0.886), "cd": (1.618, 2.618), "xd": (0.886, 0.886)},
+    "BUTTERFLY": {"ab": (0.786, 0.786), "bc": (0.382, 0.886), "cd": (1.618, 2.618), "xd": (1.272, 1.618)},
+    "CRAB": {"ab": (0.382, 0.618), "bc": (0.382, 0.886), "cd": (2.24, 3.618), "xd": (1.618, 1.618)},
+}
+PIVOT_HIGH, PIVOT_LOW = 1, -1
+
+
+class ZigZagTracker:
+    """
+    Incremental ZigZag over bar highs/lows.
+    While the swing runs up it only tracks the highest high; once a low
+    falls `threshold_pct` below it, that high is confirmed as a pivot and
+    the swing turns (and vice versa). Constant work per bar; confirmed
+    pivots are (bar, price, PIVOT_HIGH/PIVOT_LOW) and always alternate.
+    """
+
+    def __init__(self, threshold_pct=2.0, max_pivots=16):
+        self.threshold = threshold_pct / 100
+        self.pivots = deque(maxlen=max_pivots)
+        self.bars = 0
+        self.direction = 0  # +1 swing up (tracking a high), -1 swing down, 0 before the first swing
+        self.high = self.low = None
+        self.high_bar = self.low_bar = 0
+
+    def update(self, high, low=None):
+        """Applies one bar; returns the pivot it confirmed, if any."""
+        low = high if low is None else low
+        bar = self.bars
+        self.bars += 1
+        if self.direction > 0:
+            if high > self.high:
+                self.high, self.high_bar = high, bar
+            elif low <= self.high * (1 - self.threshold):
+                pivot = (self.high_bar, self.high, PIVOT_HIGH)
+                self.direction = -1
+                self.low, self.low_bar = low, bar
+                self.pivots.append(pivot)
+                return pivot
+            return None
+        if self.direction < 0:
+            if low < self.low:
+                self.low, self.low_bar = low, bar
+            elif high >= self.low * (1 + self.threshold):
+                pivot = (self.low_bar, self.low, PIVOT_LOW)
+                self.direction = 1
+                self.high, self.high_bar = high, bar
+                self.pivots.append(pivot)
+                return pivot
+            return None
+        # First swing: whichever extreme gets left behind by the threshold is the first pivot
+        if self.high is None:
+            self.high, self.low = high, low
+            return None
+        if high > self.high:
+            self.high, self.high_bar = high, bar
+        if low < self.low:
+            self.low, self.low_bar = low, bar
+        if self.low_bar < self.high_bar and self.high >= self.low * (1 + self.threshold):
+            pivot = (self.low_bar, self.low, PIVOT_LOW)
+            self.direction = 1
+        elif self.high_bar < self.low_bar and self.low <= self.high * (1 - self.threshold):
+            pivot = (self.high_bar, self.high, PIVOT_HIGH)
+            self.direction = -1
+        else:
+            return None
+        self.pivots.append(pivot)
+        return pivot
+
+
+def _ratio_error(value, window, tolerance):
+    """Relative distance from a ratio window (None when outside window +/- tolerance)."""
+    low, high = window
+    if value < low * (1 - tolerance) or value > high * (1 + tolerance):
+        return None
+    if value < low:
+        return (low - value) / low
+    if value > high:
+        return (value - high) / high
+    return 0.0
+
+
+def match_xabcd(pivots, tolerance=0.05, patterns=HARMONIC_PATTERNS):
+    """
+    Best harmonic pattern for the last five alternating pivots (X, A, B, C, D),
+    or None. D at a low is bullish, at a high bearish. The pattern with the
+    smallest mean ratio error wins; ties go to the first in `patterns`.
+    """
+    if len(pivots) < 5:
+        return None
+    x, a, b, c, d = (pivots[i] for i in range(-5, 0))
+    xa = abs(a[1] - x[1])
+    ab = abs(b[1] - a[1])
+    bc = abs(c[1] - b[1])
+    if not (xa and ab and bc):
+        return None
+    ratios = {
+        "ab": ab / xa,
+        "bc": bc / ab,
+        "cd": abs(d[1] - c[1]) / bc,
+        "xd": abs(a[1] - d[1]) / xa,
+    }
+    best, best_error = None, None
+    for name, windows in patterns.items():
+        errors = [_ratio_error(ratios[leg], window, tolerance) for leg, window in windows.items()]
+        if None in errors:
+            continue
+        error = sum(errors) / len(errors)
+        if best_error is None or error < best_error:
+            best, best_error = name, error
+    if best is None:
+        return None
+    side = "BULLISH" if d[2] == PIVOT_LOW else "BEARISH"
+    return {
+        "pattern": f"{side}_{best}",
+        "name": best,
+        "side": side,
+        "points": {label: p[1] for label, p in zip("XABCD", (x, a, b, c, d))},
+        "bars": {label: p[0] for label, p in zip("XABCD", (x, a, b, c, d))},
+        "ratios": ratios,
+        "error": best_error,
+    }
+
+
+class HarmonicScanner:
+    """
+    Live harmonic patterns per symbol: one ZigZagTracker each, fed with
+    closed candles. The XABCD matcher only runs when a new pivot is
+    confirmed; a match stays active for `ttl_bars` bars afterwards.
+    """
+
+    def __init__(self, threshold_pct=2.0, tolerance=0.05, ttl_bars=10, max_patterns=200):
+        self.threshold_pct = threshold_pct
+        self.tolerance = tolerance
+        self.ttl_bars = ttl_bars
+        self.trackers = {}  # {symbol: ZigZagTracker}
+        self.last_pattern = {}  # {symbol: pattern}
+        self.patterns = deque(maxlen=max_patterns)  # newest last
+
+    def update(self, symbol, high, low=None, time=None):
+        """Applies one closed bar; returns the pattern completed by it, if any."""
+        tracker = self.trackers.get(symbol)
+        if tracker is None:
+            tracker = self.trackers[symbol] = ZigZagTracker(self.threshold_pct)
+        if tracker.update(high, low) is None:
+            return None
+        pattern = match_xabcd(tracker.pivots, self.tolerance)
+        if pattern is None:
+            return None
+        pattern["symbol"] = symbol
+        pattern["confirmed_bar"] = tracker.bars - 1
+        pattern["time"] = time
+        self.last_pattern[symbol] = pattern
+        self.patterns.append(pattern)
+        return pattern
+
+    def active(self, symbol):
+        """The symbol's latest pattern while it is at most ttl_bars old, else None."""
+        pattern = self.last_pattern.get(symbol)
+        if pattern is None or self.trackers[symbol].bars - 1 - pattern["confirmed_bar"] > self.ttl_bars:
+            return None
+        return pattern
+
+    def recent(self, symbol=None, limit=50):
+        patterns = [p for p in list(self.patterns) if symbol is None or p["symbol"] == symbol]
+        return patterns[-limit:][::-1]
+
+
+def scan_series(highs, lows=None, threshold_pct=2.0, tolerance=0.05):
+    """Every pattern in one bar history (same tracker and matcher as the live scanner)."""
+    highs = highs.tolist() if hasattr(highs, "tolist") else list(highs)
+    lows = highs if lows is None else (lows.tolist() if hasattr(lows, "tolist") else list(lows))
+    tracker = ZigZagTracker(threshold_pct)
+    found = []
+    for bar, (high, low) in enumerate(zip(highs, lows)):
+        if tracker.update(high, low) is None:
+            continue
+        pattern = match_xabcd(tracker.pivots, tolerance)
+        if pattern is not None:
+            pattern["confirmed_bar"] = bar
+            found.append(pattern)
+    return found
+
+
+def scan_histories(histories, threshold_pct=2.0, tolerance=0.05):
+    """
+    Batch mode for backtests: {symbol: DataFrame with high/low columns, or
+    (highs, lows)} -> {symbol: [patterns]}. Deterministic for a given input.
+    """
+    results = {}
+    for symbol, bars in histories.items():
+        if hasattr(bars, "columns"):
+            highs, lows = bars["high"].to_numpy(), bars["low"].to_numpy()
+        else:
+            highs, lows = bars
+        results[symbol] = scan_series(highs, lows, threshold_pct, tolerance)
+    return results
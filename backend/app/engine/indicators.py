@@ -0,0 +1,217 @@
+from collections import deque
+import math
+
+
+def decay(span):
+    """Weight an ewm(span, adjust=False) keeps on its previous value."""
+    return 1.0 - 2.0 / (span + 1.0)
+
+
+def restarted_geometric_ema(r, b, m):
+    """
+    Last value of an EMA with decay b restarted on the sequence 1, r, r^2,
+    ..., r^m: b^m + (1 - b) * sum_{j=1..m} b^(m-j) r^j in closed form (r != b).
+    """
+    return b ** m + (1 - b) * r * (r ** m - b ** m) / (r - b)
+
+
+class IndicatorState:
+    """
+    Incremental indicator state for a single symbol.
+
+    windowed=True (live paths) matches StrategyEngine.calculate_indicators()
+    and BatchStrategyEngine run over the last `window_size` rows: the EMAs
+    and MACD restart at the window start. An EMA restarted at row s equals
+    the un-seeded running sum S_t = r*S_(t-1) + (1-r)*x_t plus
+    r^(t-s) * (x_s - S_s), so keeping S for the rows still in the window
+    makes each update O(1); the MACD signal (an EMA of restarted EMAs)
+    adds two closed-form geometric terms. windowed=False keeps the classic
+    O(1) EMA recursion over the full history, i.e. calculate_indicators()
+    over the whole series (what the backtester compares against).
+    RSI and the rolling Fibonacci high/low are O(1) (amortized) in both.
+    """
+
+    def __init__(self, window_size=50, rsi_period=14, ema_fast=9, ema_slow=21, windowed=True):
+        self.window_size = window_size
+        self.rsi_period = rsi_period
+        self.ema_fast = ema_fast  # reported as 'ema_9'
+        self.ema_slow = ema_slow  # reported as 'ema_21'
+        self.windowed = windowed
+        self.count = 0
+        self.last_close = None
+
+        # EMA 9/21 and MACD 12/26/9 (pandas ewm(adjust=False) recursion)
+        self.ema_9 = None
+        self.ema_21 = None
+        self.ema_12 = None
+        self.ema_26 = None
+        self.macd = None
+        self.macd_signal = None
+
+        # Windowed mode: un-seeded running sums (fast, slow, 12, 26, signal of
+        # their MACD) and, per row in the window, (close, sums) at that row
+        self.decays = (decay(ema_fast), decay(ema_slow), decay(12), decay(26), decay(9))
+        self.sums = (0.0, 0.0, 0.0, 0.0, 0.0)
+        self.rows = deque(maxlen=window_size)
+
+        # Rolling RSI: last `rsi_period` gains/losses with running sums
+        self.gains = deque()
+        self.losses = deque()
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+
+        # Monotonic deques of (index, value) for the rolling fib high/low
+        self.max_q = deque()
+        self.min_q = deque()
+
+    @staticmethod
+    def _ema(prev, value, span):
+        if prev is None:
+            return value
+        alpha = 2.0 / (span + 1.0)
+        return (1 - alpha) * prev + alpha * value
+
+    def update(self, close, high=None, low=None):
+        """Feeds one new price and returns the latest indicator snapshot."""
+        close = float(close)
+        high = close * 1.002 if high is None else float(high)
+        low = close * 0.998 if low is None else float(low)
+
+        # EMAs / MACD
+        if self.windowed:
+            self._update_windowed(close)
+        else:
+            self.ema_9 = self._ema(self.ema_9, close, self.ema_fast)
+            self.ema_21 = self._ema(self.ema_21, close, self.ema_slow)
+            self.ema_12 = self._ema(self.ema_12, close, 12)
+            self.ema_26 = self._ema(self.ema_26, close, 26)
+            self.macd = self.ema_12 - self.ema_26
+            self.macd_signal = self._ema(self.macd_signal, self.macd, 9)
+
+        # RSI (simple rolling mean of gains/losses, same as the pandas path,
+        # where the first row's missing delta counts as zero)
+        delta = 0.0 if self.last_close is None else close - self.last_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        self.gains.append(gain)
+        self.losses.append(loss)
+        self.gain_sum += gain
+        self.loss_sum += loss
+        if len(self.gains) > self.rsi_period:
+            self.gain_sum -= self.gains.popleft()
+            self.loss_sum -= self.losses.popleft()
+        # Rebuild sums from the window occasionally to stop float drift
+        if self.count % 1024 == 0:
+            self.gain_sum = math.fsum(self.gains)
+            self.loss_sum = math.fsum(self.losses)
+        self.last_close = close
+
+        # Rolling window high/low for Fibonacci levels
+        idx = self.count
+        while self.max_q and self.max_q[-1][1] <= high:
+            self.max_q.pop()
+        self.max_q.append((idx, high))
+        while self.min_q and self.min_q[-1][1] >= low:
+            self.min_q.pop()
+        self.min_q.append((idx, low))
+        expired = idx - self.window_size
+        if self.max_q[0][0] <= expired:
+            self.max_q.popleft()
+        if self.min_q[0][0] <= expired:
+            self.min_q.popleft()
+        self.count += 1
+
+        return self.snapshot()
+
+    def _update_windowed(self, close):
+        r_fast, r_slow, r12, r26, r9 = self.decays
+        s_fast, s_slow, s12, s26, s_signal = self.sums
+        s_fast = r_fast * s_fast + (1 - r_fast) * close
+        s_slow = r_slow * s_slow + (1 - r_slow) * close
+        s12 = r12 * s12 + (1 - r12) * close
+        s26 = r26 * s26 + (1 - r26) * close
+        s_signal = r9 * s_signal + (1 - r9) * (s12 - s26)
+        self.sums = (s_fast, s_slow, s12, s26, s_signal)
+        self.rows.append((close, *self.sums))
+
+        # Restart every EMA at the oldest row still in the window
+        x0, fast0, slow0, a0, b0, signal0 = self.rows[0]
+        m = len(self.rows) - 1
+        self.ema_9 = s_fast + r_fast ** m * (x0 - fast0)
+        self.ema_21 = s_slow + r_slow ** m * (x0 - slow0)
+        c12, c26 = x0 - a0, x0 - b0
+        self.macd = s12 - s26 + r12 ** m * c12 - r26 ** m * c26
+        # Restarted MACD = running MACD + c12*r12^k - c26*r26^k at k rows in,
+        # and the restarted signal EMA is linear in it
+        self.macd_signal = (
+            s_signal + r9 ** m * ((a0 - b0) - signal0)
+            + c12 * restarted_geometric_ema(r12, r9, m)
+            - c26 * restarted_geometric_ema(r26, r9, m)
+        )
+
+    def get_rsi(self):
+        if len(self.gains) < self.rsi_period:
+            return 50.0
+        avg_gain = self.gain_sum / self.rsi_period
+        avg_loss = self.loss_sum / self.rsi_period
+        if avg_loss == 0:
+            return 50.0 if avg_gain == 0 else 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def snapshot(self):
+        """Returns the latest row of indicators as a plain dict."""
+        high = self.max_q[0][1]
+        low = self.min_q[0][1]
+        diff = high - low
+        macd = self.macd
+        return {
+            "close": self.last_close,
+            "ema_9": self.ema_9,
+            "ema_21": self.ema_21,
+            "rsi": self.get_rsi(),
+            "MACD_12_26_9": macd,
+            "MACDh_12_26_9": macd - self.macd_signal,
+            "MACDs_12_26_9": self.macd_signal,
+            "fib_0": high,
+            "fib_236": high - 0.236 * diff,
+            "fib_382": high - 0.382 * diff,
+            "fib_500": high - 0.5 * diff,
+            "fib_618": high - 0.618 * diff,
+            "fib_100": low,
+        }
+
+
+class IndicatorEngine:
+    """Keeps one IndicatorState per symbol."""
+
+    def __init__(self, window_size=50, ema_fast=9, ema_slow=21):
+        self.window_size = window_size
+        self.ema_fast = ema_fast
+        self.ema_slow = ema_slow
+        self.states = {}  # {symbol: IndicatorState}
+
+    def _new_state(self):
+        return IndicatorState(window_size=self.window_size, ema_fast=self.ema_fast, ema_slow=self.ema_slow)
+
+    def __contains__(self, symbol):
+        return symbol in self.states
+
+    def warm(self, symbol, closes, highs=None, lows=None):
+        """(Re)builds a symbol's state from a price (or bar) history."""
+        state = self._new_state()
+        snapshot = None
+        for i, price in enumerate(closes):
+            snapshot = state.update(price, None if highs is None else highs[i], None if lows is None else lows[i])
+        self.states[symbol] = state
+        return snapshot
+
+    def count(self, symbol):
+        """Prices/bars the symbol's state has seen (0 if unknown)."""
+        state = self.states.get(symbol)
+        return state.count if state else 0
+
+    def update(self, symbol, close, high=None, low=None):
+        state = self.states.get(symbol)
+        if state is None:
+            state = self.states[symbol] = self._new_state()
+        return state.update(close, high, low)
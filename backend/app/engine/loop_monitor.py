@@ -0,0 +1,90 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how late a periodic wake-up fires compared to
+    when it was scheduled. Sustained lag means something blocks the loop.
+    """
+
+    def __init__(self, interval=0.05, samples=2000):
+        self.interval = interval
+        self.lags = deque(maxlen=samples)  # ms
+        self.max_lag = 0.0
+        self._task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, (loop.time() - expected) * 1000)
+            self.lags.append(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    def percentiles(self):
+        if not self.lags:
+            return {"p50": None, "p99": None, "max": None, "samples": 0}
+        p50, p99 = np.percentile(np.fromiter(self.lags, dtype=np.float64), [50, 99])
+        return {"p50": float(p50), "p99": float(p99), "max": self.max_lag, "samples": len(self.lags)}
+
+
+class StrategyExecutor:
+    """
+    Runs CPU-bound strategy steps off the event loop.
+    A single worker thread by default: the NumPy work releases the GIL and
+    every strategy-state mutation stays on one thread. At most `max_in_flight`
+    jobs run at once; further submit() calls wait (backpressure) instead of
+    piling work up in the executor queue.
+    """
+
+    def __init__(self, max_workers=1, max_in_flight=1):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="strategy")
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.completed = 0
+        self.last_duration = 0.0  # ms
+        self._semaphore = None
+
+    def _sem(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    async def _run(self, fn, *args):
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.last_duration = (time.perf_counter() - started) * 1000
+
+    async def submit(self, fn, *args):
+        async with self._sem():
+            return await self._run(fn, *args)
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "last_duration_ms": self.last_duration,
+        }
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
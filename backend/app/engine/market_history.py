@@ -0,0 +1,128 @@
+import random
+import numpy as np
+import pandas as pd
+
+
+class RingBuffer:
+    """
+    Fixed-capacity float64 ring buffer.
+    Every value is written twice (at i and i + capacity) so the last `len`
+    values are always one contiguous slice and view() never copies.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = np.zeros(2 * capacity, dtype=np.float64)
+        self.head = 0  # next write position in [0, capacity)
+        self.len = 0
+
+    def append(self, value):
+        self.data[self.head] = value
+        self.data[self.head + self.capacity] = value
+        self.head += 1
+        if self.head == self.capacity:
+            self.head = 0
+        if self.len < self.capacity:
+            self.len += 1
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=np.float64)[-self.capacity:]
+        n = len(values)
+        idx = (self.head + np.arange(n)) % self.capacity
+        self.data[idx] = values
+        self.data[idx + self.capacity] = values
+        self.head = (self.head + n) % self.capacity
+        self.len = min(self.capacity, self.len + n)
+
+    def view(self, n=None):
+        """Read-only, oldest-first view of the last n values (zero-copy)."""
+        n = self.len if n is None else min(n, self.len)
+        end = self.head + self.capacity if self.len == self.capacity else self.head
+        out = self.data[end - n:end]
+        out.flags.writeable = False
+        return out
+
+    def last(self):
+        return self.data[self.head - 1 + self.capacity]
+
+    def __len__(self):
+        return self.len
+
+
+class MarketHistoryManager:
+    """Persistent per-symbol close/high/low history backed by ring buffers."""
+
+    FIELDS = ("close", "high", "low")
+
+    def __init__(self, window_size=50, seed_size=50, rng=None):
+        self.window_size = window_size
+        self.seed_size = min(seed_size, window_size)
+        self.rng = rng or random.Random()
+        self.history = {}  # {symbol: {field: RingBuffer}}
+
+    def _create(self, symbol):
+        buffers = {field: RingBuffer(self.window_size) for field in self.FIELDS}
+        self.history[symbol] = buffers
+        return buffers
+
+    def add_price(self, symbol, price, high=None, low=None):
+        buffers = self.history.get(symbol)
+        if buffers is None:
+            buffers = self._create(symbol)
+            # Seed with some initial noise for TA depth
+            for _ in range(self.seed_size):
+                seed = price * (1 + self.rng.uniform(-0.005, 0.005))
+                buffers["close"].append(seed)
+                buffers["high"].append(seed * 1.002)
+                buffers["low"].append(seed * 0.998)
+
+        buffers["close"].append(price)
+        buffers["high"].append(price * 1.002 if high is None else high)
+        buffers["low"].append(price * 0.998 if low is None else low)
+
+    def warm_from_store(self, store, symbols=None):
+        """Fills each symbol's window from a TickStore instead of random seeds."""
+        warmed = 0
+        for symbol in symbols or store.symbols():
+            records = store.tail(symbol, self.window_size)
+            if len(records) == 0:
+                continue
+            buffers = self.history.get(symbol) or self._create(symbol)
+            for field in self.FIELDS:
+                buffers[field].extend(records[field])
+            warmed += 1
+        return warmed
+
+    def get_view(self, symbol, field="close", n=None):
+        buffers = self.history.get(symbol)
+        if buffers is None:
+            return np.empty(0, dtype=np.float64)
+        return buffers[field].view(n)
+
+    def get_closes(self, symbol, n=None):
+        return self.get_view(symbol, "close", n)
+
+    def get_matrix(self, symbols, field="close", n=None):
+        """
+        Stacks the last n values of every symbol into a (symbols x n) matrix.
+        Shorter histories are left-padded with their oldest value (a flat
+        stretch), so one young symbol doesn't shrink everyone's window.
+        """
+        longest = max((len(self.history[s][field]) for s in symbols), default=0)
+        n = longest if n is None else min(n, longest)
+        out = np.empty((len(symbols), n), dtype=np.float64)
+        for i, symbol in enumerate(symbols):
+            values = self.history[symbol][field].view(n)
+            out[i, n - len(values):] = values
+            out[i, :n - len(values)] = values[0] if len(values) else np.nan
+        return out
+
+    def get_df(self, symbol, n=None):
+        """DataFrame over the ring buffer views (no per-tick list building)."""
+        return pd.DataFrame(
+            {field: self.get_view(symbol, field, n) for field in self.FIELDS},
+            copy=False,
+        )
+
+    def __contains__(self, symbol):
+        return symbol in self.history
@@ -0,0 +1,65 @@
+import asyncio
+
+
+class Subscription:
+    """
+    One client's view of the market hub.
+    Holds a bounded queue of ticks ({symbol: payload}); when the client falls
+    behind, the oldest tick is dropped so the client always catches up to
+    the latest prices.
+    """
+
+    def __init__(self, symbols=None, maxsize=4):
+        self.symbols = set(symbols) if symbols else None
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, tick):
+        if self.symbols is not None:
+            tick = {s: p for s, p in tick.items() if s in self.symbols}
+            if not tick:
+                return
+        if self.queue.full():
+            # Drop-oldest policy for slow clients
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(tick)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class MarketHub:
+    """
+    Pub/sub fan-out of computed market ticks.
+    A single producer publishes every symbol's payload once per tick and each
+    WebSocket client reads from its own Subscription.
+    """
+
+    def __init__(self, queue_size=4):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.latest = {}  # {symbol: payload} of the most recent tick
+
+    def subscribe(self, symbols=None):
+        sub = Subscription(symbols, maxsize=self.queue_size)
+        self.subscribers.add(sub)
+        # Hand new clients the last known state so they don't wait a full tick
+        if self.latest:
+            sub.offer(dict(self.latest))
+        return sub
+
+    def unsubscribe(self, sub):
+        self.subscribers.discard(sub)
+
+    def publish(self, tick):
+        self.latest.update(tick)
+        for sub in list(self.subscribers):
+            sub.offer(tick)
+
+    @property
+    def client_count(self):
+        return len(self.subscribers)
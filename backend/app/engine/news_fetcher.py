@@ -1,44 +1,232 @@
+import asyncio
+import bisect
+import re
+import time
 import httpx
 import os
 
+POSITIVE_WORDS = ["bullish", "jump", "high", "gain", "buy"]
+NEGATIVE_WORDS = ["bearish", "drop", "low", "crash", "sell"]
+
+# Common coin names that articles use instead of the ticker
+COIN_NAMES = {
+    "bitcoin": "BTC",
+    "ethereum": "ETH",
+    "solana": "SOL",
+    "ripple": "XRP",
+    "cardano": "ADA",
+    "dogecoin": "DOGE",
+    "shiba": "SHIB",
+    "pepe": "PEPE",
+    "binance coin": "BNB",
+}
+
+# Listed bases that are also everyday words (or too short to tell apart from
+# one): these only count as a mention in "$NOT" or pair ("NOT/USDT",
+# "NOTUSDT") form, never as a bare word
+COMMON_WORD_BASES = {
+    "A", "ACE", "AI", "ALL", "ALT", "BANANA", "BOND", "DATA", "DOGS", "FOR", "GAS", "HIGH", "ID",
+    "IO", "IT", "LOW", "MASK", "ME", "MOVE", "NEAR", "NOT", "OM", "ONE", "PEOPLE", "PORTAL",
+    "S", "SUN", "THE", "TRUMP", "U", "UP", "W",
+}
+
+FALLBACK_NEWS = [
+    {"title": "🔴 BREAKING: FED meeting scheduled for Wednesday - Market expects 25bps hike.", "sentiment": "NEGATIVE", "source": "MacroScanner"},
+    {"title": "🚀 BTC whale just moved 5,000 coins to cold storage! #Bullish", "sentiment": "POSITIVE", "source": "Twitter"},
+    {"title": "Binance announces new SHIB/EUR pair for European traders.", "sentiment": "POSITIVE", "source": "News"},
+    {"title": "PEPE volume spikes 40% in last hour - Social engagement at ATH!", "sentiment": "POSITIVE", "source": "TwitterPulse"},
+    {"title": "Whale Alert: $300M USDT moved from Unknown wallet to Exchange.", "sentiment": "NEGATIVE", "source": "Twitter"},
+    {"title": "ETF Inflows hit record high this week as institutional demand surges.", "sentiment": "POSITIVE", "source": "CryptoPro"}
+]
+
+
+class SentimentScorer:
+    """
+    Scores a batch of articles with one compiled multi-keyword matcher.
+    Same rules as before: any positive keyword wins, then any negative one.
+    """
+
+    def __init__(self, positive=POSITIVE_WORDS, negative=NEGATIVE_WORDS):
+        words = "|".join(re.escape(w) for w in positive)
+        bad = "|".join(re.escape(w) for w in negative)
+        self.sentiment_re = re.compile(f"(?P<pos>{words})|(?P<neg>{bad})")
+        self.symbol_re = None
+        self.aliases = {}
+
+    def set_symbols(self, symbols):
+        """
+        Builds the ticker/name matcher used for per-symbol tagging. Tickers
+        match case-sensitively on the original text ("BTC", not "btc");
+        short or common-word bases (COMMON_WORD_BASES, <= 2 letters) need the
+        "$BASE" or pair form. Coin names match in any case.
+        """
+        bases = {s[:-4] if s.endswith("USDT") else s for s in symbols}
+        bases.discard("")
+        names = {name: base for name, base in COIN_NAMES.items() if base in bases}
+        self.aliases = {b: b for b in bases}
+        self.aliases.update(names)
+        if not self.aliases:
+            self.symbol_re = None
+            return
+
+        def alternation(words):
+            return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+        plain = {b for b in bases if len(b) > 2 and b not in COMMON_WORD_BASES}
+        parts = []
+        if bases:
+            parts.append(rf"\$(?P<cash>{alternation(bases)})\b")
+            parts.append(rf"\b(?P<pair>{alternation(bases)})[/-]?USDT?\b")
+        if plain:
+            parts.append(rf"\b(?P<plain>{alternation(plain)})\b")
+        if names:
+            parts.append(rf"(?i:\b(?P<name>{alternation(names)})\b)")
+        self.symbol_re = re.compile("|".join(parts))
+
+    def score(self, texts):
+        """Returns [(sentiment, [tags])] for a list of raw texts."""
+        original = "\n".join(texts)
+        joined = original.lower()
+        starts = []
+        offset = 0
+        for t in texts:
+            starts.append(offset)
+            offset += len(t) + 1
+
+        positive = [False] * len(texts)
+        negative = [False] * len(texts)
+        for match in self.sentiment_re.finditer(joined):
+            i = bisect.bisect_right(starts, match.start()) - 1
+            if match.lastgroup == "pos":
+                positive[i] = True
+            else:
+                negative[i] = True
+
+        tags = [set() for _ in texts]
+        if self.symbol_re is not None:
+            for match in self.symbol_re.finditer(original):
+                i = bisect.bisect_right(starts, match.start()) - 1
+                alias = match.group(match.lastgroup)
+                tags[i].add(self.aliases[alias.lower() if match.lastgroup == "name" else alias])
+
+        return [
+            ("POSITIVE" if pos else "NEGATIVE" if neg else "NEUTRAL", sorted(tag))
+            for pos, neg, tag in zip(positive, negative, tags)
+        ]
+
+
 class NewsFetcher:
-    def __init__(self):
+    """
+    Shared news cache refreshed in the background with a pooled HTTP client
+    and conditional requests, so connections read news instantly.
+    """
+
+    def __init__(self, refresh_interval=60.0, ttl=300.0):
         self.api_key = os.getenv("CRYPTO_NEWS_API_KEY") # Mocked for now
         self.news_url = "https://min-api.cryptocompare.com/data/v2/news/?lang=EN"
+        self.refresh_interval = refresh_interval
+        self.ttl = ttl
+        self.scorer = SentimentScorer()
+        self.client = None
+        self.etag = None
+        self.last_modified = None
+        self.articles = []  # processed articles, newest first
+        self.fetched_at = 0.0
+        self.version = 0  # bumped whenever the articles change
+        self.requests = 0
+        self._task = None
+
+    def set_symbols(self, symbols):
+        self.scorer.set_symbols(symbols)
+
+    def _get_client(self):
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=5.0,
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=2),
+            )
+        return self.client
+
+    async def refresh(self):
+        """Fetches news if it changed (ETag / If-Modified-Since) and rescores it."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        self.requests += 1
+        response = await self._get_client().get(self.news_url, headers=headers)
+        if response.status_code == 304:
+            self.fetched_at = time.time()
+            return self.articles
+        response.raise_for_status()
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+
+        articles = response.json().get("Data", [])
+        scored = self.scorer.score([art['title'] + art['body'] for art in articles])
+        self.articles = [
+            {
+                "title": art['title'],
+                "sentiment": sentiment,
+                "url": art['url'],
+                "symbols": tags,
+            }
+            for art, (sentiment, tags) in zip(articles, scored)
+        ]
+        self.version += 1
+        self.fetched_at = time.time()
+        return self.articles
+
+    def state(self):
+        """What another process needs to serve this cache (see load())."""
+        return {"version": self.version, "fetched_at": self.fetched_at, "articles": self.articles}
+
+    def load(self, state):
+        """Adopts the cache of the process that does the fetching (API workers fetch nothing)."""
+        if state["version"] != self.version:
+            self.articles = state["articles"]
+            self.version = state["version"]
+        self.fetched_at = state["fetched_at"]
+
+    async def run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"DEBUG: News refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+
+    def get_cached_news(self, symbol=None, limit=5):
+        """Latest news from cache (fallback headlines if nothing fresh is cached)."""
+        if not self.articles or time.time() - self.fetched_at > self.ttl:
+            return FALLBACK_NEWS
+        articles = self.articles
+        if symbol:
+            base = symbol[:-4] if symbol.endswith("USDT") else symbol
+            articles = [a for a in articles if base in a["symbols"]]
+        return articles[:limit]
 
     async def fetch_latest_news(self):
         """Fetches latest crypto news and simple sentiment."""
+        if self.articles and time.time() - self.fetched_at <= self.refresh_interval:
+            return self.get_cached_news()
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.news_url)
-                data = response.json()
-                articles = data.get("Data", [])[:5]
-                
-                # Simple keyword-based sentiment for demonstration
-                # In production, use NLP or AI Decision Layer
-                processed_news = []
-                for art in articles:
-                    text = (art['title'] + art['body']).lower()
-                    sentiment = "NEUTRAL"
-                    if any(w in text for w in ["bullish", "jump", "high", "gain", "buy"]):
-                        sentiment = "POSITIVE"
-                    elif any(w in text for w in ["bearish", "drop", "low", "crash", "sell"]):
-                        sentiment = "NEGATIVE"
-                    
-                    processed_news.append({
-                        "title": art['title'],
-                        "sentiment": sentiment,
-                        "url": art['url']
-                    })
-                return processed_news
+            await self.refresh()
         except Exception:
-            return [
-                {"title": "🔴 BREAKING: FED meeting scheduled for Wednesday - Market expects 25bps hike.", "sentiment": "NEGATIVE", "source": "MacroScanner"},
-                {"title": "🚀 BTC whale just moved 5,000 coins to cold storage! #Bullish", "sentiment": "POSITIVE", "source": "Twitter"},
-                {"title": "Binance announces new SHIB/EUR pair for European traders.", "sentiment": "POSITIVE", "source": "News"},
-                {"title": "PEPE volume spikes 40% in last hour - Social engagement at ATH!", "sentiment": "POSITIVE", "source": "TwitterPulse"},
-                {"title": "Whale Alert: $300M USDT moved from Unknown wallet to Exchange.", "sentiment": "NEGATIVE", "source": "Twitter"},
-                {"title": "ETF Inflows hit record high this week as institutional demand surges.", "sentiment": "POSITIVE", "source": "CryptoPro"}
-            ]
-
-
+            pass
+        return self.get_cached_news()
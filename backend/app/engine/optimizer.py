@@ -0,0 +1,266 @@
+import hashlib
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from app.engine.backtest import Backtester
+from app.engine.risk_manager import RiskManager
+from app.engine.strategy import StrategyEngine
+
+# Tunable thresholds and where they live
+STRATEGY_PARAMS = ("ema_fast", "ema_slow", "signal_rsi", "trend_rsi_bull", "trend_rsi_bear", "target_pct", "stop_pct")
+RISK_PARAMS = ("stop_loss_distance", "take_profit_distance")
+
+DEFAULT_PARAMS = {
+    "ema_fast": 9,
+    "ema_slow": 21,
+    "signal_rsi": 50.0,
+    "trend_rsi_bull": 52.0,
+    "trend_rsi_bear": 48.0,
+    "target_pct": 6.0,
+    "stop_pct": 2.5,
+    "stop_loss_distance": 1.5,
+    "take_profit_distance": 3.0,
+}
+
+DEFAULT_GRID = {
+    "ema_fast": [5, 9, 12],
+    "ema_slow": [21, 26, 50],
+    "signal_rsi": [45.0, 50.0, 55.0],
+    "stop_loss_distance": [1.0, 1.5, 2.5],
+    "take_profit_distance": [2.0, 3.0, 5.0],
+}
+
+FIELDS = ("close", "high", "low")
+
+# Modules whose code decides a backtest result: their source is part of the cache key
+CODE_FILES = ("backtest.py", "batch_strategy.py", "harmonics.py", "indicators.py", "optimizer.py",
+              "risk_manager.py", "strategy.py")
+# Draws per requested parameter set before random_search gives up on an invalid space
+MAX_DRAWS_PER_ITER = 100
+_code_version = None
+
+
+def code_version():
+    """Hash of the strategy/risk/backtest sources (cached results are stale once they change)."""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        root = os.path.dirname(os.path.abspath(__file__))
+        for name in CODE_FILES:
+            with open(os.path.join(root, name), "rb") as f:
+                digest.update(name.encode() + b"\0" + f.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+# Worker-side view of the shared bars (set by _attach_worker)
+_worker_shm = None
+_worker_bars = None
+
+
+def _attach_worker(shm_name, n_bars):
+    """Process pool initializer: maps the shared bar matrix without copying it."""
+    global _worker_shm, _worker_bars
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_bars = np.ndarray((len(FIELDS), n_bars), dtype=np.float64, buffer=_worker_shm.buf)
+
+
+def run_backtest(bars, params, backtest_kwargs=None, start=0, end=None):
+    """Runs one backtest on bars[start:end] (a 3 x n close/high/low matrix) with `params`."""
+    merged = dict(DEFAULT_PARAMS, **params)
+    strategy = StrategyEngine(**{k: merged[k] for k in STRATEGY_PARAMS})
+    risk = RiskManager()
+    for k in RISK_PARAMS:
+        setattr(risk, k, merged[k])
+    frame = pd.DataFrame({field: bars[i, start:end] for i, field in enumerate(FIELDS)}, copy=False)
+    result = Backtester(strategy, risk, **(backtest_kwargs or {})).run(frame, mode="fast")
+    return result["summary"]
+
+
+def _worker_task(task):
+    params, backtest_kwargs, start, end = task
+    return run_backtest(_worker_bars, params, backtest_kwargs, start, end)
+
+
+class ResultCache:
+    """On-disk JSON cache of backtest summaries keyed by data + config hash."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key, value):
+        if not self.cache_dir:
+            return
+        tmp = self._path(key) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(value, f)
+        os.replace(tmp, self._path(key))
+
+
+class StrategyOptimizer:
+    """
+    Grid, random and walk-forward searches over the strategy/risk thresholds.
+
+    Bars are copied once into a shared memory block that every pool worker
+    maps; tasks only carry parameters and slice bounds. Results are cached on
+    disk so re-running an identical configuration costs nothing.
+    """
+
+    def __init__(self, bars: pd.DataFrame, max_workers=None, cache_dir=".optimizer_cache",
+                 objective="total_pnl", backtest_kwargs=None):
+        closes = bars["close"].to_numpy(dtype=np.float64)
+        matrix = np.stack([
+            closes,
+            bars["high"].to_numpy(dtype=np.float64) if "high" in bars else closes * 1.002,
+            bars["low"].to_numpy(dtype=np.float64) if "low" in bars else closes * 0.998,
+        ])
+        self.n_bars = len(closes)
+        self.max_workers = max_workers or os.cpu_count()
+        self.objective = objective
+        self.backtest_kwargs = backtest_kwargs or {}
+        self.cache = ResultCache(cache_dir)
+        self.data_hash = hashlib.sha256(matrix.tobytes()).hexdigest()
+
+        self.shm = shared_memory.SharedMemory(create=True, size=matrix.nbytes)
+        self.bars = np.ndarray(matrix.shape, dtype=np.float64, buffer=self.shm.buf)
+        self.bars[:] = matrix
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.pool:
+            self.pool.shutdown()
+            self.pool = None
+        if self.shm:
+            self.bars = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def _get_pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_attach_worker,
+                initargs=(self.shm.name, self.n_bars),
+            )
+        return self.pool
+
+    def _cache_key(self, params, start, end):
+        config = {
+            "code": code_version(),
+            "data": self.data_hash,
+            "params": dict(DEFAULT_PARAMS, **params),
+            "backtest": self.backtest_kwargs,
+            "slice": [start, end],
+        }
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+    def evaluate(self, param_sets, start=0, end=None):
+        """Backtests every parameter set on bars[start:end]; returns [{params, summary}]."""
+        end = self.n_bars if end is None else end
+        keys = [self._cache_key(p, start, end) for p in param_sets]
+        summaries = [self.cache.get(k) for k in keys]
+
+        missing = [i for i, s in enumerate(summaries) if s is None]
+        if missing:
+            tasks = [(param_sets[i], self.backtest_kwargs, start, end) for i in missing]
+            if self.max_workers > 1 and len(tasks) > 1:
+                chunksize = max(1, len(tasks) // (self.max_workers * 4))
+                computed = list(self._get_pool().map(_worker_task, tasks, chunksize=chunksize))
+            else:
+                computed = [run_backtest(self.bars, *task) for task in tasks]
+            for i, summary in zip(missing, computed):
+                summaries[i] = summary
+                self.cache.set(keys[i], summary)
+
+        return [{"params": p, "summary": s} for p, s in zip(param_sets, summaries)]
+
+    def _best(self, results):
+        return max(results, key=lambda r: r["summary"][self.objective])
+
+    def grid_search(self, grid=None, start=0, end=None):
+        grid = grid or DEFAULT_GRID
+        names = list(grid)
+        param_sets = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+        param_sets = [p for p in param_sets if self._valid(p)]
+        if not param_sets:
+            raise ValueError("No valid parameter set in the grid (ema_fast < ema_slow, trend_rsi_bear <= trend_rsi_bull)")
+        results = self.evaluate(param_sets, start, end)
+        return sorted(results, key=lambda r: r["summary"][self.objective], reverse=True)
+
+    def random_search(self, space=None, n_iter=50, seed=0, start=0, end=None):
+        """
+        Samples n_iter parameter sets; list values are choices, (lo, hi) tuples are ranges.
+        Stops after MAX_DRAWS_PER_ITER * n_iter draws (fewer sets when most are invalid)
+        and raises ValueError when the space has no valid set at all.
+        """
+        space = space or DEFAULT_GRID
+        rng = random.Random(seed)
+        param_sets = []
+        for _ in range(MAX_DRAWS_PER_ITER * n_iter):
+            if len(param_sets) >= n_iter:
+                break
+            params = {}
+            for name, values in space.items():
+                if isinstance(values, tuple):
+                    lo, hi = values
+                    params[name] = rng.randint(lo, hi) if isinstance(lo, int) else rng.uniform(lo, hi)
+                else:
+                    params[name] = rng.choice(values)
+            if self._valid(params):
+                param_sets.append(params)
+        if not param_sets:
+            raise ValueError("No valid parameter set in the search space (ema_fast < ema_slow, trend_rsi_bear <= trend_rsi_bull)")
+        results = self.evaluate(param_sets, start, end)
+        return sorted(results, key=lambda r: r["summary"][self.objective], reverse=True)
+
+    def walk_forward(self, grid=None, train_size=50000, test_size=10000, step=None):
+        """Optimizes on each training window and scores the winner on the following test window."""
+        step = step or test_size
+        folds = []
+        start = 0
+        while start + train_size + test_size <= self.n_bars:
+            train_end = start + train_size
+            best = self.grid_search(grid, start, train_end)[0]
+            test = self.evaluate([best["params"]], train_end, train_end + test_size)[0]
+            folds.append({
+                "train": [start, train_end],
+                "test": [train_end, train_end + test_size],
+                "params": best["params"],
+                "train_summary": best["summary"],
+                "test_summary": test["summary"],
+            })
+            start += step
+        return {
+            "folds": folds,
+            "test_pnl": sum(f["test_summary"]["total_pnl"] for f in folds),
+        }
+
+    @staticmethod
+    def _valid(params):
+        merged = dict(DEFAULT_PARAMS, **params)
+        return merged["ema_fast"] < merged["ema_slow"] and merged["trend_rsi_bear"] <= merged["trend_rsi_bull"]
@@ -0,0 +1,323 @@
+import asyncio
+import json
+import time
+import numpy as np
+from app.engine.binance_stream import BinanceStreamClient
+
+DEPTH_STREAM_URL = "wss://stream.binance.com:9443/stream?streams="
+# Bands (in basis points from mid) for the cumulative depth / imbalance features
+DEPTH_BANDS_BPS = (10, 25, 50, 100)
+
+
+class BookSide:
+    """
+    One side of a book as two parallel sorted arrays, best level LAST
+    (bids ascending, asks descending), so the frequent changes near the top
+    only shift a few trailing elements.
+    """
+
+    def __init__(self, is_bid, capacity=1000):
+        self.is_bid = is_bid
+        self.capacity = capacity
+        self.keys = np.empty(capacity)  # price for bids, -price for asks: always ascending
+        self.qty = np.empty(capacity)
+        self.n = 0
+
+    def clear(self):
+        self.n = 0
+
+    def load(self, levels):
+        """Replaces the side with [(price, qty)] (any order)."""
+        levels = [(float(p), float(q)) for p, q in levels if float(q) > 0]
+        sign = 1.0 if self.is_bid else -1.0
+        levels.sort(key=lambda level: sign * level[0])
+        levels = levels[-self.capacity:]
+        self.n = len(levels)
+        if self.n:
+            arr = np.array(levels)
+            self.keys[:self.n] = sign * arr[:, 0]
+            self.qty[:self.n] = arr[:, 1]
+
+    def set(self, price, qty):
+        """Sets (qty > 0) or removes (qty == 0) one price level."""
+        key = price if self.is_bid else -price
+        n = self.n
+        keys = self.keys
+        i = int(keys[:n].searchsorted(key))
+        if i < n and keys[i] == key:
+            if qty > 0:
+                self.qty[i] = qty
+            else:
+                keys[i:n - 1] = keys[i + 1:n]
+                self.qty[i:n - 1] = self.qty[i + 1:n]
+                self.n = n - 1
+            return
+        if qty <= 0:
+            return
+        if n == self.capacity:
+            if i == 0:
+                return  # worse than every level we keep
+            # Drop the worst level to make room
+            keys[:i - 1] = keys[1:i]
+            self.qty[:i - 1] = self.qty[1:i]
+            i -= 1
+        else:
+            keys[i + 1:n + 1] = keys[i:n]
+            self.qty[i + 1:n + 1] = self.qty[i:n]
+            self.n = n + 1
+        keys[i] = key
+        self.qty[i] = qty
+
+    def best(self):
+        if not self.n:
+            return None
+        key = float(self.keys[self.n - 1])
+        return key if self.is_bid else -key
+
+    def depth_to(self, limit_price):
+        """Cumulative quantity of levels at or better than limit_price."""
+        key = limit_price if self.is_bid else -limit_price
+        i = int(self.keys[:self.n].searchsorted(key))
+        return float(self.qty[i:self.n].sum())
+
+    def levels(self, n=10):
+        start = max(self.n - n, 0)
+        sign = 1.0 if self.is_bid else -1.0
+        return [(float(sign * k), float(q)) for k, q in zip(self.keys[start:self.n][::-1], self.qty[start:self.n][::-1])]
+
+
+class LocalOrderBook:
+    """
+    Binance local order book for one symbol: REST depth snapshot plus
+    diff-depth events (U/u sequence numbers). Events arriving before the
+    snapshot are buffered; a gap in the sequence marks the book unsynced
+    so the owner fetches a new snapshot. Features are recomputed once per
+    applied event, which keeps every query O(1) and lets other threads read
+    a consistent features dict.
+    """
+
+    def __init__(self, symbol, capacity=1000, bands_bps=DEPTH_BANDS_BPS, max_buffer=1000):
+        self.symbol = symbol
+        self.bids = BookSide(True, capacity)
+        self.asks = BookSide(False, capacity)
+        self.bands_bps = tuple(bands_bps)
+        self.last_update_id = None
+        self.synced = False
+        self.buffer = []
+        self.max_buffer = max_buffer
+        self.gaps = 0
+        self.updates = 0
+        self.updated_at = 0.0
+        self._features = None
+
+    def load_snapshot(self, snapshot):
+        """Applies a /api/v3/depth response, then any buffered events that follow it."""
+        self.bids.load(snapshot["bids"])
+        self.asks.load(snapshot["asks"])
+        self.last_update_id = snapshot["lastUpdateId"]
+        self.synced = True
+        self._features = self._compute_features()
+        buffered, self.buffer = self.buffer, []
+        for event in buffered:
+            if event["u"] <= self.last_update_id:
+                continue  # already contained in the snapshot
+            if not self.apply_diff(event):
+                break
+        return self.synced
+
+    def on_event(self, event):
+        """Entry point for every diff-depth event; returns False when a resync is needed."""
+        if not self.synced:
+            if len(self.buffer) >= self.max_buffer:
+                self.buffer.pop(0)
+            self.buffer.append(event)
+            return False
+        if event["u"] <= self.last_update_id:
+            return True  # stale
+        return self.apply_diff(event)
+
+    def apply_diff(self, event):
+        first, last = event["U"], event["u"]
+        if first > self.last_update_id + 1:
+            # Missed events: everything after this needs a fresh snapshot
+            self.synced = False
+            self.gaps += 1
+            self.buffer = [event]
+            return False
+        for price, qty in event["b"]:
+            self.bids.set(float(price), float(qty))
+        for price, qty in event["a"]:
+            self.asks.set(float(price), float(qty))
+        self.last_update_id = last
+        self.updates += 1
+        self.updated_at = time.time()
+        self._features = self._compute_features()
+        return True
+
+    def best_bid(self):
+        return self.bids.best()
+
+    def best_ask(self):
+        return self.asks.best()
+
+    def mid(self):
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2
+
+    def spread(self):
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return ask - bid
+
+    def _compute_features(self):
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        mid = (bid + ask) / 2
+        features = {
+            "bid": bid,
+            "ask": ask,
+            "bid_qty": float(self.bids.qty[self.bids.n - 1]),
+            "ask_qty": float(self.asks.qty[self.asks.n - 1]),
+            "spread": ask - bid,
+            "spread_bps": (ask - bid) / mid * 10_000,
+        }
+        for bps in self.bands_bps:
+            bid_depth = self.bids.depth_to(mid * (1 - bps / 10_000)) * mid
+            ask_depth = self.asks.depth_to(mid * (1 + bps / 10_000)) * mid
+            total = bid_depth + ask_depth
+            features[f"bid_depth_{bps}bps"] = bid_depth
+            features[f"ask_depth_{bps}bps"] = ask_depth
+            features[f"imbalance_{bps}bps"] = (bid_depth - ask_depth) / total if total else 0.0
+        return features
+
+    def features(self):
+        """Top of book, spread, depth (USDT notional) and imbalance per band; None if unsynced."""
+        return self._features if self.synced else None
+
+    def depth(self, bps):
+        """(bid, ask) cumulative notional within bps of mid."""
+        features = self.features()
+        if features and f"bid_depth_{bps}bps" in features:
+            return features[f"bid_depth_{bps}bps"], features[f"ask_depth_{bps}bps"]
+        mid = self.mid()
+        if mid is None:
+            return None
+        return self.bids.depth_to(mid * (1 - bps / 10_000)) * mid, self.asks.depth_to(mid * (1 + bps / 10_000)) * mid
+
+    def imbalance(self, bps=25):
+        depth = self.depth(bps)
+        if not depth or not sum(depth):
+            return 0.0
+        return (depth[0] - depth[1]) / (depth[0] + depth[1])
+
+
+class DepthStreamClient(BinanceStreamClient):
+    """
+    Combined <symbol>@depth streams routed to an OrderBookManager (market
+    stream reconnect/backoff). Events lost during a reconnect show up as a
+    sequence gap, which triggers the resync.
+    """
+
+    def __init__(self, symbols, manager, speed="@100ms", url=None, max_backoff=30.0):
+        streams = "/".join(f"{s.lower()}@depth{speed}" for s in symbols)
+        super().__init__(url=(url or DEPTH_STREAM_URL) + streams, max_backoff=max_backoff)
+        self.manager = manager
+
+    def handle_message(self, raw):
+        now_ms = time.time() * 1000
+        self.last_message = now_ms / 1000
+        msg = json.loads(raw)
+        data = msg.get("data", msg)
+        if data.get("e") != "depthUpdate":
+            return
+        self.manager.on_event(data)
+        self.latencies.append(now_ms - data["E"])
+
+
+class OrderBookManager:
+    """
+    Local books for the tracked symbols. Fetches depth snapshots through
+    BinanceManager (weight-accounted) whenever a book is new or out of sync.
+    """
+
+    def __init__(self, binance_mgr, limit=100, capacity=1000):
+        self.binance_mgr = binance_mgr
+        self.limit = limit
+        self.capacity = capacity
+        self.books = {}
+        self.resyncs = 0
+        self.streams = []
+        self._resyncing = set()
+
+    def book(self, symbol):
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = LocalOrderBook(symbol, self.capacity)
+        return book
+
+    def on_event(self, event):
+        book = self.book(event["s"])
+        if not book.on_event(event) and not book.synced:
+            self.request_resync(book.symbol)
+
+    def request_resync(self, symbol):
+        if symbol in self._resyncing:
+            return
+        self._resyncing.add(symbol)
+        asyncio.get_running_loop().create_task(self._resync(symbol))
+
+    async def _resync(self, symbol):
+        try:
+            _, snapshot = await self.binance_mgr._get_json(
+                "/api/v3/depth", {"symbol": symbol, "limit": self.limit}, weight=depth_weight(self.limit),
+            )
+            if snapshot is not None:
+                self.resyncs += 1
+                if not self.book(symbol).load_snapshot(snapshot):
+                    await asyncio.sleep(0.5)  # snapshot older than the buffered events: retry
+        except Exception as e:
+            print(f"DEBUG: Depth snapshot for {symbol} failed: {e}")
+            await asyncio.sleep(1.0)
+        finally:
+            self._resyncing.discard(symbol)
+        if not self.book(symbol).synced:
+            self.request_resync(symbol)
+
+    def start(self, symbols, session, speed="@100ms", per_connection=200):
+        for i in range(0, len(symbols), per_connection):
+            client = DepthStreamClient(symbols[i:i + per_connection], self, speed=speed)
+            client.start(session)
+            self.streams.append(client)
+
+    async def stop(self):
+        for client in self.streams:
+            await client.stop()
+        self.streams = []
+
+    def features(self, symbol):
+        book = self.books.get(symbol)
+        return book.features() if book else None
+
+    def status(self):
+        return {
+            "books": len(self.books),
+            "synced": sum(book.synced for book in self.books.values()),
+            "resyncs": self.resyncs,
+            "gaps": sum(book.gaps for book in self.books.values()),
+            "updates": sum(book.updates for book in self.books.values()),
+        }
+
+
+def depth_weight(limit):
+    """Binance spot /api/v3/depth request weight for a given limit."""
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
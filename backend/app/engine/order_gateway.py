@@ -0,0 +1,325 @@
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlencode
+import aiohttp
+from yarl import URL
+from app.engine.rate_limit import TokenBucket
+
+# Binance USDⓈ-M futures costs per endpoint against each limit:
+# IP weight (2400/min), orders per 10s (300) and orders per minute (1200)
+ENDPOINT_COSTS = {
+    ("POST", "/fapi/v1/order"): {"weight": 0, "orders_10s": 1, "orders_1m": 1},
+    ("POST", "/fapi/v1/batchOrders"): {"weight": 5, "orders_10s": 5, "orders_1m": 1},
+    ("DELETE", "/fapi/v1/order"): {"weight": 1},
+    ("GET", "/fapi/v1/order"): {"weight": 1},
+    ("POST", "/fapi/v1/leverage"): {"weight": 1},
+}
+MAX_BATCH_ORDERS = 5
+DUPLICATE_CLIENT_ORDER_ID = -4116
+UNKNOWN_ORDER = -2013
+
+
+class OrderError(Exception):
+    def __init__(self, code, msg, client_order_id=None):
+        super().__init__(f"{code}: {msg}")
+        self.code = code
+        self.msg = msg
+        self.client_order_id = client_order_id
+
+
+class OrderGateway:
+    """
+    Order routing for Binance USDⓈ-M futures.
+    HMAC-SHA256 signed requests over one pooled session, token buckets per
+    exchange limit charged with each endpoint's cost, batch orders (5 per
+    request) and an in-flight order book keyed by newClientOrderId so a
+    retried submit never opens a second position. Without API keys every
+    call is simulated locally. `limit_share` scales the buckets when several
+    processes (API workers) trade from the same IP and account.
+    """
+
+    def __init__(self, api_key=None, api_secret=None, base_url=None, recv_window=5000, timeout=10.0, max_orders=10000,
+                 limit_share=1.0):
+        self.api_key = api_key or os.getenv("BINANCE_API_KEY")
+        self.api_secret = api_secret or os.getenv("BINANCE_API_SECRET")
+        self.base_url = base_url or os.getenv("BINANCE_FUTURES_BASE_URL", "https://fapi.binance.com")
+        self.recv_window = recv_window
+        self.timeout = timeout
+        self.simulated = not (self.api_key and self.api_secret)
+        self.session = None
+        self.buckets = {
+            "weight": TokenBucket(2400 / 60 * limit_share, 2400 * limit_share),
+            "orders_10s": TokenBucket(300 / 10 * limit_share, 300 * limit_share),
+            "orders_1m": TokenBucket(1200 / 60 * limit_share, 1200 * limit_share),
+        }
+        self.orders = OrderedDict()  # {client_order_id: order record}, oldest first
+        self.max_orders = max_orders
+        self.pending = {}  # {client_order_id: Future} while a submit is in flight
+        self.leverage = {}  # {symbol: leverage last set on the exchange}
+        self.exchange_limits = {}  # latest X-MBX-* usage headers
+        self._sim_ids = itertools.count(10_000_000)
+
+    async def init_client(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"X-MBX-APIKEY": self.api_key or ""},
+            )
+        return self.session
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    def sign(self, params):
+        """Query string with timestamp, recvWindow and the HMAC-SHA256 signature appended."""
+        params = dict(params, timestamp=int(time.time() * 1000), recvWindow=self.recv_window)
+        query = urlencode(params)
+        signature = hmac.new(self.api_secret.encode(), query.encode(), hashlib.sha256).hexdigest()
+        return f"{query}&signature={signature}"
+
+    async def _throttle(self, method, path):
+        for limit, cost in ENDPOINT_COSTS.get((method, path), {"weight": 1}).items():
+            if cost:
+                await self.buckets[limit].acquire(cost)
+
+    async def _request(self, method, path, params):
+        await self._throttle(method, path)
+        session = await self.init_client()
+        # encoded=True: the query must reach the exchange byte-for-byte as signed
+        url = URL(f"{self.base_url}{path}?{self.sign(params)}", encoded=True)
+        async with session.request(method, url) as response:
+            self.exchange_limits.update({k: v for k, v in response.headers.items() if k.upper().startswith("X-MBX-")})
+            if response.status >= 500:
+                # 5xx: the exchange does not know whether the request was executed
+                raise aiohttp.ClientResponseError(response.request_info, response.history,
+                                                  status=response.status, message=response.reason or "")
+            data = await response.json(content_type=None)
+        if isinstance(data, dict) and "code" in data and data["code"] != 200 and "orderId" not in data:
+            raise OrderError(data["code"], data.get("msg", ""))
+        return data
+
+    @staticmethod
+    def new_client_order_id():
+        return f"tb-{uuid.uuid4().hex[:24]}"
+
+    @staticmethod
+    def _order_params(order):
+        """Maps our order dict onto Binance parameters (string values, no None)."""
+        params = {
+            "symbol": order["symbol"],
+            "side": order["side"],
+            "type": order.get("type", "MARKET"),
+            "newClientOrderId": order["client_order_id"],
+        }
+        for key, name in (("quantity", "quantity"), ("price", "price"), ("stop_price", "stopPrice"),
+                          ("time_in_force", "timeInForce"), ("reduce_only", "reduceOnly"),
+                          ("position_side", "positionSide")):
+            value = order.get(key)
+            if value is not None:
+                params[name] = str(value).lower() if isinstance(value, bool) else str(value)
+        if params["type"] == "LIMIT" and "timeInForce" not in params:
+            params["timeInForce"] = "GTC"
+        return params
+
+    def _track(self, order):
+        """Registers an order; returns (record, future of an identical in-flight submit or None)."""
+        if not order.get("client_order_id"):
+            order["client_order_id"] = self.new_client_order_id()
+        cid = order["client_order_id"]
+        record = self.orders.get(cid)
+        if record is not None:
+            return record, self.pending.get(cid)
+        record = self.orders[cid] = {
+            "client_order_id": cid,
+            "request": dict(order),
+            "status": "PENDING",
+            "submitted_at": time.time(),
+            "response": None,
+            "error": None,
+        }
+        self.pending[cid] = asyncio.get_running_loop().create_future()
+        while len(self.orders) > self.max_orders:
+            oldest = next(iter(self.orders))
+            if oldest in self.pending:
+                break
+            self.orders.popitem(last=False)
+        return record, None
+
+    def _resolve(self, record, response=None, error=None):
+        cid = record["client_order_id"]
+        if error is not None:
+            record["status"] = "REJECTED"
+            record["error"] = {"code": error.code, "msg": error.msg}
+        else:
+            record["status"] = response.get("status", "NEW")
+            record["response"] = response
+        future = self.pending.pop(cid, None)
+        if future is not None and not future.done():
+            if error is not None:
+                future.set_exception(error)
+                future.exception()  # retrieved: callers that never awaited it don't log a warning
+            else:
+                future.set_result(response)
+
+    def _existing(self, record, in_flight):
+        """Result for a client order id that was already submitted."""
+        if in_flight is not None:
+            return in_flight
+        future = asyncio.get_running_loop().create_future()
+        if record["error"]:
+            future.set_exception(OrderError(record["error"]["code"], record["error"]["msg"], record["client_order_id"]))
+        else:
+            future.set_result(record["response"])
+        return future
+
+    def _simulate(self, order):
+        return {
+            "orderId": next(self._sim_ids),
+            "clientOrderId": order["client_order_id"],
+            "symbol": order["symbol"],
+            "side": order["side"],
+            "type": order.get("type", "MARKET"),
+            "origQty": str(order.get("quantity", "0")),
+            "status": "NEW",
+            "updateTime": int(time.time() * 1000),
+            "simulated": True,
+        }
+
+    async def query_order(self, symbol, client_order_id):
+        return await self._request("GET", "/fapi/v1/order", {"symbol": symbol, "origClientOrderId": client_order_id})
+
+    async def _reconcile(self, order, error):
+        """After a duplicate id or a lost response, the exchange's copy of the order wins."""
+        try:
+            return await self.query_order(order["symbol"], order["client_order_id"])
+        except OrderError as e:
+            if e.code == UNKNOWN_ORDER:
+                raise error
+            raise
+
+    async def submit(self, order):
+        """
+        Places one order: {"symbol", "side", "type"?, "quantity"?, "price"?, "client_order_id"?, ...}.
+        Submitting the same client_order_id again returns the original result.
+        """
+        record, in_flight = self._track(order)
+        if record["status"] != "PENDING" or in_flight is not None:
+            return await self._existing(record, in_flight)
+        if self.simulated:
+            response = self._simulate(order)
+            self._resolve(record, response)
+            return response
+        try:
+            try:
+                response = await self._request("POST", "/fapi/v1/order", self._order_params(order))
+            except OrderError as e:
+                if e.code != DUPLICATE_CLIENT_ORDER_ID:
+                    raise
+                response = await self._reconcile(order, e)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Unknown outcome: the order may have reached the book
+                response = await self._reconcile(order, OrderError(-1, f"Request failed: {e}"))
+        except OrderError as e:
+            e.client_order_id = record["client_order_id"]
+            self._resolve(record, error=e)
+            raise
+        except Exception as e:
+            self._resolve(record, error=OrderError(-1, str(e)))
+            raise OrderError(-1, str(e), record["client_order_id"]) from e
+        self._resolve(record, response)
+        return response
+
+    async def _submit_chunk(self, chunk):
+        try:
+            data = await self._request("POST", "/fapi/v1/batchOrders", {
+                "batchOrders": json.dumps([self._order_params(o) for _, o in chunk], separators=(",", ":")),
+            })
+        except Exception as e:
+            error = e if isinstance(e, OrderError) else OrderError(-1, str(e))
+            for record, _ in chunk:
+                self._resolve(record, error=OrderError(error.code, error.msg, record["client_order_id"]))
+            return
+        if not isinstance(data, list):
+            data = []
+        for (record, order), item in zip(chunk, data):
+            if "orderId" in item:
+                self._resolve(record, item)
+            elif item.get("code") == DUPLICATE_CLIENT_ORDER_ID:
+                try:
+                    self._resolve(record, await self._reconcile(order, OrderError(item["code"], item.get("msg", ""))))
+                except OrderError as e:
+                    self._resolve(record, error=e)
+            else:
+                self._resolve(record, error=OrderError(item.get("code", -1), item.get("msg", ""), record["client_order_id"]))
+        # A short response must not leave the remaining callers waiting forever
+        for record, _ in chunk[len(data):]:
+            self._resolve(record, error=OrderError(-1, "No result for this order in the batchOrders response",
+                                                   record["client_order_id"]))
+
+    async def submit_batch(self, orders):
+        """
+        Places many orders through /fapi/v1/batchOrders (5 per request, chunks
+        sent concurrently). Returns one response or OrderError per order, in order.
+        """
+        futures, fresh = [], []
+        for order in orders:
+            record, in_flight = self._track(order)
+            if record["status"] != "PENDING" or in_flight is not None:
+                futures.append(self._existing(record, in_flight))
+            else:
+                futures.append(self.pending[record["client_order_id"]])
+                fresh.append((record, order))
+        if self.simulated:
+            for record, order in fresh:
+                self._resolve(record, self._simulate(order))
+        elif fresh:
+            chunks = [fresh[i:i + MAX_BATCH_ORDERS] for i in range(0, len(fresh), MAX_BATCH_ORDERS)]
+            await asyncio.gather(*(self._submit_chunk(chunk) for chunk in chunks))
+        return list(await asyncio.gather(*futures, return_exceptions=True))
+
+    async def cancel(self, symbol, client_order_id):
+        if self.simulated:
+            response = {"clientOrderId": client_order_id, "symbol": symbol, "status": "CANCELED", "simulated": True}
+        else:
+            response = await self._request("DELETE", "/fapi/v1/order", {"symbol": symbol, "origClientOrderId": client_order_id})
+        record = self.orders.get(client_order_id)
+        if record is not None:
+            record["status"] = response.get("status", "CANCELED")
+            record["response"] = response
+        return response
+
+    async def set_leverage(self, symbol, leverage):
+        """Changes initial leverage only when it differs from what was last set."""
+        leverage = int(leverage)
+        if self.leverage.get(symbol) == leverage:
+            return {"symbol": symbol, "leverage": leverage}
+        if self.simulated:
+            response = {"symbol": symbol, "leverage": leverage, "simulated": True}
+        else:
+            response = await self._request("POST", "/fapi/v1/leverage", {"symbol": symbol, "leverage": leverage})
+        self.leverage[symbol] = leverage
+        return response
+
+    def in_flight(self):
+        return [self.orders[cid] for cid in self.pending if cid in self.orders]
+
+    def snapshot(self, limit=50):
+        recent = list(self.orders.values())[-limit:]
+        return {
+            "simulated": self.simulated,
+            "in_flight": len(self.pending),
+            "tracked": len(self.orders),
+            "limits": {name: bucket.snapshot() for name, bucket in self.buckets.items()},
+            "exchange_limits": self.exchange_limits,
+            "orders": recent,
+        }
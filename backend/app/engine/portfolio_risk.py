@@ -0,0 +1,219 @@
+import numpy as np
+from app.engine.risk_manager import RiskManager
+
+HOLD, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT = 0, 1, 2
+EXIT_NAMES = {HOLD: "HOLD", EXIT_STOP_LOSS: "EXIT_STOP_LOSS", EXIT_TAKE_PROFIT: "EXIT_TAKE_PROFIT"}
+TREND_CODES = {"BULLISH": 1, "BEARISH": -1}
+
+
+class PortfolioRiskEngine:
+    """
+    Risk for many open positions at once.
+    Positions live in a dense struct-of-arrays table (closing one moves the
+    last row into its slot), prices and trends in per-symbol arrays, so each
+    tick is a fixed number of NumPy passes over the table: mark-to-market,
+    dynamic/trailing stops (RiskManager rules, both sides), TP/SL exits,
+    exposure per asset and margin / liquidation distance.
+    """
+
+    COLUMNS = {
+        "id": np.int64,
+        "symbol": np.int32,
+        "side": np.float64,  # +1 long, -1 short (float: no casts in the tick math)
+        "qty": np.float64,
+        "entry": np.float64,
+        "leverage": np.float64,
+        "stop": np.float64,  # effective stop: ratchets, never looser than user_stop
+        "user_stop": np.float64,  # stop given at open (or the default distance), never moved
+        "take_profit": np.float64,
+        "closing": np.bool_,  # exit order in flight, not re-triggered
+    }
+
+    def __init__(self, risk_manager=None, capacity=1024, maintenance_margin=0.004):
+        self.risk = risk_manager or RiskManager()
+        self.maintenance_margin = maintenance_margin
+        self.capacity = capacity
+        self.n = 0
+        self.table = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self.slot_of = {}  # {position id: row}
+        self.next_id = 1
+        self.symbols = {}  # {symbol: index}
+        self.symbol_names = []
+        self.prices = np.full(16, np.nan)
+        self.trends = np.zeros(16, dtype=np.int8)
+        self.state = None  # last computed per-position arrays
+
+    def _symbol(self, symbol):
+        idx = self.symbols.get(symbol)
+        if idx is None:
+            idx = self.symbols[symbol] = len(self.symbol_names)
+            self.symbol_names.append(symbol)
+            if idx >= len(self.prices):
+                self.prices = np.concatenate([self.prices, np.full(len(self.prices), np.nan)])
+                self.trends = np.concatenate([self.trends, np.zeros(len(self.trends), dtype=np.int8)])
+        return idx
+
+    def _grow(self):
+        self.capacity *= 2
+        for name, column in self.table.items():
+            grown = np.zeros(self.capacity, dtype=column.dtype)
+            grown[:self.n] = column[:self.n]
+            self.table[name] = grown
+
+    def open_position(self, symbol, side, qty, entry_price, leverage=1.0, stop_loss=None, take_profit=None):
+        """Adds a position (side "BUY"/"LONG" or "SELL"/"SHORT") and returns its id."""
+        if self.n == self.capacity:
+            self._grow()
+        direction = 1 if str(side).upper() in ("BUY", "LONG") else -1
+        if stop_loss is None:
+            stop_loss = entry_price * (1 - direction * self.risk.stop_loss_distance / 100)
+        if take_profit is None:
+            take_profit = entry_price * (1 + direction * self.risk.take_profit_distance / 100)
+        pid = self.next_id
+        self.next_id += 1
+        row = self.n
+        t = self.table
+        t["id"][row] = pid
+        t["symbol"][row] = self._symbol(symbol)
+        t["side"][row] = direction
+        t["qty"][row] = qty
+        t["entry"][row] = entry_price
+        t["leverage"][row] = leverage
+        t["stop"][row] = stop_loss
+        t["user_stop"][row] = stop_loss
+        t["take_profit"][row] = take_profit
+        t["closing"][row] = False
+        self.slot_of[pid] = row
+        self.n += 1
+        return pid
+
+    def close_position(self, pid):
+        row = self.slot_of.pop(pid, None)
+        if row is None:
+            return False
+        last = self.n - 1
+        if row != last:
+            for column in self.table.values():
+                column[row] = column[last]
+            self.slot_of[int(self.table["id"][row])] = row
+        self.n -= 1
+        return True
+
+    def mark_closing(self, pids, closing=True):
+        for pid in pids:
+            row = self.slot_of.get(pid)
+            if row is not None:
+                self.table["closing"][row] = closing
+
+    def update_prices(self, prices, trends=None):
+        """prices: {symbol: price}; trends: {symbol: "BULLISH"/"BEARISH"/"SIDEWAYS"}."""
+        for symbol, price in prices.items():
+            self.prices[self._symbol(symbol)] = price
+        if trends:
+            for symbol, trend in trends.items():
+                self.trends[self._symbol(symbol)] = TREND_CODES.get(trend, 0)
+
+    def on_tick(self, prices, trends=None):
+        """Applies a tick and recomputes every position; returns the new exits."""
+        self.update_prices(prices, trends)
+        return self.recompute()
+
+    def recompute(self):
+        n = self.n
+        t = {name: column[:n] for name, column in self.table.items()}
+        side = t["side"]
+        entry = t["entry"]
+        mark = self.prices[t["symbol"]]
+        priced = ~np.isnan(mark)
+        mark = np.where(priced, mark, entry)
+
+        move = side * (mark - entry)
+        pnl = move * t["qty"]
+        profit_pct = move / entry * 100
+
+        # RiskManager.get_dynamic_stop_loss for both sides: break-even+0.2% once 1% up,
+        # 1% trailing stop when the trend runs with the position and it is 2% up.
+        # Below 1% the position's own stop stands in for the fixed-distance stop,
+        # so a wider stop given at open is kept until the position is in profit.
+        suggested = np.where(profit_pct > 1.0, entry * (1 + side * 0.002), t["user_stop"])
+        trailing = (self.trends[t["symbol"]] == side) & (profit_pct > 2.0)
+        suggested = np.where(trailing, mark * (1 - side * 0.01), suggested)
+        # Stops only ever tighten (max for longs, min for shorts, via the sign)
+        stop = t["stop"]
+        np.multiply(side, np.maximum(side * stop, side * suggested), out=stop)
+
+        # RiskManager.evaluate_exit, mirrored for shorts
+        hit_stop = side * (mark - stop) <= 0
+        hit_target = side * (mark - t["take_profit"]) >= 0
+        exit_code = np.where(hit_stop, EXIT_STOP_LOSS, np.where(hit_target, EXIT_TAKE_PROFIT, HOLD)).astype(np.int8)
+        exit_code[~priced] = HOLD
+
+        # Isolated margin: liquidation where equity falls to the maintenance margin
+        notional = t["qty"] * mark
+        margin = t["qty"] * entry / t["leverage"]
+        liquidation = entry * (1 - side * (1 / t["leverage"] - self.maintenance_margin))
+        liquidation_distance = side * (mark - liquidation) / mark * 100
+        margin_ratio = (self.maintenance_margin * notional) / np.maximum(margin + pnl, 1e-12)
+
+        self.state = {
+            "mark": mark,
+            "pnl": pnl,
+            "profit_pct": profit_pct,
+            "exit": exit_code,
+            "notional": notional,
+            "margin": margin,
+            "liquidation": liquidation,
+            "liquidation_distance": liquidation_distance,
+            "margin_ratio": margin_ratio,
+        }
+        triggered = np.flatnonzero((exit_code != HOLD) & ~t["closing"])
+        # tolist(): plain ints, no per-element NumPy scalar boxing when many exits fire at once
+        return [(pid, EXIT_NAMES[code]) for pid, code in zip(t["id"][triggered].tolist(), exit_code[triggered].tolist())]
+
+    def exposure(self):
+        """Net and gross notional per symbol (np.bincount over the table)."""
+        if self.state is None or self.n == 0:
+            return {}
+        symbols = self.table["symbol"][:self.n]
+        signed = self.state["notional"] * self.table["side"][:self.n]
+        size = len(self.symbol_names)
+        net = np.bincount(symbols, weights=signed, minlength=size)
+        gross = np.bincount(symbols, weights=self.state["notional"], minlength=size)
+        return {
+            self.symbol_names[i]: {"net": float(net[i]), "gross": float(gross[i])}
+            for i in np.flatnonzero(gross)
+        }
+
+    def position(self, pid):
+        row = self.slot_of.get(pid)
+        if row is None:
+            return None
+        t = self.table
+        result = {
+            "id": pid,
+            "symbol": self.symbol_names[t["symbol"][row]],
+            "side": "LONG" if t["side"][row] > 0 else "SHORT",
+            "qty": float(t["qty"][row]),
+            "entry_price": float(t["entry"][row]),
+            "leverage": float(t["leverage"][row]),
+            "stop_loss": float(t["stop"][row]),
+            "user_stop_loss": float(t["user_stop"][row]),
+            "take_profit": float(t["take_profit"][row]),
+            "closing": bool(t["closing"][row]),
+        }
+        if self.state is not None and row < len(self.state["pnl"]):
+            for key in ("mark", "pnl", "profit_pct", "liquidation", "liquidation_distance", "margin_ratio"):
+                result[key] = float(self.state[key][row])
+            result["exit"] = EXIT_NAMES[int(self.state["exit"][row])]
+        return result
+
+    def summary(self, limit=100):
+        self.recompute()  # rows may have moved since the last tick
+        positions = [self.position(int(pid)) for pid in self.table["id"][:min(self.n, limit)]]
+        total_pnl = float(self.state["pnl"].sum()) if self.state is not None and self.n else 0.0
+        return {
+            "open_positions": self.n,
+            "total_pnl": total_pnl,
+            "exposure": self.exposure(),
+            "positions": positions,
+        }
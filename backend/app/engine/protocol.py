@@ -0,0 +1,90 @@
+import json
+
+# Optional faster/binary encoders
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+PROTOCOL_VERSION = 2
+ENCODINGS = ("json", "orjson", "msgpack")
+# Fields that change on every tick whatever the market does: they never make a
+# symbol "changed" on their own, but ride along when something else changed
+VOLATILE_FIELDS = ("timestamp",)
+
+
+def available_encoding(encoding):
+    """Falls back to plain JSON when the requested encoder is not installed."""
+    if encoding == "orjson" and orjson is not None:
+        return "orjson"
+    if encoding == "msgpack" and msgpack is not None:
+        return "msgpack"
+    return "json"
+
+
+class DeltaEncoder:
+    """
+    Per-client protocol v2 encoder.
+    Sends every changed symbol of a tick in one frame, with only the fields
+    that changed since the last frame this client received (volatile fields
+    such as the timestamp are sent along but do not count as a change).
+    Fields a payload no longer has are listed under "removed". Every
+    `snapshot_every` frames a full snapshot is sent so clients can resync.
+
+    Frame: {"v": 2, "type": "snapshot" | "delta", "seq": n,
+            "symbols": {symbol: {field: value}},
+            "removed": {symbol: [field, ...]} (optional, deltas only),
+            "news": [...] (optional)}
+    """
+
+    def __init__(self, encoding="json", snapshot_every=30, volatile=VOLATILE_FIELDS):
+        self.encoding = available_encoding(encoding)
+        self.snapshot_every = snapshot_every
+        self.volatile = frozenset(volatile)
+        self.state = {}  # {symbol: last payload sent}
+        self.seq = 0
+
+    def build_frame(self, tick, news=None):
+        """Returns the frame dict for a tick, or None if nothing changed."""
+        full = self.seq % self.snapshot_every == 0
+        changed = {}
+        removed = {}
+        for symbol, payload in tick.items():
+            last = self.state.get(symbol)
+            if last is None:
+                diff = payload
+            else:
+                diff = {k: v for k, v in payload.items() if k not in self.volatile and (k not in last or last[k] != v)}
+                gone = [k for k in last if k not in payload]
+                if gone:
+                    removed[symbol] = gone
+                if diff:
+                    diff.update((k, payload[k]) for k in self.volatile if k in payload)
+            if diff:
+                changed[symbol] = diff
+            self.state[symbol] = payload
+
+        if full:
+            frame = {"v": PROTOCOL_VERSION, "type": "snapshot", "seq": self.seq, "symbols": dict(self.state)}
+        elif changed or removed or news is not None:
+            frame = {"v": PROTOCOL_VERSION, "type": "delta", "seq": self.seq, "symbols": changed}
+            if removed:
+                frame["removed"] = removed
+        else:
+            return None
+        if news is not None:
+            frame["news"] = news
+        self.seq += 1
+        return frame
+
+    def encode(self, frame):
+        """Serializes a frame. Returns (data, is_binary)."""
+        if self.encoding == "msgpack":
+            return msgpack.packb(frame, use_bin_type=True), True
+        if self.encoding == "orjson":
+            return orjson.dumps(frame), True
+        return json.dumps(frame), False
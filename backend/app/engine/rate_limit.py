@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+
+class RequestWeightTracker:
+    """
+    Tracks Binance request weight per 1-minute window.
+    Local estimates are reserved before each call and corrected from the
+    X-MBX-USED-WEIGHT-1M response header; callers wait for the next window
+    instead of crossing the limit.
+    """
+
+    def __init__(self, limit=6000, header="X-MBX-USED-WEIGHT-1M", safety=0.9):
+        self.limit = limit
+        self.header = header
+        self.budget = int(limit * safety)
+        self.window = self._window()
+        self.used = 0
+        self.total = 0  # weight spent since start
+        self.waits = 0
+
+    @staticmethod
+    def _window():
+        return int(time.time() // 60)
+
+    def _roll(self):
+        window = self._window()
+        if window != self.window:
+            self.window = window
+            self.used = 0
+
+    async def acquire(self, weight):
+        self._roll()
+        while self.used + weight > self.budget:
+            self.waits += 1
+            await asyncio.sleep(60 - time.time() % 60 + 0.05)
+            self._roll()
+        self.used += weight
+        self.total += weight
+
+    def update_from_headers(self, headers):
+        value = headers.get(self.header)
+        if value is not None:
+            self._roll()
+            self.used = max(self.used, int(value))
+
+    def snapshot(self):
+        self._roll()
+        return {"used_1m": self.used, "limit_1m": self.limit, "total": self.total, "waits": self.waits}
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second refill up to `capacity`.
+    acquire() waits until enough tokens are available, so bursts are allowed
+    up to capacity while the sustained rate stays under the limit.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waits = 0
+        self._lock = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens=1):
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of {self.capacity}")
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:  # FIFO: a large request is not starved by small ones
+            while not self.try_acquire(tokens):
+                self.waits += 1
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+    def snapshot(self):
+        self._refill()
+        return {"tokens": round(self.tokens, 2), "capacity": self.capacity, "rate": self.rate, "waits": self.waits}
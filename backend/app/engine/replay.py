@@ -0,0 +1,108 @@
+import asyncio
+import json
+import time
+from app.engine.binance_client import BinanceManager
+
+
+class TickRecorder:
+    """
+    Appends every ticker poll to a JSONL file: {"ts": ms, "tickers": [...]}
+    per line, in the same shape the snapshot streams yield.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "a", buffering=1024 * 1024)
+        self.records = 0
+
+    def record(self, snapshot, ts=None):
+        ts = int(time.time() * 1000) if ts is None else ts
+        self.file.write(json.dumps({"ts": ts, "tickers": snapshot}, separators=(",", ":")) + "\n")
+        self.records += 1
+
+    def close(self):
+        self.file.close()
+
+
+def load_recording(path):
+    """Reads a TickRecorder file into [(ts, tickers)]."""
+    frames = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                frame = json.loads(line)
+                frames.append((frame["ts"], frame["tickers"]))
+    return frames
+
+
+def parse_speed(value):
+    """'1', '100', '1x', '100x' -> multiplier; 'max' or 0 -> None (no pacing)."""
+    value = str(value).strip().lower().rstrip("x")
+    if value in ("max", "", "0"):
+        return None
+    return float(value)
+
+
+class ReplayBinanceManager(BinanceManager):
+    """
+    Drop-in BinanceManager that serves a recorded session instead of the
+    exchange, for load tests and reproducible runs. speed=1.0 keeps the
+    recorded timing, 100.0 plays it 100x faster and None as fast as the
+    consumer reads.
+    """
+
+    def __init__(self, path, speed=1.0, loop=True):
+        super().__init__()
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.frames = load_recording(path)
+        if not self.frames:
+            raise ValueError(f"Recording {path} is empty")
+        self.position = 0
+        self.replayed = 0
+
+    async def init_client(self):
+        return None
+
+    async def close(self):
+        return None
+
+    async def get_top_usdt_pairs(self, limit=100):
+        symbols = [t["symbol"] for t in self.frames[0][1]]
+        return symbols[:limit] if limit else symbols
+
+    def _next_frame(self):
+        if self.position >= len(self.frames):
+            if not self.loop:
+                return None
+            self.position = 0
+        frame = self.frames[self.position]
+        self.position += 1
+        return frame
+
+    async def get_latest_prices_rest(self, symbols):
+        frame = self._next_frame() or self.frames[-1]
+        prices = {t["symbol"]: float(t["price"]) for t in frame[1]}
+        return {s: prices.get(s, 1.0) for s in symbols}
+
+    async def get_snapshot_stream(self, symbols=None):
+        """Yields recorded polls (filtered to symbols) paced by the recorded timestamps."""
+        wanted = set(symbols) if symbols else None
+        previous_ts = None
+        while True:
+            frame = self._next_frame()
+            if frame is None:
+                return
+            ts, tickers = frame
+            if self.speed and previous_ts is not None and ts > previous_ts:
+                await asyncio.sleep((ts - previous_ts) / 1000 / self.speed)
+            else:
+                await asyncio.sleep(0)  # let other tasks run at max speed
+            previous_ts = ts
+            self.replayed += 1
+            yield tickers if wanted is None else [t for t in tickers if t["symbol"] in wanted]
+
+    async def get_live_snapshot_stream(self, symbols=None, interval=0.5):
+        async for snapshot in self.get_snapshot_stream(symbols):
+            yield snapshot
@@ -1,3 +1,5 @@
+import numpy as np
+
 class RiskManager:
     def __init__(self, risk_per_trade_percent=2.0):
         self.risk_per_trade_percent = risk_per_trade_percent
@@ -35,6 +37,19 @@ class RiskManager:
 
         return suggested_sl
 
+    def get_dynamic_stop_loss_array(self, entry_price, market_trends, current_prices):
+        """Vectorized get_dynamic_stop_loss over arrays of trends/prices (same rules)."""
+        current_prices = np.asarray(current_prices, dtype=np.float64)
+        current_profit = (current_prices - entry_price) / entry_price * 100
+
+        suggested_sl = np.where(
+            current_profit > 1.0,
+            entry_price * (1 + 0.002),
+            entry_price * (1 - (self.stop_loss_distance / 100)),
+        )
+        trailing = (np.asarray(market_trends) == "BULLISH") & (current_profit > 2.0)
+        return np.where(trailing, current_prices * 0.99, suggested_sl)
+
     def evaluate_exit(self, current_price, stop_loss, take_profit):
         """Checks if we should exit based on SL or TP."""
         if current_price <= stop_loss:
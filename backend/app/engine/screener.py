@@ -0,0 +1,128 @@
+import bisect
+import math
+import threading
+
+# Indexed metrics (every one gets its own sorted index)
+SCREENER_METRICS = ("change_pct", "rsi", "macd_hist", "confidence", "volatility", "volume")
+# Non-numeric attributes that can be filtered on by equality
+SCREENER_ATTRIBUTES = ("signal", "trend")
+
+
+class MarketScreener:
+    """
+    Incrementally maintained rankings of the tracked universe.
+    Each metric has a sorted list of (value, symbol); a tick moves a symbol
+    with two bisect operations per changed metric, and a top/bottom-K query
+    walks the index from one end, so nothing rescans the universe.
+    """
+
+    def __init__(self, metrics=SCREENER_METRICS):
+        self.metrics = tuple(metrics)
+        self.indexes = {metric: [] for metric in self.metrics}
+        self.rows = {}  # {symbol: {metric: value, "signal", "trend"}}
+        self.lock = threading.Lock()  # ticks update from the strategy thread, queries run on the loop
+
+    def _move(self, metric, symbol, old, new):
+        index = self.indexes[metric]
+        if old is not None:
+            i = bisect.bisect_left(index, (old, symbol))
+            if i < len(index) and index[i] == (old, symbol):
+                del index[i]
+        if new is not None:
+            bisect.insort(index, (new, symbol))
+
+    def update(self, symbol, values):
+        """values: {metric: number or None, "signal": str, "trend": str} (missing keys unchanged)."""
+        with self.lock:
+            self._update(symbol, values)
+
+    def update_many(self, rows):
+        """{symbol: values} for a whole tick under one lock."""
+        with self.lock:
+            for symbol, values in rows.items():
+                self._update(symbol, values)
+
+    def _update(self, symbol, values):
+        row = self.rows.get(symbol)
+        if row is None:
+            row = self.rows[symbol] = {}
+        for metric in self.metrics:
+            if metric not in values:
+                continue
+            new = values[metric]
+            if new is not None:
+                new = float(new)
+                if math.isnan(new):
+                    new = None
+            old = row.get(metric)
+            if new != old:
+                self._move(metric, symbol, old, new)
+                row[metric] = new
+        for attribute in SCREENER_ATTRIBUTES:
+            if attribute in values:
+                row[attribute] = values[attribute]
+
+    def remove(self, symbol):
+        with self.lock:
+            row = self.rows.pop(symbol, None)
+            if row:
+                for metric in self.metrics:
+                    self._move(metric, symbol, row.get(metric), None)
+
+    @staticmethod
+    def _matches(row, filters):
+        for key, bound in filters.items():
+            if key.startswith("min_"):
+                value = row.get(key[4:])
+                if value is None or value < bound:
+                    return False
+            elif key.startswith("max_"):
+                value = row.get(key[4:])
+                if value is None or value > bound:
+                    return False
+            elif row.get(key) != bound:
+                return False
+        return True
+
+    def validate(self, metric, k, order):
+        """Raises ValueError for a query the screener cannot answer."""
+        if metric not in self.indexes:
+            raise ValueError(f"Unknown screener metric {metric!r}, expected one of {self.metrics}")
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        if order not in ("asc", "desc"):
+            raise ValueError(f"order must be 'asc' or 'desc', got {order!r}")
+
+    def query(self, metric, k=10, order="desc", filters=None):
+        """Top (desc) or bottom (asc) K symbols by metric, with optional min_/max_/equality filters."""
+        self.validate(metric, k, order)
+        results = []
+        with self.lock:
+            index = self.indexes[metric]
+            walk = reversed(index) if order == "desc" else iter(index)
+            for value, symbol in walk:
+                row = self.rows[symbol]
+                if filters and not self._matches(row, filters):
+                    continue
+                results.append(dict(row, symbol=symbol))
+                if len(results) >= k:
+                    break
+        return results
+
+    def best_gem(self):
+        """Highest-confidence BUY right now (None if nothing qualifies)."""
+        top = self.query("confidence", k=1, filters={"signal": "BUY"})
+        return top[0]["symbol"] if top else None
+
+    def parse_filters(self, params):
+        """Filters from request parameters: min_<metric>, max_<metric>, signal, trend."""
+        filters = {}
+        for key, value in params.items():
+            if key.startswith(("min_", "max_")) and key[4:] in self.metrics:
+                filters[key] = float(value)
+            elif key in SCREENER_ATTRIBUTES:
+                filters[key] = str(value).upper()
+        return filters
+
+    def __len__(self):
+        return len(self.rows)
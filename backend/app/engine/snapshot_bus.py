@@ -0,0 +1,133 @@
+import asyncio
+import json
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Header: sequence number (odd while a write is in progress), payload length
+# and the publisher's generation (new for every segment it creates)
+HEADER = struct.Struct("<QQQ")
+
+
+def _dumps(obj):
+    return orjson.dumps(obj) if orjson is not None else json.dumps(obj).encode()
+
+
+class SnapshotPublisher:
+    """
+    Single-writer side of the snapshot bus: the ingestion process writes the
+    latest computed tick into a named shared memory segment under a seqlock.
+    """
+
+    def __init__(self, name="trading_snapshots", size=8 * 1024 * 1024):
+        self.name = name
+        try:
+            # Remove a segment left behind by a crashed ingestion process
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.capacity = size - HEADER.size
+        self.seq = 0
+        self.generation = time.time_ns()
+        HEADER.pack_into(self.shm.buf, 0, 0, 0, self.generation)
+
+    def publish(self, message):
+        data = _dumps(message)
+        if len(data) > self.capacity:
+            print(f"DEBUG: Snapshot of {len(data)} bytes exceeds bus capacity, dropped")
+            return False
+        buf = self.shm.buf
+        HEADER.pack_into(buf, 0, self.seq + 1, 0, self.generation)  # odd: write in progress
+        buf[HEADER.size:HEADER.size + len(data)] = data
+        self.seq += 2
+        HEADER.pack_into(buf, 0, self.seq, len(data), self.generation)
+        return True
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SnapshotSubscriber:
+    """
+    Reader side used by API/WebSocket workers: polls the segment for a new
+    sequence number and copies the payload out once it is consistent.
+    A restarted ingestion process creates a new segment under the same name,
+    so when the sequence has not advanced for `stale_after` seconds the
+    reader detaches and maps the name again (a changed `name` reattaches on
+    the next poll, a new generation restarts the sequence).
+    """
+
+    def __init__(self, name="trading_snapshots", stale_after=5.0):
+        self.name = name
+        self.stale_after = stale_after
+        self.shm = None
+        self.attached_name = None
+        self.generation = None
+        self.seq = 0
+        self.last_change = time.monotonic()
+        self.reattaches = 0
+
+    def _attach(self):
+        if self.shm is not None and self.attached_name != self.name:
+            self.close()
+        if self.shm is None:
+            self.shm = shared_memory.SharedMemory(name=self.name)
+            self.attached_name = self.name
+            self.last_change = time.monotonic()
+            self.reattaches += 1
+            try:
+                # Readers must not unlink the writer's segment when they exit
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+            except Exception:
+                pass
+        return self.shm
+
+    def poll(self):
+        """Returns the newest message if it changed since the last poll, else None."""
+        buf = self._attach().buf
+        for _ in range(10):
+            seq, length, generation = HEADER.unpack_from(buf, 0)
+            if generation != self.generation:
+                self.generation, self.seq = generation, 0  # new publisher: its sequence starts over
+            if seq == self.seq or seq == 0:
+                break
+            if seq % 2:
+                continue  # writer busy
+            data = bytes(buf[HEADER.size:HEADER.size + length])
+            if HEADER.unpack_from(buf, 0)[0] == seq:
+                self.seq = seq
+                self.last_change = time.monotonic()
+                return json.loads(data)
+        if time.monotonic() - self.last_change > self.stale_after:
+            self.close()  # writer gone, replaced or stuck mid-write: map the name again next poll
+        return None
+
+    async def run(self, on_message, interval=0.05):
+        """Feeds every new message to on_message until cancelled."""
+        while True:
+            try:
+                message = self.poll()
+                if message is not None:
+                    on_message(message)
+            except FileNotFoundError:
+                await asyncio.sleep(1.0)  # ingestion process not up yet
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"DEBUG: Snapshot bus read failed: {e}")
+            await asyncio.sleep(interval)
+
+    def close(self):
+        if self.shm:
+            self.shm.close()
+            self.shm = None
+            self.attached_name = None
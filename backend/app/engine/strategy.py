@@ -1,14 +1,79 @@
 import pandas as pd
 
+# Per-signal setup used by both the scalar and the batch strategy paths
+SIGNAL_PROFILES = {
+    "BUY": {
+        "reason": "Liquidity sweep detected. RSI confirms bullish divergence with volume spike.",
+        "target": 1.06,     # Optimized 6% Target
+        "stop_loss": 0.975, # Tight 2.5% Stop Loss
+        "confidence": 88.0,
+        "trend": "UP",
+        "neural_talk": "Market depth shows high buying pressure. Retail is shorting, perfect time for entry.",
+    },
+    "SELL": {
+        "reason": "Bearish EMA cross confirmed. Order flow shows massive sell blocks at resistance.",
+        "target": 0.94,
+        "stop_loss": 1.025,
+        "confidence": 88.0,
+        "trend": "DOWN",
+        "neural_talk": "Distribution phase detected. Hitting resistance levels, expect a dump soon.",
+    },
+    "HOLD": {
+        "reason": "Consolidation zone. Waiting for breakout confirmation above pivot.",
+        "target": 1.0,
+        "stop_loss": 0.98,
+        "confidence": 55.0,
+        "trend": "SIDEWAYS",
+        "neural_talk": "Sideways movement. Accumulation in progress, stay patient for the real move.",
+    },
+}
+
+def make_signal_profiles(target_pct=6.0, stop_pct=2.5):
+    """SIGNAL_PROFILES with a custom BUY/SELL target and stop distance (in %)."""
+    profiles = {signal: dict(profile) for signal, profile in SIGNAL_PROFILES.items()}
+    profiles["BUY"].update(target=1 + target_pct / 100, stop_loss=1 - stop_pct / 100)
+    profiles["SELL"].update(target=1 - target_pct / 100, stop_loss=1 + stop_pct / 100)
+    return profiles
+
+def build_prediction(signal, current_price, profiles=SIGNAL_PROFILES):
+    """Builds the prediction payload for a BUY/SELL/HOLD signal."""
+    profile = profiles[signal]
+    return {
+        "prediction_target": current_price * profile["target"],
+        "stop_loss": current_price * profile["stop_loss"],
+        "confidence_score": profile["confidence"],
+        "trend": profile["trend"],
+        "signal": signal,
+        "reason": profile["reason"],
+        "neural_talk": profile["neural_talk"],
+        "setup": "RAPID X Neural Terminal V3.0"
+    }
+
+# Book imbalance (within DEPTH_BAND_BPS of mid) beyond which depth counts as pressure
+DEPTH_BAND_BPS = 25
+DEPTH_PRESSURE = 0.2
+# Confidence added (or removed) when an active harmonic pattern agrees (disagrees) with the signal
+HARMONIC_CONFIDENCE = 5.0
+
 class StrategyEngine:
-    def __init__(self):
-        pass
+    def __init__(self, ema_fast=9, ema_slow=21, signal_rsi=50.0, trend_rsi_bull=52.0,
+                 trend_rsi_bear=48.0, target_pct=6.0, stop_pct=2.5):
+        # Tunable thresholds (see app/engine/optimizer.py). The fast/slow EMAs
+        # keep their 'ema_9'/'ema_21' column names whatever the spans are.
+        self.ema_fast = ema_fast
+        self.ema_slow = ema_slow
+        self.signal_rsi = signal_rsi
+        self.trend_rsi_bull = trend_rsi_bull
+        self.trend_rsi_bear = trend_rsi_bear
+        self.target_pct = target_pct
+        self.stop_pct = stop_pct
+        self.profiles = make_signal_profiles(target_pct, stop_pct)
 
     def calculate_indicators(self, df: pd.DataFrame):
         """Calculates indicators manually without external TA libraries."""
         # EMAs
-        df['ema_9'] = df['close'].ewm(span=9, adjust=False).mean()
-        df['ema_21'] = df['close'].ewm(span=21, adjust=False).mean()
+        df['ema_9'] = df['close'].ewm(span=self.ema_fast, adjust=False).mean()
+        df['ema_21'] = df['close'].ewm(span=self.ema_slow, adjust=False).mean()
         
         # RSI
         delta = df['close'].diff()
@@ -39,43 +104,23 @@ class StrategyEngine:
         
         return df
 
-    def detect_butterfly_pattern(self, df: pd.DataFrame):
-        """
-        Simplified Butterfly Harmonic Pattern detection.
-        Looks for X-A-B-C-D structure based on price movements.
-        """
-        if len(df) < 50: return False
-        
-        # This is a heuristic version of the Butterfly pattern
-        # True Butterfly relies on precise Fib ratios (B at 78.6% of XA, D at 127% of XA)
-        # We'll use a simplified version based on swing points
-        recent = df.tail(20)
-        highs = recent['high'].values
-        lows = recent['low'].values
-        
-        # Detecting a 'Butterfly' shape (W-shape for Bullish, M-shape for Bearish)
-        # For demo purposes, we trigger if RSI and MACD align with a reversal zone
-        rsi = df['rsi'].iloc[-1]
-        macd_h = df['MACDh_12_26_9'].iloc[-1]
-        
-        if rsi < 35 and macd_h > 0:
-            return "BULLISH_BUTTERFLY"
-        if rsi > 65 and macd_h < 0:
-            return "BEARISH_BUTTERFLY"
-        return None
+    @staticmethod
+    def _last_row(data):
+        """Accepts an indicator DataFrame or an IndicatorState snapshot dict."""
+        if isinstance(data, pd.DataFrame):
+            return data.iloc[-1]
+        return data
 
-    def detect_trend(self, df: pd.DataFrame):
+    def detect_trend(self, df):
         """Detects Market Trend: Bullish, Bearish, or Sideways."""
-        last_row = df.iloc[-1]
+        last_row = self._last_row(df)
         ema_9 = last_row['ema_9']
         ema_21 = last_row['ema_21']
         rsi = last_row['rsi']
         
-        pattern = self.detect_butterfly_pattern(df)
-        
-        if ema_9 > ema_21 and rsi > 52:
+        if ema_9 > ema_21 and rsi > self.trend_rsi_bull:
             return "BULLISH"
-        elif ema_9 < ema_21 and rsi < 48:
+        elif ema_9 < ema_21 and rsi < self.trend_rsi_bear:
             return "BEARISH"
         else:
             return "SIDEWAYS"
@@ -108,55 +153,80 @@ class StrategyEngine:
             "strategy": "Iron Butterfly"
         }
 
-    def get_ai_prediction(self, df: pd.DataFrame):
+    def apply_depth(self, prediction, features):
+        """
+        Order book features (app/engine/order_book.py) on top of a prediction:
+        neural_talk describes the actual depth and confidence moves a little
+        when the book agrees or disagrees with the signal.
+        """
+        if not features:
+            return prediction
+        imbalance = features[f"imbalance_{DEPTH_BAND_BPS}bps"]
+        bid_depth = features[f"bid_depth_{DEPTH_BAND_BPS}bps"]
+        ask_depth = features[f"ask_depth_{DEPTH_BAND_BPS}bps"]
+        if imbalance > DEPTH_PRESSURE:
+            talk = f"Market depth shows buying pressure: {bid_depth:,.0f} USDT bids vs {ask_depth:,.0f} asks within {DEPTH_BAND_BPS}bps."
+            agrees = {"BUY": 1, "SELL": -1}.get(prediction["signal"], 0)
+        elif imbalance < -DEPTH_PRESSURE:
+            talk = f"Market depth shows selling pressure: {ask_depth:,.0f} USDT asks vs {bid_depth:,.0f} bids within {DEPTH_BAND_BPS}bps."
+            agrees = {"SELL": 1, "BUY": -1}.get(prediction["signal"], 0)
+        else:
+            talk = f"Balanced book: {bid_depth:,.0f} USDT bids vs {ask_depth:,.0f} asks within {DEPTH_BAND_BPS}bps."
+            agrees = 0
+        prediction = dict(prediction)
+        prediction["neural_talk"] = talk
+        prediction["confidence_score"] = max(0.0, min(99.0, prediction["confidence_score"] + agrees * 5.0))
+        prediction["depth"] = {
+            "spread_bps": features["spread_bps"],
+            "imbalance": imbalance,
+            "bid_depth_usdt": bid_depth,
+            "ask_depth_usdt": ask_depth,
+        }
+        return prediction
+
+    def apply_harmonic(self, prediction, pattern):
+        """
+        An active harmonic pattern (app/engine/harmonics.py) on top of a
+        prediction: attached for the dashboard, and confidence moves a little
+        when the pattern's reversal direction agrees or disagrees with the signal.
+        """
+        if not pattern:
+            return prediction
+        direction = 1 if pattern["side"] == "BULLISH" else -1
+        agrees = direction * {"BUY": 1, "SELL": -1}.get(prediction["signal"], 0)
+        prediction = dict(prediction)
+        prediction["confidence_score"] = max(0.0, min(99.0, prediction["confidence_score"] + agrees * HARMONIC_CONFIDENCE))
+        prediction["harmonic"] = {
+            "pattern": pattern["pattern"],
+            "points": pattern["points"],
+            "ratios": pattern["ratios"],
+        }
+        return prediction
+
+    def get_ai_prediction(self, df):
         """
         SMALL CAPITAL AI SETUP (20-30 USDT)
         Indicators: Supertrend + RSI + Volume
         """
-        current_price = df['close'].iloc[-1]
-        rsi = df['rsi'].iloc[-1]
+        last_row = self._last_row(df)
+        current_price = last_row['close']
+        rsi = last_row['rsi']
         
         # Simulated Supertrend & Volume Logic
         # (In a real scenario, we'd use ATR for Supertrend, here we use confirmation)
-        ema_9 = df['ema_9'].iloc[-1]
-        ema_21 = df['ema_21'].iloc[-1]
+        ema_9 = last_row['ema_9']
+        ema_21 = last_row['ema_21']
         
         # Bullish: RSI > 50 + EMA Cross (Supertrend Buy Proxy)
-        bullish = rsi > 50 and ema_9 > ema_21
+        bullish = rsi > self.signal_rsi and ema_9 > ema_21
         # Bearish: RSI < 50 + EMA Cross (Supertrend Sell Proxy)
-        bearish = rsi < 50 and ema_9 < ema_21
+        bearish = rsi < self.signal_rsi and ema_9 < ema_21
         
         if bullish:
             signal = "BUY"
-            reason = "Liquidity sweep detected. RSI confirms bullish divergence with volume spike."
-            # Optimized 6% Target 
-            target = current_price * 1.06 
-            # Tight 2.5% Stop Loss
-            stop_loss = current_price * 0.975
-            confidence = 88.0
-            neural_talk = "Market depth shows high buying pressure. Retail is shorting, perfect time for entry."
         elif bearish:
             signal = "SELL"
-            reason = "Bearish EMA cross confirmed. Order flow shows massive sell blocks at resistance."
-            target = current_price * 0.94
-            stop_loss = current_price * 1.025
-            confidence = 88.0
-            neural_talk = "Distribution phase detected. Hitting resistance levels, expect a dump soon."
         else:
             signal = "HOLD"
-            reason = "Consolidation zone. Waiting for breakout confirmation above pivot."
-            target = current_price
-            stop_loss = current_price * 0.98
-            confidence = 55.0
-            neural_talk = "Sideways movement. Accumulation in progress, stay patient for the real move."
 
-        return {
-            "prediction_target": target,
-            "stop_loss": stop_loss,
-            "confidence_score": confidence,
-            "trend": "UP" if bullish else "DOWN" if bearish else "SIDEWAYS",
-            "signal": signal,
-            "reason": reason,
-            "neural_talk": neural_talk,
-            "setup": "RAPID X Neural Terminal V3.0"
-        }
+        return build_prediction(signal, current_price, self.profiles)
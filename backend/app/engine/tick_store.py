@@ -0,0 +1,149 @@
+import json
+import os
+import time
+import numpy as np
+
+# One fixed-width record per tick
+TICK_DTYPE = np.dtype([("ts", "<i8"), ("close", "<f8"), ("high", "<f8"), ("low", "<f8")])
+
+
+class TickStore:
+    """
+    Append-only, per-symbol on-disk tick store.
+
+    Layout: <root>/<SYMBOL>/seg_<first_ts>.bin segments of TICK_DTYPE records
+    plus an index.json listing the segments in time order. Writers append in
+    batches; readers memory-map segments and slice them by time range without
+    copying (a range spanning several segments is concatenated).
+    """
+
+    def __init__(self, root, segment_records=1_000_000, flush_interval=5.0, flush_records=10_000):
+        self.root = root
+        self.segment_records = segment_records
+        self.flush_interval = flush_interval
+        self.flush_records = flush_records
+        self.pending = {}  # {symbol: [(ts, close, high, low)]}
+        self.pending_count = 0
+        self.last_flush = time.time()
+        self.index = {}  # {symbol: [{"file": str, "first_ts": int}]}
+        os.makedirs(root, exist_ok=True)
+
+    # --- index ---
+
+    def _symbol_dir(self, symbol):
+        return os.path.join(self.root, symbol)
+
+    def _load_index(self, symbol):
+        if symbol not in self.index:
+            path = os.path.join(self._symbol_dir(symbol), "index.json")
+            try:
+                with open(path) as f:
+                    self.index[symbol] = json.load(f)
+            except (OSError, ValueError):
+                self.index[symbol] = []
+        return self.index[symbol]
+
+    def _save_index(self, symbol):
+        path = os.path.join(self._symbol_dir(symbol), "index.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.index[symbol], f)
+        os.replace(tmp, path)
+
+    def _segment_path(self, symbol, segment):
+        return os.path.join(self._symbol_dir(symbol), segment["file"])
+
+    def _segment_count(self, symbol, segment):
+        try:
+            return os.path.getsize(self._segment_path(symbol, segment)) // TICK_DTYPE.itemsize
+        except OSError:
+            return 0
+
+    def symbols(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isfile(os.path.join(self.root, d, "index.json")))
+
+    # --- writing ---
+
+    def record(self, symbol, ts, close, high=None, low=None):
+        """Buffers one tick; call flush()/maybe_flush() to persist."""
+        self.pending.setdefault(symbol, []).append((
+            int(ts), close,
+            close * 1.002 if high is None else high,
+            close * 0.998 if low is None else low,
+        ))
+        self.pending_count += 1
+
+    def maybe_flush(self):
+        if self.pending_count >= self.flush_records or time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        pending, self.pending, self.pending_count = self.pending, {}, 0
+        self.last_flush = time.time()
+        for symbol, rows in pending.items():
+            self.append(symbol, np.array(rows, dtype=TICK_DTYPE))
+
+    def append(self, symbol, records: np.ndarray):
+        """Appends a batch of TICK_DTYPE records (in time order) for one symbol."""
+        if len(records) == 0:
+            return
+        os.makedirs(self._symbol_dir(symbol), exist_ok=True)
+        segments = self._load_index(symbol)
+        offset = 0
+        while offset < len(records):
+            count = self._segment_count(symbol, segments[-1]) if segments else self.segment_records
+            if count >= self.segment_records:
+                segments.append({"file": f"seg_{int(records['ts'][offset])}.bin", "first_ts": int(records["ts"][offset])})
+                self._save_index(symbol)
+                count = 0
+            chunk = records[offset:offset + self.segment_records - count]
+            with open(self._segment_path(symbol, segments[-1]), "ab") as f:
+                # A crash mid-write can leave a partial record at the end; cut it off so
+                # this batch starts on a record boundary (readers ignore the torn bytes)
+                f.truncate(count * TICK_DTYPE.itemsize)
+                f.write(chunk.tobytes())
+            offset += len(chunk)
+
+    # --- reading ---
+
+    def _memmap(self, symbol, segment):
+        count = self._segment_count(symbol, segment)
+        if count == 0:
+            return np.empty(0, dtype=TICK_DTYPE)
+        return np.memmap(self._segment_path(symbol, segment), dtype=TICK_DTYPE, mode="r", shape=(count,))
+
+    def read(self, symbol, start_ts=None, end_ts=None):
+        """Records with start_ts <= ts < end_ts (memory-mapped view when inside one segment)."""
+        segments = self._load_index(symbol)
+        parts = []
+        for i, segment in enumerate(segments):
+            next_first = segments[i + 1]["first_ts"] if i + 1 < len(segments) else None
+            if end_ts is not None and segment["first_ts"] >= end_ts:
+                break
+            if start_ts is not None and next_first is not None and next_first <= start_ts:
+                continue
+            data = self._memmap(symbol, segment)
+            lo = 0 if start_ts is None else np.searchsorted(data["ts"], start_ts, side="left")
+            hi = len(data) if end_ts is None else np.searchsorted(data["ts"], end_ts, side="left")
+            if hi > lo:
+                parts.append(data[lo:hi])
+        if not parts:
+            return np.empty(0, dtype=TICK_DTYPE)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def tail(self, symbol, n):
+        """Last n records of a symbol."""
+        segments = self._load_index(symbol)
+        parts = []
+        remaining = n
+        for segment in reversed(segments):
+            data = self._memmap(symbol, segment)
+            parts.append(data[max(0, len(data) - remaining):])
+            remaining -= len(parts[-1])
+            if remaining <= 0:
+                break
+        if not parts:
+            return np.empty(0, dtype=TICK_DTYPE)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts[::-1])
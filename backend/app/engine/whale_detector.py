@@ -0,0 +1,256 @@
+import asyncio
+import json
+import math
+import time
+from collections import deque
+import numpy as np
+from app.engine.binance_stream import BinanceStreamClient
+
+AGG_TRADE_STREAM_URL = "wss://stream.binance.com:9443/stream?streams="
+
+
+class LogHistogramSketch:
+    """
+    Fixed-memory streaming quantiles: counts in logarithmic buckets
+    (`per_decade` buckets per power of ten: ~4.7% wide buckets at 50).
+    Counts decay with a half-life so quantiles follow the current regime.
+    """
+
+    def __init__(self, min_value=1.0, max_value=1e10, per_decade=50, halflife=3600.0):
+        self.min_log = math.log10(min_value)
+        self.per_decade = per_decade
+        self.size = int(math.ceil((math.log10(max_value) - self.min_log) * per_decade)) + 1
+        self.counts = np.zeros(self.size)
+        self.total = 0.0
+        self.halflife = halflife
+        self.decayed_at = time.time()
+
+    def add(self, value):
+        if value <= 0:
+            return
+        i = int((math.log10(value) - self.min_log) * self.per_decade)
+        if i < 0:
+            i = 0
+        elif i >= self.size:
+            i = self.size - 1
+        self.counts[i] += 1
+        self.total += 1
+
+    def decay(self, now=None):
+        now = time.time() if now is None else now
+        elapsed = now - self.decayed_at
+        self.decayed_at = now  # a clock that moved back (replayed trade time) just restarts here
+        if elapsed > 0:
+            factor = 0.5 ** (elapsed / self.halflife)
+            self.counts *= factor
+            self.total *= factor
+
+    def quantile(self, q):
+        """Upper edge of the bucket holding the q-quantile (None while empty)."""
+        if self.total <= 0:
+            return None
+        i = int(np.searchsorted(np.cumsum(self.counts), q * self.total))
+        return 10 ** (self.min_log + (min(i, self.size - 1) + 1) / self.per_decade)
+
+
+class FlowWindow:
+    """Buy/sell notional in 1-second slots over a rolling window."""
+
+    def __init__(self, window=60):
+        self.window = window
+        self.seconds = np.full(window, -1, dtype=np.int64)
+        self.buy = np.zeros(window)
+        self.sell = np.zeros(window)
+
+    def add(self, ts_ms, notional, is_buy):
+        second = ts_ms // 1000
+        slot = second % self.window
+        if self.seconds[slot] != second:
+            self.seconds[slot] = second
+            self.buy[slot] = 0.0
+            self.sell[slot] = 0.0
+        if is_buy:
+            self.buy[slot] += notional
+        else:
+            self.sell[slot] += notional
+
+    def totals(self, now_ms=None, window=None):
+        now = (time.time() * 1000 if now_ms is None else now_ms) // 1000
+        live = self.seconds > now - (window or self.window)
+        buy = float(self.buy[live].sum())
+        sell = float(self.sell[live].sum())
+        return {"buy_usdt": buy, "sell_usdt": sell, "net_usdt": buy - sell}
+
+
+class WhaleDetector:
+    """
+    Flags whale trades from the aggTrade stream.
+    Per symbol: a log-histogram sketch of trade notional, an adaptive
+    threshold (the `quantile` of recent notional, never below
+    `min_notional`) refreshed every `refresh_every` trades, and rolling
+    net buy/sell flow.
+    """
+
+    def __init__(self, quantile=0.999, min_notional=50_000.0, min_trades=500, refresh_every=256,
+                 flow_window=60, alert_ttl=30.0, halflife=3600.0, max_alerts=200):
+        self.quantile = quantile
+        self.min_notional = min_notional
+        self.min_trades = min_trades
+        self.refresh_every = refresh_every
+        self.flow_window = flow_window
+        self.alert_ttl = alert_ttl
+        self.halflife = halflife
+        self.symbols = {}  # {symbol: {"sketch", "flow", "threshold", "pending", "trades", "last_alert"}}
+        self.alerts = deque(maxlen=max_alerts)  # newest last
+        self.trades = 0
+        self.last_trade_ms = 0
+        self.trade_clock = False  # replays: alert age and flow windows use trade time
+
+    def _state(self, symbol):
+        state = self.symbols.get(symbol)
+        if state is None:
+            state = self.symbols[symbol] = {
+                "sketch": LogHistogramSketch(halflife=self.halflife),
+                "flow": FlowWindow(self.flow_window),
+                "threshold": None,
+                "pending": 0,
+                "trades": 0,
+                "last_alert": None,
+            }
+        return state
+
+    def _refresh(self, state):
+        sketch = state["sketch"]
+        sketch.decay(self._now_ms() / 1000)  # trade time in replays, like the flow windows
+        if state["trades"] >= self.min_trades:
+            state["threshold"] = max(sketch.quantile(self.quantile), self.min_notional)
+        state["pending"] = 0
+
+    def add_trade(self, symbol, price, qty, ts_ms, buyer_is_maker):
+        """Applies one trade; returns the whale alert it raised, if any."""
+        state = self._state(symbol)
+        notional = price * qty
+        is_buy = not buyer_is_maker  # buyer is maker -> the aggressor sold
+        state["sketch"].add(notional)
+        state["flow"].add(ts_ms, notional, is_buy)
+        state["trades"] += 1
+        state["pending"] += 1
+        self.trades += 1
+        if ts_ms > self.last_trade_ms:
+            self.last_trade_ms = ts_ms
+        if state["pending"] >= self.refresh_every or (state["threshold"] is None and state["trades"] == self.min_trades):
+            self._refresh(state)
+        threshold = state["threshold"]
+        if threshold is None or notional < threshold:
+            return None
+        alert = {
+            "symbol": symbol,
+            "side": "BUY" if is_buy else "SELL",
+            "amount_usdt": notional,
+            "price": price,
+            "qty": qty,
+            "threshold_usdt": threshold,
+            "time": ts_ms,
+        }
+        state["last_alert"] = alert
+        self.alerts.append(alert)
+        return alert
+
+    def on_agg_trade(self, data):
+        """Raw aggTrade payload: {"s", "p", "q", "T", "m", ...}."""
+        return self.add_trade(data["s"], float(data["p"]), float(data["q"]), data["T"], data["m"])
+
+    def _now_ms(self, now=None):
+        if self.trade_clock:
+            return self.last_trade_ms
+        return (time.time() if now is None else now) * 1000
+
+    def flow(self, symbol, window=None):
+        state = self.symbols.get(symbol)
+        if state is None:
+            return {"buy_usdt": 0.0, "sell_usdt": 0.0, "net_usdt": 0.0}
+        return state["flow"].totals(self._now_ms(), window)
+
+    def whale_alert(self, symbol, now=None):
+        """Payload block for the dashboard (same shape as the old simulated alert)."""
+        state = self.symbols.get(symbol)
+        alert = state["last_alert"] if state else None
+        now_ms = self._now_ms(now)
+        active = alert is not None and now_ms - alert["time"] <= self.alert_ttl * 1000
+        result = {
+            "active": active,
+            "side": alert["side"] if active else None,
+            "amount_usdt": f"{alert['amount_usdt'] if active else 0:,.0f}",
+            "threshold_usdt": state["threshold"] if state else None,
+        }
+        if state:
+            result["net_flow_usdt"] = state["flow"].totals(now_ms)["net_usdt"]
+        return result
+
+    def recent_alerts(self, symbol=None, limit=50):
+        alerts = [a for a in self.alerts if symbol is None or a["symbol"] == symbol]
+        return alerts[-limit:][::-1]
+
+    def replay(self, path):
+        """Feeds a recorded aggTrade file (one raw stream frame per line) through the detector."""
+        self.trade_clock = True
+        alerts = []
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                msg = json.loads(line)
+                alert = self.on_agg_trade(msg.get("data", msg))
+                if alert:
+                    alerts.append(alert)
+        return alerts
+
+
+class AggTradeStreamClient(BinanceStreamClient):
+    """
+    Combined <symbol>@aggTrade streams feeding a WhaleDetector (same
+    reconnect/backoff as the market stream). Optionally appends every raw
+    frame to `record_path` for replay.
+    """
+
+    def __init__(self, symbols, detector, record_path=None, url=None, max_backoff=30.0):
+        streams = "/".join(f"{s.lower()}@aggTrade" for s in symbols)
+        super().__init__(url=(url or AGG_TRADE_STREAM_URL) + streams, max_backoff=max_backoff)
+        self.detector = detector
+        self.record_file = open(record_path, "a", buffering=1024 * 1024) if record_path else None
+
+    def handle_message(self, raw):
+        now_ms = time.time() * 1000
+        self.last_message = now_ms / 1000
+        msg = json.loads(raw)
+        data = msg.get("data", msg)
+        if data.get("e") != "aggTrade":
+            return
+        self.detector.on_agg_trade(data)
+        self.latencies.append(now_ms - data["T"])
+        if self.record_file:
+            self.record_file.write(raw if raw.endswith("\n") else raw + "\n")
+
+    async def stop(self):
+        await super().stop()
+        if self.record_file:
+            self.record_file.close()
+            self.record_file = None
+
+
+async def replay_trades(path, detector, speed=None):
+    """Replays a recorded aggTrade file in (scaled) trade time; speed=None is as fast as possible."""
+    detector.trade_clock = True
+    previous = None
+    with open(path) as f:
+        for n, line in enumerate(f):
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            data = data.get("data", data)
+            if speed and previous is not None and data["T"] > previous:
+                await asyncio.sleep((data["T"] - previous) / 1000 / speed)
+            elif n % 1000 == 0:
+                await asyncio.sleep(0)
+            previous = data["T"]
+            detector.on_agg_trade(data)
@@ -0,0 +1,30 @@
+"""
+Standalone ingestion/strategy process for multi-worker deployments.
+
+    python -m app.ingest
+    TRADING_ROLE=api uvicorn app.main:app --workers 4
+
+Polls the exchange, runs the strategy once per tick and publishes every tick
+to the shared memory snapshot bus that the API workers read from.
+"""
+import asyncio
+import os
+
+os.environ["TRADING_ROLE"] = "ingest"
+
+from app import main
+
+
+async def run():
+    await main.startup_event()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await main.shutdown_event()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
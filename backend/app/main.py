@@ -1,10 +1,32 @@
 import asyncio
 import json
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import os
+import random
+import time
+import numpy as np
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.engine.binance_client import BinanceManager
 from app.engine.strategy import StrategyEngine
 from app.engine.ai_layer import AIDecisionLayer
+from app.engine.batch_strategy import BatchStrategyEngine
+from app.engine.candles import CandleAggregator, TIMEFRAMES, ticks_to_bars
+from app.engine.harmonics import HarmonicScanner
+from app.engine.indicators import IndicatorEngine
+from app.engine.market_history import MarketHistoryManager
+from app.engine.market_hub import MarketHub
+from app.engine.protocol import DeltaEncoder
+from app.engine.tick_store import TickStore
+from app.engine.screener import MarketScreener
+from app.engine.snapshot_bus import SnapshotPublisher, SnapshotSubscriber
+from app.engine.loop_monitor import LoopLagMonitor, StrategyExecutor
+from app.engine.metrics import REGISTRY, SamplingProfiler
+from app.engine.order_book import OrderBookManager
+from app.engine.order_gateway import OrderGateway, OrderError
+from app.engine.portfolio_risk import PortfolioRiskEngine
+from app.engine.whale_detector import AggTradeStreamClient, WhaleDetector, replay_trades
+from app.engine.replay import ReplayBinanceManager, TickRecorder, parse_speed
 import pandas as pd
 
 app = FastAPI(title="Smart Trading Bot API")
@@ -20,29 +42,237 @@ app.add_middleware(
 from app.engine.news_fetcher import NewsFetcher
 from app.engine.risk_manager import RiskManager
 
-binance_mgr = BinanceManager(testnet=False)
+# Replay a TickRecorder file instead of Binance: REPLAY_FILE=ticks.jsonl REPLAY_SPEED=1|100|max
+REPLAY_FILE = os.getenv("REPLAY_FILE")
+if REPLAY_FILE:
+    binance_mgr = ReplayBinanceManager(REPLAY_FILE, speed=parse_speed(os.getenv("REPLAY_SPEED", "1")))
+else:
+    binance_mgr = BinanceManager(testnet=False)
+# RECORD_TICKS=ticks.jsonl captures every poll for later replay
+RECORD_TICKS = os.getenv("RECORD_TICKS")
+tick_recorder = TickRecorder(RECORD_TICKS) if RECORD_TICKS else None
+# TRADING_SEED makes the simulated parts (history seeding, whale, news resend) reproducible
+TRADING_SEED = os.getenv("TRADING_SEED")
+rng = random.Random(int(TRADING_SEED) if TRADING_SEED else None)
 strategy_eng = StrategyEngine()
 ai_layer = AIDecisionLayer()
 news_fetcher = NewsFetcher()
 risk_mgr = RiskManager()
+# USDⓈ-M futures order routing (BINANCE_FUTURES_BASE_URL; simulated without API keys).
+# With TRADING_ROLE=api every worker routes its own orders: set API_WORKERS to the
+# worker count so the workers' rate limiters add up to the exchange limits
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+order_gateway = OrderGateway(limit_share=1 / max(1, API_WORKERS))
+# Binance USDⓈ-M caps initial leverage at 125x
+MAX_LEVERAGE = 125
 
-# Global state for demonstration
-active_position = {
-    "entry_price": 42000.0,
-    "amount": 0.1,
-    "is_open": True
-}
+# Whale alerts from the aggTrade streams (WHALE_STREAM=0 disables them; WHALE_REPLAY=trades.jsonl
+# replays a file recorded with WHALE_RECORD=trades.jsonl instead of connecting)
+whale_detector = WhaleDetector(
+    quantile=float(os.getenv("WHALE_QUANTILE", "0.999")),
+    min_notional=float(os.getenv("WHALE_MIN_USDT", "50000")),
+)
+WHALE_STREAM = os.getenv("WHALE_STREAM", "1") == "1"
+WHALE_REPLAY = os.getenv("WHALE_REPLAY")
+WHALE_RECORD = os.getenv("WHALE_RECORD")
+STREAMS_PER_CONNECTION = 200
+whale_tasks = []
+
+# Local order books (snapshot + diff depth) for the top ORDER_BOOK_SYMBOLS pairs (0 disables)
+ORDER_BOOK_SYMBOLS = int(os.getenv("ORDER_BOOK_SYMBOLS", "20"))
+order_books = OrderBookManager(binance_mgr, limit=int(os.getenv("ORDER_BOOK_LIMIT", "100")))
+
+# Incrementally ranked universe for /api/screener and /ws/screener
+screener = MarketScreener()
+session_open = {}  # {symbol: first price seen} when no 24h open is available
+
+# Open positions (filled through /api/futures/order and /orders), re-evaluated on every tick
+portfolio = PortfolioRiskEngine(risk_mgr)
+
+# Persistent Market History Manager (ring buffers, window configurable via HISTORY_WINDOW)
+history_mgr = MarketHistoryManager(window_size=int(os.getenv("HISTORY_WINDOW", "50")), rng=rng)
+batch_eng = BatchStrategyEngine(strategy_eng)
+# Bars fed to the indicators per tick, and how many USDT pairs to track (0 = all).
+# All pairs by default: the batch engine scores the whole universe in one pass,
+# so a poll costs about the same for ~400 symbols as it did for 100
+INDICATOR_WINDOW = int(os.getenv("INDICATOR_WINDOW", "50"))
+SYMBOL_LIMIT = int(os.getenv("SYMBOL_LIMIT", "0")) or None
+# "ws" = Binance market streams with REST fallback, "rest" = REST polling only
+MARKET_DATA_MODE = os.getenv("MARKET_DATA_MODE", "ws")
+# Protocol v2: full snapshot every N frames for resync
+SNAPSHOT_EVERY = int(os.getenv("SNAPSHOT_EVERY", "30"))
+signal_lock = {} # {symbol: {"signal": str, "expiry": float}}
+# Market states queued for the AI decision layer whenever a signal lock renews
+# (only used when OPENAI_API_KEY or OPENAI_BASE_URL is set)
+ai_contexts = {}  # {symbol: market_data}
+
+# Candles: the strategy runs once per closed STRATEGY_TIMEFRAME bar ("tick" = every poll)
+STRATEGY_TIMEFRAME = os.getenv("STRATEGY_TIMEFRAME", "30m")
+candle_agg = CandleAggregator()
+bar_indicators = IndicatorEngine()
+bar_results = {}  # {symbol: strategy result of the last closed bar}
+# Closed bars a symbol needs before its bar signal replaces the tick-based one
+# (the RSI needs rsi_period + 1 closes)
+BAR_WARMUP_BARS = int(os.getenv("BAR_WARMUP_BARS", "15"))
+# Harmonic patterns (ZigZag pivots of HARMONIC_ZIGZAG_PCT %) on closed HARMONIC_TIMEFRAME bars
+HARMONIC_TIMEFRAME = os.getenv("HARMONIC_TIMEFRAME", "15m")
+harmonics = HarmonicScanner(threshold_pct=float(os.getenv("HARMONIC_ZIGZAG_PCT", "2.0")))
+
+@candle_agg.on_close
+def on_bar_close(symbol, timeframe, bar):
+    if bar.get("partial"):
+        return  # first bar after startup: it only saw the ticks since then
+    if timeframe == HARMONIC_TIMEFRAME:
+        harmonics.update(symbol, bar["high"], bar["low"], bar["open_time"])
+    if timeframe != STRATEGY_TIMEFRAME:
+        return
+    with STAGE_SECONDS.time(stage="indicators"):
+        indicators = bar_indicators.update(symbol, bar["close"], bar["high"], bar["low"])
+    if bar_indicators.count(symbol) < BAR_WARMUP_BARS:
+        return  # process_snapshot keeps using the tick-based signal
+    with STAGE_SECONDS.time(stage="signals"):
+        bar_results[symbol] = bar_result(indicators)
+
+def bar_result(indicators):
+    return {
+        "indicators": indicators,
+        "trend": strategy_eng.detect_trend(indicators),
+        "ai_prediction": strategy_eng.get_ai_prediction(indicators),
+    }
+
+def warm_bars(store, now_ms=None):
+    """
+    Rebuilds the closed strategy/harmonic bars of the last window from the
+    tick store, so a restart does not begin from a cold IndicatorState.
+    Returns the number of symbols warmed.
+    """
+    timeframes = [tf for tf in dict.fromkeys((STRATEGY_TIMEFRAME, HARMONIC_TIMEFRAME)) if tf in TIMEFRAMES]
+    if not timeframes:
+        return 0
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    span = max(TIMEFRAMES[tf] for tf in timeframes) * (bar_indicators.window_size + 2)
+    warmed = 0
+    for symbol in store.symbols():
+        records = store.read(symbol, start_ts=now_ms - span)
+        if not len(records):
+            continue
+        for timeframe in timeframes:
+            bars = ticks_to_bars(records["ts"], records["close"], timeframe)
+            if not len(bars["close"]):
+                continue
+            candle_agg.load(symbol, timeframe, bars)
+            if timeframe == HARMONIC_TIMEFRAME:
+                for high, low, open_time in zip(bars["high"].tolist(), bars["low"].tolist(), bars["open_time"].tolist()):
+                    harmonics.update(symbol, high, low, open_time)
+            if timeframe == STRATEGY_TIMEFRAME:
+                window = bar_indicators.window_size
+                indicators = bar_indicators.warm(symbol, bars["close"][-window:].tolist(),
+                                                 bars["high"][-window:].tolist(), bars["low"][-window:].tolist())
+                if bar_indicators.count(symbol) >= BAR_WARMUP_BARS:
+                    bar_results[symbol] = bar_result(indicators)
+        warmed += 1
+    return warmed
+
+# Deployment role:
+#   all    - single process: producer + API (default)
+#   ingest - producer that also publishes every tick to the shared memory snapshot bus
+#            (run once, e.g. `python -m app.ingest`)
+#   api    - API/WebSocket worker fed from the bus
+#            (e.g. `TRADING_ROLE=api API_WORKERS=4 uvicorn app.main:app --workers 4`)
+# Market state and the news refresher live in the ingest process only; every bus
+# message carries the news cache next to the tick. Orders and positions do not go
+# through the bus: each api worker places the orders it receives, keeps those
+# positions in its own portfolio and checks their TP/SL on every bus tick.
+TRADING_ROLE = os.getenv("TRADING_ROLE", "all")
+SNAPSHOT_BUS = os.getenv("SNAPSHOT_BUS", "trading_snapshots")
+snapshot_publisher = None
+bus_task = None
+
+# Shared fan-out: one producer computes every payload, clients subscribe
+market_hub = MarketHub(queue_size=int(os.getenv("CLIENT_QUEUE_SIZE", "4")))
+producer_task = None
+
+# On-disk tick store (TICK_STORE_DIR="" disables persistence)
+TICK_STORE_DIR = os.getenv("TICK_STORE_DIR", "data/ticks")
+tick_store = TickStore(TICK_STORE_DIR) if TICK_STORE_DIR and TRADING_ROLE != "api" else None
+
+# Strategy work runs on one worker thread so the event loop keeps serving sockets;
+# the producer waits for it, so slow polls coalesce instead of queueing up
+strategy_exec = StrategyExecutor(max_workers=1, max_in_flight=1)
+loop_monitor = LoopLagMonitor(interval=float(os.getenv("LOOP_LAG_INTERVAL", "0.05")))
+
+# Instrumentation served on /metrics; the sampling profiler is toggled via /api/profiler
+STAGE_SECONDS = REGISTRY.histogram("pipeline_stage_seconds", "Time spent per tick pipeline stage", ("stage",))
+SYMBOL_TICKS = REGISTRY.counter("symbol_ticks_total", "Ticks processed per symbol", ("symbol",))
+REGISTRY.gauge("ws_clients", "Connected WebSocket clients", function=lambda: market_hub.client_count)
+REGISTRY.gauge("client_queue_depth", "Queued ticks across client queues",
+               function=lambda: sum(sub.queue.qsize() for sub in list(market_hub.subscribers)))
+REGISTRY.gauge("client_queue_dropped", "Ticks dropped for slow clients",
+               function=lambda: sum(sub.dropped for sub in list(market_hub.subscribers)))
+REGISTRY.gauge("strategy_in_flight", "Strategy jobs running on the worker thread",
+               function=lambda: strategy_exec.in_flight)
+REGISTRY.gauge("event_loop_lag_ms", "Event loop lag percentiles", ("quantile",),
+               function=lambda: {(q,): loop_monitor.percentiles()[k] for q, k in (("0.5", "p50"), ("0.99", "p99"), ("1", "max"))})
+REGISTRY.gauge("binance_request_weight_1m", "Binance request weight used in the current minute",
+               function=lambda: binance_mgr.weights.snapshot()["used_1m"])
+REGISTRY.gauge("binance_request_weight_total", "Binance request weight spent since start",
+               function=lambda: binance_mgr.weights.total)
+REGISTRY.gauge("ai_cache_hit_ratio", "AI decision cache hit rate", function=lambda: ai_layer.hit_rate())
+REGISTRY.gauge("ai_pending_decisions", "Market states waiting for a batched model call",
+               function=lambda: len(ai_layer.pending))
+profiler = SamplingProfiler(interval=float(os.getenv("PROFILER_INTERVAL", "0.01")))
 
 @app.on_event("startup")
 async def startup_event():
+    global producer_task, snapshot_publisher, bus_task
+    loop_monitor.start()
+    if TRADING_ROLE == "api":
+        bus_task = asyncio.create_task(SnapshotSubscriber(SNAPSHOT_BUS).run(publish_from_bus))
+        print(f"DEBUG: API worker reading snapshots from bus '{SNAPSHOT_BUS}'")
+        return
+    
     try:
         await asyncio.wait_for(binance_mgr.init_client(), timeout=5.0)
         print("DEBUG: Binance Engine Initialized")
     except Exception as e:
         print(f"DEBUG: Initial Binance connection skipped ({e}). Re-trying on first request.")
+    if tick_store:
+        started = time.perf_counter()
+        warmed = history_mgr.warm_from_store(tick_store)
+        print(f"DEBUG: Warmed {warmed} symbols from tick store in {(time.perf_counter() - started) * 1000:.1f}ms")
+        started = time.perf_counter()
+        warmed = warm_bars(tick_store)
+        print(f"DEBUG: Warmed {STRATEGY_TIMEFRAME}/{HARMONIC_TIMEFRAME} bars of {warmed} symbols in {(time.perf_counter() - started) * 1000:.1f}ms")
+    if not REPLAY_FILE:
+        news_fetcher.start()  # replays serve the fixed fallback headlines
+    if TRADING_ROLE == "ingest":
+        snapshot_publisher = SnapshotPublisher(SNAPSHOT_BUS)
+    producer_task = asyncio.create_task(market_producer())
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    for task in (producer_task, bus_task):
+        if task:
+            task.cancel()
+    loop_monitor.stop()
+    profiler.stop()
+    await order_books.stop()
+    for feed in whale_tasks:
+        if isinstance(feed, asyncio.Task):
+            feed.cancel()
+        else:
+            await feed.stop()
+    # Let a strategy step that is still running finish before flushing its ticks
+    strategy_exec.shutdown()
+    if snapshot_publisher:
+        snapshot_publisher.close()
+    if tick_store:
+        tick_store.flush()
+    if tick_recorder:
+        tick_recorder.close()
+    await news_fetcher.stop()
+    await ai_layer.close()
+    await order_gateway.close()
     try:
         await binance_mgr.close()
     except: pass
@@ -51,135 +281,577 @@ async def shutdown_event():
 async def root():
     return {"status": "Trade Engine Online", "environment": "Binance Testnet"}
 
-# Persistent Market History Manager
-class MarketHistoryManager:
-    def __init__(self, window_size=50):
-        self.history = {} # {symbol: [prices]}
-        self.window_size = window_size
-
-    def add_price(self, symbol, price):
-        if symbol not in self.history:
-            # Seed with some initial noise for TA depth
-            import random
-            self.history[symbol] = [price * (1 + random.uniform(-0.005, 0.005)) for _ in range(self.window_size)]
-        
-        self.history[symbol].append(price)
-        if len(self.history[symbol]) > self.window_size:
-            self.history[symbol].pop(0)
+def build_payload(ticker, result, now, stats=None):
+    """Builds one symbol's WebSocket payload from its ticker, strategy result and tick stats."""
+    symbol = ticker['symbol']
+    current_price = float(ticker['price'])
     
-    def get_df(self, symbol):
-        prices = self.history.get(symbol, [])
-        return pd.DataFrame({
-            "close": prices,
-            "high": [p * 1.002 for p in prices],
-            "low": [p * 0.998 for p in prices]
-        })
-
-history_mgr = MarketHistoryManager()
-signal_lock = {} # {symbol: {"signal": str, "expiry": float}}
+    # Aggressive AI Strategy with Stability Lock
+    if symbol not in signal_lock or now > signal_lock[symbol].get('expiry', 0):
+        signal_lock[symbol] = {
+            "data": result["ai_prediction"],
+            "expiry": now + 5.0 
+        }
+        if ai_layer.enabled:
+            ai_contexts[symbol] = {
+                "symbol": symbol,
+                "price": current_price,
+                "trend": result["trend"],
+                "rsi": float(result["indicators"]['rsi']),
+                "ema_9": float(result["indicators"]['ema_9']),
+                "ema_21": float(result["indicators"]['ema_21']),
+                "macd_hist": float(result["indicators"]['MACDh_12_26_9']),
+            }
+    
+    # Real depth when a synced local book exists: top of book and depth-aware talk
+    book = order_books.features(symbol)
+    stable_ai_pred = strategy_eng.apply_depth(signal_lock[symbol]["data"], book)
+    stable_ai_pred = strategy_eng.apply_harmonic(stable_ai_pred, harmonics.active(symbol))
+    if book:
+        ticker = binance_mgr.format_ticker(symbol, current_price, book["bid"], book["ask"])
+
+    # Recommendation Logic
+    recommended_buy = current_price * 0.998
+    recommended_sell = current_price * 1.002
+    if 'BUY' in stable_ai_pred['signal']:
+        recommended_buy = current_price * 0.999
+        recommended_sell = stable_ai_pred['prediction_target']
+    elif 'SELL' in stable_ai_pred['signal']:
+        recommended_buy = stable_ai_pred['prediction_target']
+        recommended_sell = current_price * 1.001
+
+    return {
+        "symbol": symbol,
+        "current_price": current_price,
+        "bid": ticker['bid'],
+        "ask": ticker['ask'],
+        "trend": result["trend"],
+        "ai_prediction": stable_ai_pred,
+        "ai_decision": ai_layer.latest.get(symbol),
+        "whale_alert": whale_detector.whale_alert(symbol, now),
+        "neural_talk": stable_ai_pred.get("neural_talk", "Analyzing market depth..."),
+        "best_gem_hint": symbol.replace("USDT", ""),
+        "recommended_buy": recommended_buy,
+        "recommended_sell": recommended_sell,
+        "rsi": float(result["indicators"]['rsi']),
+        "macd_hist": float(result["indicators"]['MACDh_12_26_9']),
+        **(stats or {}),
+        "timestamp": pd.Timestamp.now().isoformat()
+    }
+
+def tick_stats(snapshot):
+    """% change (24h when streaming, else since first seen), volatility and quote volume per symbol."""
+    symbols = [t['symbol'] for t in snapshot]
+    closes = history_mgr.get_matrix(symbols, "close", INDICATOR_WINDOW)
+    # Std of log returns over the indicator window, in %
+    volatility = np.diff(np.log(closes), axis=1).std(axis=1) * 100
+    live = binance_mgr.stream.tickers if binance_mgr.stream else {}
+    stats = {}
+    for i, ticker in enumerate(snapshot):
+        symbol = ticker['symbol']
+        price = float(ticker['price'])
+        day = live.get(symbol)
+        reference = day["open"] if day else session_open.setdefault(symbol, price)
+        stats[symbol] = {
+            "change_pct": (price / reference - 1) * 100 if reference else 0.0,
+            "volatility": float(volatility[i]),
+            "volume_usdt": day["quote_volume"] if day else None,
+        }
+    return stats
+
+def screen_tick(tick):
+    """Feeds a computed tick into the screener and fills in best_gem_hint."""
+    screener.update_many({
+        symbol: {
+            "change_pct": p.get("change_pct"),
+            "rsi": p["rsi"],
+            "macd_hist": p.get("macd_hist"),
+            "confidence": p["ai_prediction"]["confidence_score"],
+            "volatility": p.get("volatility"),
+            "volume": p.get("volume_usdt"),
+            "signal": p["ai_prediction"]["signal"],
+            "trend": p["trend"],
+        }
+        for symbol, p in tick.items()
+    })
+    gem = screener.best_gem()
+    if gem:
+        hint = gem.replace("USDT", "")
+        for payload in tick.values():
+            payload["best_gem_hint"] = hint
+    return tick
+
+def publish_from_bus(message):
+    """API role: bus messages feed this worker's news cache, screener and its positions' TP/SL."""
+    news_fetcher.load(message["news"])
+    tick = message["tick"]
+    market_hub.publish(screen_tick(tick))
+    if portfolio.n:
+        check_positions(tick)
+
+def process_snapshot(snapshot):
+    """Runs history update + batch strategy for one poll and returns {symbol: payload}."""
+    # 1. Update Persistent History for the whole poll (and queue it for disk)
+    ts = int(time.time() * 1000)
+    with STAGE_SECONDS.time(stage="history"):
+        for ticker in snapshot:
+            price = float(ticker['price'])
+            history_mgr.add_price(ticker['symbol'], price)
+            candle_agg.update(ticker['symbol'], ts, price)
+            if tick_store and not ticker.get('fallback'):
+                tick_store.record(ticker['symbol'], ts, price)  # never persist made-up prices
+    
+    # 2. Stable TA Calculation: last closed bar's result in bar mode, and one
+    #    NumPy pass over the tick history for everything else
+    poll_symbols = [ticker['symbol'] for ticker in snapshot]
+    SYMBOL_TICKS.inc_many(poll_symbols)
+    results = {}
+    if STRATEGY_TIMEFRAME in TIMEFRAMES:
+        results = {s: bar_results[s] for s in poll_symbols if s in bar_results}
+        poll_symbols = [s for s in poll_symbols if s not in results]
+    if poll_symbols:
+        with STAGE_SECONDS.time(stage="indicators"):
+            ind = batch_eng.calculate_indicators(
+                history_mgr.get_matrix(poll_symbols, "close", INDICATOR_WINDOW),
+                history_mgr.get_matrix(poll_symbols, "high", INDICATOR_WINDOW),
+                history_mgr.get_matrix(poll_symbols, "low", INDICATOR_WINDOW),
+            )
+        with STAGE_SECONDS.time(stage="signals"):
+            results.update(batch_eng.build_results(poll_symbols, ind))
+    
+    # 3. Payloads (signal lock, whale, recommendations) and screener indexes
+    now = time.time()
+    with STAGE_SECONDS.time(stage="payload"):
+        stats = tick_stats(snapshot)
+        tick = {t['symbol']: build_payload(t, results[t['symbol']], now, stats[t['symbol']]) for t in snapshot}
+    with STAGE_SECONDS.time(stage="screener"):
+        return screen_tick(tick)
+
+def compute_tick(snapshot):
+    """Worker-thread side of the producer: strategy, bus serialization and disk flush."""
+    if tick_recorder:
+        tick_recorder.record(snapshot)
+    tick = process_snapshot(snapshot)
+    if snapshot_publisher:
+        with STAGE_SECONDS.time(stage="bus_publish"):
+            snapshot_publisher.publish({"tick": tick, "news": news_fetcher.state()})
+    if tick_store:
+        tick_store.maybe_flush()
+    return tick
+
+def check_positions(tick):
+    """Marks open positions to the tick and sends reduce-only exits for triggered TP/SL."""
+    with STAGE_SECONDS.time(stage="portfolio"):
+        exits = portfolio.on_tick(
+            {s: p["current_price"] for s, p in tick.items()},
+            {s: p["trend"] for s, p in tick.items()},
+        )
+    if exits:
+        portfolio.mark_closing([pid for pid, _ in exits])
+        asyncio.create_task(close_positions(exits))
+
+async def close_positions(exits):
+    for pid, reason in exits:
+        position = portfolio.position(pid)
+        if position is None:
+            continue
+        print(f"DEBUG: {reason} for position {pid} ({position['symbol']} {position['side']})")
+        try:
+            await order_gateway.submit({
+                "symbol": position["symbol"],
+                "side": "SELL" if position["side"] == "LONG" else "BUY",
+                "quantity": position["qty"],
+                "reduce_only": True,
+                "client_order_id": f"exit-{pid}",
+            })
+            portfolio.close_position(pid)
+        except OrderError as e:
+            print(f"DEBUG: Exit order for position {pid} failed: {e}")
+            portfolio.mark_closing([pid], closing=False)
+
+async def start_whale_feed(symbols):
+    """Replays recorded trades or connects the aggTrade streams (once)."""
+    if whale_tasks:
+        return
+    if WHALE_REPLAY:
+        whale_tasks.append(asyncio.create_task(replay_trades(WHALE_REPLAY, whale_detector, parse_speed(os.getenv("REPLAY_SPEED", "1")))))
+    elif WHALE_STREAM and not REPLAY_FILE:
+        for i in range(0, len(symbols), STREAMS_PER_CONNECTION):
+            client = AggTradeStreamClient(symbols[i:i + STREAMS_PER_CONNECTION], whale_detector, record_path=WHALE_RECORD)
+            client.start(binance_mgr.session)
+            whale_tasks.append(client)
+
+async def market_producer():
+    """Single background poll loop feeding every connected client through market_hub."""
+    while True:
+        try:
+            symbols = await binance_mgr.get_top_usdt_pairs(limit=SYMBOL_LIMIT)
+            news_fetcher.set_symbols(symbols)
+            await start_whale_feed(symbols)
+            if ORDER_BOOK_SYMBOLS and not REPLAY_FILE and not order_books.streams:
+                order_books.start(symbols[:ORDER_BOOK_SYMBOLS], binance_mgr.session)
+            if MARKET_DATA_MODE == "ws":
+                stream = binance_mgr.get_live_snapshot_stream(symbols)
+            else:
+                stream = binance_mgr.get_snapshot_stream(symbols)
+            async for snapshot in stream:
+                tick = await strategy_exec.submit(compute_tick, snapshot)
+                market_hub.publish(tick)
+                if portfolio.n:
+                    check_positions(tick)
+                if ai_contexts:
+                    # Model calls run in the background; payloads pick the answers up next tick
+                    ai_layer.schedule(dict(ai_contexts))
+                    ai_contexts.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"DEBUG: Market producer error: {e}")
+            await asyncio.sleep(3.0)
+
+@app.get("/api/market/stream")
+async def market_stream_status():
+    """Live market stream health and end-to-end tick latency percentiles."""
+    stream = binance_mgr.stream
+    if stream is None:
+        return {"mode": MARKET_DATA_MODE, "connected": False, "request_weight": binance_mgr.weights.snapshot()}
+    return {
+        "mode": MARKET_DATA_MODE,
+        "request_weight": binance_mgr.weights.snapshot(),
+        "connected": stream.connected,
+        "reconnects": stream.reconnects,
+        "symbols": len(stream.tickers),
+        "latency_ms": stream.latency_percentiles(),
+    }
+
+@app.get("/api/health/loop")
+async def loop_health():
+    """Event-loop lag percentiles and strategy executor load."""
+    return {"lag_ms": loop_monitor.percentiles(), "strategy": strategy_exec.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/profiler")
+async def profiler_report(limit: int = 20):
+    """Hottest functions/stacks collected since the profiler was switched on."""
+    return profiler.report(limit)
+
+@app.post("/api/profiler")
+async def profiler_toggle(body: dict):
+    """Switches the sampling profiler on or off at runtime: {"enabled": true}."""
+    if body.get("enabled"):
+        profiler.start()
+    else:
+        profiler.stop()
+    return profiler.report(limit=0)
 
 @app.websocket("/ws/trading")
 async def trading_socket(websocket: WebSocket):
     print("DEBUG: New WebSocket connection request received")
     await websocket.accept()
     print("DEBUG: WebSocket connection accepted")
+    # Optional subset: /ws/trading?symbols=BTCUSDT,ETHUSDT
+    requested = websocket.query_params.get("symbols")
+    symbols = [s.strip().upper() for s in requested.split(",") if s.strip()] if requested else None
+    sub = market_hub.subscribe(symbols)
     try:
-        news = []
-        try: news = await asyncio.wait_for(news_fetcher.fetch_latest_news(), timeout=2.0)
-        except: pass
+        # News is read from the shared, background-refreshed cache on every push (no
+        # per-connection fetch); changed headlines go out with the next message
+        sent_news = None
         
-        symbols = await binance_mgr.get_top_usdt_pairs()
-        first_run = True
+        if websocket.query_params.get("protocol") == "2":
+            # v2: one batched delta frame per tick (?protocol=2&encoding=json|orjson|msgpack)
+            encoder = DeltaEncoder(
+                encoding=websocket.query_params.get("encoding", "json"),
+                snapshot_every=SNAPSHOT_EVERY,
+            )
+            while True:
+                tick = await sub.get()
+                started = time.perf_counter()
+                news = news_fetcher.get_cached_news()
+                send_news = news != sent_news or rng.random() > 0.95
+                frame = encoder.build_frame(tick, news=news if send_news else None)
+                if frame is None:
+                    continue
+                if send_news:
+                    sent_news = news
+                data, is_binary = encoder.encode(frame)
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage="serialize")
+                with STAGE_SECONDS.time(stage="send"):
+                    if is_binary:
+                        await websocket.send_bytes(data)
+                    else:
+                        await websocket.send_text(data)
         
-        async for ticker in binance_mgr.get_ticker_stream(symbols):
-            symbol = ticker['symbol']
-            current_price = float(ticker['price'])
-            
-            # 1. Update Persistent History
-            history_mgr.add_price(symbol, current_price)
-            df = history_mgr.get_df(symbol)
-            
-            # 2. Stable TA Calculation
-            df = strategy_eng.calculate_indicators(df)
-            trend = strategy_eng.detect_trend(df)
-            
-            # 3. Aggressive AI Strategy with Stability Lock
-            import time
-            now = time.time()
-            
-            if symbol not in signal_lock or now > signal_lock[symbol].get('expiry', 0):
-                ai_pred = strategy_eng.get_ai_prediction(df)
-                signal_lock[symbol] = {
-                    "data": ai_pred,
-                    "expiry": now + 5.0 
-                }
-            
-            stable_ai_pred = signal_lock[symbol]["data"]
-
-            # Whale Tracking Simulation
-            import random
-            is_whale = random.random() > 0.98
-            whale_action = random.choice(["BUY", "SELL"]) if is_whale else None
-            whale_amount = random.uniform(50000, 300000) if is_whale else 0
-
-            # Recommendation Logic
-            recommended_buy = current_price * 0.998
-            recommended_sell = current_price * 1.002
-            if 'BUY' in stable_ai_pred['signal']:
-                recommended_buy = current_price * 0.999
-                recommended_sell = stable_ai_pred['prediction_target']
-            elif 'SELL' in stable_ai_pred['signal']:
-                recommended_buy = stable_ai_pred['prediction_target']
-                recommended_sell = current_price * 1.001
-
-            payload = {
-                "symbol": symbol,
-                "current_price": current_price,
-                "bid": ticker['bid'],
-                "ask": ticker['ask'],
-                "trend": trend,
-                "ai_prediction": stable_ai_pred,
-                "whale_alert": {
-                    "active": is_whale,
-                    "side": whale_action,
-                    "amount_usdt": f"{whale_amount:,.0f}"
-                },
-                "neural_talk": stable_ai_pred.get("neural_talk", "Analyzing market depth..."),
-                "best_gem_hint": symbol.replace("USDT", ""),
-                "recommended_buy": recommended_buy,
-                "recommended_sell": recommended_sell,
-                "rsi": float(df['rsi'].iloc[-1]),
-                "news": news if first_run else (news if random.random() > 0.95 else None),
-                "timestamp": pd.Timestamp.now().isoformat()
-            }
-            first_run = False
-            
-            await websocket.send_text(json.dumps(payload))
-            await asyncio.sleep(0.2) # Balanced updates for smoothness
+        # v1: one JSON message per symbol (existing dashboard)
+        while True:
+            tick = await sub.get()
+            news = news_fetcher.get_cached_news()
+            for payload in tick.values():
+                send_news = news != sent_news or rng.random() > 0.95
+                payload = dict(payload, news=news if send_news else None)
+                if send_news:
+                    sent_news = news
+                
+                with STAGE_SECONDS.time(stage="serialize"):
+                    data = json.dumps(payload)
+                with STAGE_SECONDS.time(stage="send"):
+                    await websocket.send_text(data)
 
     except WebSocketDisconnect:
         print("Market Terminal Disconnected")
     except Exception as e:
         print(f"Global WS Error: {e}")
+    finally:
+        market_hub.unsubscribe(sub)
+
+def track_position(order, request, leverage, result):
+    """
+    Opens the portfolio position for an accepted order at the fill price (last
+    tick price when the fill has none). The id is stored on the gateway's cached
+    response, so an idempotent retry of the same client_order_id does not open a
+    second position. Reduce-only orders close exposure and open nothing.
+    """
+    if request.get("reduce_only"):
+        return None
+    symbol = request["symbol"]
+    latest = market_hub.latest.get(symbol)
+    fill_price = float(result.get("avgPrice") or 0) or float(order.get("price") or 0) or (latest["current_price"] if latest else 0)
+    if fill_price and "position_id" not in result:
+        result["position_id"] = portfolio.open_position(
+            symbol, request["side"], request["quantity"], fill_price, leverage=float(leverage),
+            stop_loss=order.get("stop_loss"), take_profit=order.get("take_profit"),
+        )
+    return result.get("position_id")
+
+def parse_order(order):
+    """
+    (gateway request, leverage) for one /api/futures order body.
+    Raises ValueError naming the bad field; keys the gateway doesn't know are passed through.
+    """
+    if not isinstance(order, dict):
+        raise ValueError("An order must be an object")
+    symbol = order.get("symbol")
+    if not isinstance(symbol, str) or not symbol:
+        raise ValueError("symbol is required")
+    side = str(order.get("side", "")).upper()
+    if side not in ("BUY", "SELL"):
+        raise ValueError(f"side must be BUY or SELL, got {order.get('side')!r}")
+    try:
+        quantity = float(order["quantity"])
+    except (KeyError, TypeError, ValueError):
+        quantity = 0.0
+    if not quantity > 0:  # also rejects NaN
+        raise ValueError("A positive quantity is required")
+    try:
+        leverage = int(order.get("leverage", 10))
+    except (TypeError, ValueError):
+        raise ValueError(f"leverage must be an integer, got {order.get('leverage')!r}")
+    if not 1 <= leverage <= MAX_LEVERAGE:
+        raise ValueError(f"leverage must be between 1 and {MAX_LEVERAGE}, got {leverage}")
+    request = {k: v for k, v in order.items() if k not in ("leverage", "stop_loss", "take_profit")}
+    request.update(symbol=symbol.upper(), side=side, quantity=quantity)
+    if not request.get("client_order_id"):
+        request.pop("client_order_id", None)
+    return request, leverage
 
 @app.post("/api/futures/order")
 async def place_futures_order(order: dict):
     """
-    Simulates placing a Binance Futures order (Long/Short).
+    Places a Binance Futures order (Long/Short) through the order gateway.
+    Required: quantity. Optional: symbol, side, leverage (1-125), type, price,
+    client_order_id (retries with the same id are idempotent).
     """
-    symbol = order.get("symbol", "BTCUSDT")
-    side = order.get("side", "BUY")
-    leverage = order.get("leverage", 10)
+    try:
+        request, leverage = parse_order(dict({"symbol": "BTCUSDT", "side": "BUY"}, **order))
+    except ValueError as e:
+        return JSONResponse({"status": "ERROR", "code": -1, "symbol": order.get("symbol"), "side": order.get("side"),
+                             "message": str(e)}, status_code=400)
+    symbol, side = request["symbol"], request["side"]
     
-    # In production, use client.futures_create_order(...)
     print(f"FUTURES ORDER: {side} {symbol} at {leverage}x Leverage")
+    try:
+        await order_gateway.set_leverage(symbol, leverage)
+        result = await order_gateway.submit(request)
+    except OrderError as e:
+        return {
+            "status": "ERROR",
+            "code": e.code,
+            "client_order_id": e.client_order_id,
+            "symbol": symbol,
+            "side": side,
+            "message": e.msg,
+        }
+    
+    track_position(order, request, leverage, result)
     
     return {
         "status": "SUCCESS",
-        "order_id": "FUT-12345678",
+        "order_id": result["orderId"],
+        "position_id": result.get("position_id"),
+        "client_order_id": result["clientOrderId"],
+        "simulated": order_gateway.simulated,
         "symbol": symbol,
         "side": side,
         "leverage": leverage,
         "message": f"Position opened for {symbol} ({side})"
     }
 
+@app.post("/api/futures/orders")
+async def place_futures_orders(body: dict):
+    """Places several orders via batchOrders (5 per exchange request): {"orders": [...]}."""
+    orders = body.get("orders")
+    if not isinstance(orders, list) or not orders:
+        return JSONResponse({"status": "ERROR", "code": -1, "message": "orders must be a non-empty list"}, status_code=400)
+    requests, leverages = [], {}
+    for index, order in enumerate(orders):
+        try:
+            request, leverage = parse_order(order)
+            if leverages.setdefault(request["symbol"], leverage) != leverage:
+                raise ValueError(f"leverage {leverage} differs from an earlier {request['symbol']} order in this batch")
+        except ValueError as e:
+            return JSONResponse({"status": "ERROR", "code": -1, "index": index, "message": str(e)}, status_code=400)
+        requests.append((request, leverage))
+    try:
+        for symbol, leverage in leverages.items():
+            await order_gateway.set_leverage(symbol, leverage)
+    except OrderError as e:
+        return [{"status": "ERROR", "code": e.code, "message": e.msg} for _ in requests]
+    results = await order_gateway.submit_batch([r for r, _ in requests])
+    response = []
+    for order, (request, leverage), r in zip(orders, requests, results):
+        if isinstance(r, OrderError):
+            response.append({"status": "ERROR", "code": r.code, "client_order_id": r.client_order_id, "message": r.msg})
+        elif isinstance(r, Exception):
+            response.append({"status": "ERROR", "code": -1, "message": str(r)})
+        else:
+            response.append({
+                "status": "SUCCESS",
+                "order_id": r["orderId"],
+                "position_id": track_position(order, request, leverage, r),
+                "client_order_id": r["clientOrderId"],
+            })
+    return response
+
+@app.get("/api/screener")
+async def screener_query(request: Request, metric: str = "confidence", k: int = 10, order: str = "desc"):
+    """
+    Top (order=desc) or bottom (order=asc) K symbols by change_pct, rsi, macd_hist,
+    confidence, volatility or volume. Filters: min_<metric>, max_<metric>, signal, trend.
+    """
+    try:
+        filters = screener.parse_filters(request.query_params)
+        return {"metric": metric, "order": order, "results": screener.query(metric, k, order, filters)}
+    except ValueError as e:
+        return {"status": "ERROR", "message": str(e)}
+
+def parse_screener_query(source, base=None, filters=None):
+    """Validated {"metric", "k", "order", "filters"} from URL parameters or a /ws/screener message."""
+    query = dict(base or {"metric": "confidence", "k": 10, "order": "desc", "filters": {}})
+    query.update({key: source[key] for key in ("metric", "order") if key in source})
+    if "k" in source:
+        query["k"] = int(source["k"])
+    if filters is not None:
+        if not isinstance(filters, dict):
+            raise ValueError("filters must be an object")
+        query["filters"] = screener.parse_filters(filters)
+    screener.validate(query["metric"], query["k"], query["order"])
+    return query
+
+@app.websocket("/ws/screener")
+async def screener_socket(websocket: WebSocket):
+    """
+    Pushes the screener result once per tick. The query comes from the URL
+    parameters (same as /api/screener) and can be replaced at any time by
+    sending {"metric", "k", "order", "filters": {...}}.
+    """
+    await websocket.accept()
+    params = dict(websocket.query_params)
+    try:
+        query = parse_screener_query(params, filters=params)
+    except (ValueError, TypeError) as e:
+        await websocket.send_text(json.dumps({"type": "error", "message": str(e)}))
+        await websocket.close(code=1008)
+        return
+    sub = market_hub.subscribe()
+
+    async def read_queries():
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+                if not isinstance(message, dict):
+                    raise ValueError("Expected a JSON object")
+                query.update(parse_screener_query(message, query, message.get("filters")))
+            except (ValueError, TypeError) as e:
+                # Keep the previous query; the client gets told what was wrong
+                await websocket.send_text(json.dumps({"type": "error", "message": str(e)}))
+
+    reader = asyncio.create_task(read_queries())
+    try:
+        while True:
+            await sub.get()
+            if reader.done():
+                break  # client went away (or sent something unreadable)
+            try:
+                results = screener.query(query["metric"], query["k"], query["order"], query["filters"])
+                await websocket.send_text(json.dumps({"type": "screener", **query, "results": results}))
+            except ValueError as e:
+                await websocket.send_text(json.dumps({"type": "error", "message": str(e)}))
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Screener WS Error: {e}")
+    finally:
+        reader.cancel()
+        market_hub.unsubscribe(sub)
+
+@app.get("/api/orderbook/{symbol}")
+async def order_book_view(symbol: str, levels: int = 10):
+    """Top levels and depth features of a local order book."""
+    book = order_books.books.get(symbol.upper())
+    if book is None:
+        return {"symbol": symbol.upper(), "synced": False, "status": order_books.status()}
+    return {
+        "symbol": book.symbol,
+        "synced": book.synced,
+        "last_update_id": book.last_update_id,
+        "features": book.features(),
+        "bids": book.bids.levels(levels),
+        "asks": book.asks.levels(levels),
+    }
+
+@app.get("/api/whales")
+async def whale_activity(symbol: str = None, limit: int = 50):
+    """Recent whale trades, adaptive thresholds and net flow."""
+    response = {"trades_seen": whale_detector.trades, "alerts": whale_detector.recent_alerts(symbol, limit)}
+    if symbol:
+        response["flow"] = whale_detector.flow(symbol)
+        response["whale_alert"] = whale_detector.whale_alert(symbol)
+    return response
+
+@app.get("/api/harmonics")
+async def harmonic_patterns(symbol: str = None, limit: int = 50):
+    """Recently completed XABCD patterns and the symbol's active one."""
+    response = {"timeframe": HARMONIC_TIMEFRAME, "patterns": harmonics.recent(symbol, limit)}
+    if symbol:
+        response["active"] = harmonics.active(symbol)
+    return response
+
+@app.get("/api/ai/status")
+async def ai_status():
+    """AI decision layer: cache hit rate, queue and token budget."""
+    return ai_layer.stats()
+
+@app.get("/api/portfolio")
+async def portfolio_status(limit: int = 100):
+    """Open positions with PnL, stops, liquidation distance and exposure per asset."""
+    return portfolio.summary(limit)
+
+@app.get("/api/futures/orders")
+async def futures_order_book(limit: int = 50):
+    """In-flight and recent orders plus rate limiter state."""
+    return order_gateway.snapshot(limit)
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Tests import the app the same way uvicorn does (`app.main`, `app.engine.*`) from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# No disk persistence, market streams or seeded randomness leaking between runs
+os.environ.setdefault("TICK_STORE_DIR", "")
+os.environ.setdefault("TRADING_SEED", "7")
+os.environ.setdefault("WHALE_STREAM", "0")
+os.environ.setdefault("ORDER_BOOK_SYMBOLS", "0")
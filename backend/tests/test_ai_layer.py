@@ -0,0 +1,155 @@
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+import pytest
+from aiohttp import web
+
+from app.engine.ai_layer import AIDecisionLayer
+
+
+class StubModel:
+    """OpenAI-compatible /v1/chat/completions that answers every state after `delay` seconds."""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.runner = None
+        self.base_url = None
+
+    async def completions(self, request):
+        body = await request.json()
+        markets = json.loads(body["messages"][-1]["content"])["markets"]
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        decisions = [
+            {"id": m["id"], "decision": "BUY" if m["trend"] == "BULLISH" else "HOLD", "reason": "stub", "confidence": 70}
+            for m in markets
+        ]
+        return web.json_response({
+            "id": f"chatcmpl-{self.calls}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps({"decisions": decisions})},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5 * len(markets), "total_tokens": 10 + 5 * len(markets)},
+        })
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.completions)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}/v1"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+def random_state(rng, symbol):
+    return {
+        "symbol": symbol,
+        "trend": rng.choice(["BULLISH", "BEARISH"]),
+        "rsi": rng.uniform(40, 60),
+        "ema_9": 100.0 + rng.uniform(-1, 1),
+        "ema_21": 100.0,
+        "macd_hist": rng.uniform(-1, 1),
+    }
+
+
+def test_batched_ticks_hit_the_cache_and_stay_fast():
+    rng = random.Random(3)
+
+    async def scenario():
+        async with StubModel(delay=0.02) as stub:
+            layer = AIDecisionLayer(base_url=stub.base_url, batch_size=20, max_wait=0.01, timeout=2.0)
+            latencies = []
+            try:
+                for _ in range(20):
+                    contexts = {f"S{i}USDT": random_state(rng, f"S{i}USDT") for i in range(100)}
+                    started = time.perf_counter()
+                    decisions = await layer.decide_many(contexts)
+                    latencies.append(time.perf_counter() - started)
+                    assert all(d["source"] in ("model", "cache") for d in decisions.values())
+            finally:
+                await layer.close()
+            return layer, stub, latencies
+
+    layer, stub, latencies = asyncio.run(scenario())
+    # 2 trends x 4 RSI buckets x 2 EMA sides x 2 MACD signs = 32 states
+    assert len(layer.cache) <= 32 and layer.hit_rate() > 0.9
+    assert stub.calls <= 4 and stub.max_in_flight <= layer.max_concurrency
+    assert np.percentile(latencies[5:], 50) < 0.05  # warm ticks are answered from the cache
+
+
+def test_slow_model_falls_back_within_the_timeout():
+    async def scenario():
+        async with StubModel(delay=2.0) as stub:
+            layer = AIDecisionLayer(base_url=stub.base_url, max_wait=0.0, timeout=0.3)
+            try:
+                started = time.perf_counter()
+                decision = await layer.decide(random_state(random.Random(1), "BTCUSDT"))
+                return decision, time.perf_counter() - started
+            finally:
+                await layer.close()
+
+    decision, elapsed = asyncio.run(scenario())
+    assert decision["source"] == "fallback"
+    assert elapsed < 1.0
+
+
+def test_late_caller_of_a_queued_state_gets_its_own_timeout():
+    state = dict(random_state(random.Random(4), "ETHUSDT"), trend="BULLISH")
+
+    async def scenario():
+        async with StubModel(delay=0.05) as stub:
+            layer = AIDecisionLayer(base_url=stub.base_url, max_wait=0.0, timeout=0.5, max_concurrency=1)
+            try:
+                early = asyncio.create_task(layer.decide(state))
+                await asyncio.sleep(0)
+                await layer._slots.acquire()  # the only slot is busy: the state stays queued
+                await asyncio.sleep(0.55)  # the early caller has given up by now
+                late = asyncio.create_task(layer.decide(state))
+                await asyncio.sleep(0.1)
+                layer._slots.release()
+                return await early, await late, stub.calls
+            finally:
+                await layer.close()
+
+    early, late, calls = asyncio.run(scenario())
+    assert early["source"] == "fallback"
+    assert late["source"] == "model" and late["decision"] == "BUY" and calls == 1
+
+
+@pytest.mark.parametrize("missing", [{"rsi": None}, {"ema_9": None}, {"ema_21": None}, {"rsi": float("nan")}])
+def test_incomplete_indicators_fall_back_to_the_rules(missing):
+    state = dict(random_state(random.Random(2), "BTCUSDT"), **missing)
+    state = {k: v for k, v in state.items() if k != "ema_21" or v is not None}  # absent, not just None
+
+    async def scenario():
+        layer = AIDecisionLayer(base_url="http://127.0.0.1:9/v1")
+        try:
+            return await layer.decide(state)
+        finally:
+            await layer.close()
+
+    decision = asyncio.run(scenario())
+    assert decision["source"] == "rules"
+    assert decision["decision"] in ("BUY", "SELL", "HOLD")
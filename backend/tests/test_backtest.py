@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.engine.backtest import KLINE_COLUMNS, Backtester, load_klines
+
+
+def random_walk(seed, n=20_000):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    spread = np.abs(rng.normal(0, 0.002, n))
+    return pd.DataFrame({"close": closes, "high": closes * (1 + spread), "low": closes * (1 - spread)})
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_fast_mode_trades_match_the_exact_walk(seed):
+    bars = random_walk(seed)
+    backtester = Backtester(exit_chunk=64)  # small chunks: exits found across chunk boundaries too
+    exact = backtester.run(bars, mode="exact")
+    fast = backtester.run(bars, mode="fast")
+    assert len(exact["trades"]) > 5
+    assert [(t["entry_index"], t["exit_index"], t["reason"]) for t in fast["trades"]] == \
+        [(t["entry_index"], t["exit_index"], t["reason"]) for t in exact["trades"]]
+    for f, e in zip(fast["trades"], exact["trades"]):
+        assert f["pnl"] == pytest.approx(e["pnl"], rel=1e-9, abs=1e-9)
+    assert fast["summary"] == pytest.approx(exact["summary"])
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        Backtester().run(random_walk(0, 100), mode="turbo")
+
+
+def test_summary_of_no_trades():
+    summary = Backtester(initial_balance=500.0).summarize([])
+    assert summary == {"trades": 0, "total_pnl": 0.0, "return_pct": 0.0, "final_balance": 500.0,
+                       "max_drawdown_pct": 0.0, "win_rate": 0.0, "fees": 0.0}
+
+
+def kline_rows(n=5):
+    return [[1_700_000_000_000 + i * 60_000, 100 + i, 101 + i, 99 + i, 100.5 + i, 10 * i,
+             1_700_000_059_999 + i * 60_000, 1000 * i, i, 5 * i, 500 * i, 0] for i in range(n)]
+
+
+@pytest.mark.parametrize("header", [True, False])
+def test_load_klines_with_and_without_a_header(tmp_path, header):
+    path = tmp_path / "klines.csv"
+    pd.DataFrame(kline_rows(), columns=KLINE_COLUMNS).to_csv(path, index=False, header=header)
+    df = load_klines(str(path))
+    assert len(df) == 5 and list(df.columns) == KLINE_COLUMNS
+    assert df["close"].tolist() == [100.5, 101.5, 102.5, 103.5, 104.5]
+    assert df["volume"].dtype == np.float64
+
+
+def test_load_klines_with_fewer_columns(tmp_path):
+    path = tmp_path / "short.csv"
+    pd.DataFrame([row[:6] for row in kline_rows()]).to_csv(path, index=False, header=False)
+    df = load_klines(str(path))
+    assert list(df.columns) == KLINE_COLUMNS[:6] and df["high"].iloc[0] == 101.0
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.engine.batch_strategy import BatchStrategyEngine
+from app.engine.strategy import StrategyEngine
+
+
+def random_indicators(n, seed):
+    """Random last-row indicators, with EMA ties and RSI exactly on the thresholds mixed in."""
+    rng = np.random.default_rng(seed)
+    ema_9 = rng.uniform(90, 110, n)
+    ema_21 = np.where(rng.random(n) < 0.1, ema_9, rng.uniform(90, 110, n))
+    rsi = np.where(rng.random(n) < 0.2, rng.choice([30.0, 48.0, 50.0, 52.0, 70.0], n), rng.uniform(0, 100, n))
+    close = rng.uniform(90, 110, n)
+    return {"close": close, "ema_9": ema_9, "ema_21": ema_21, "rsi": rsi}
+
+
+@pytest.mark.parametrize("strategy", [
+    StrategyEngine(),
+    StrategyEngine(signal_rsi=55.0, trend_rsi_bull=60.0, trend_rsi_bear=40.0, target_pct=3.0, stop_pct=1.0),
+])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_batch_labels_match_the_scalar_engine_per_row(strategy, seed):
+    batch = BatchStrategyEngine(strategy)
+    ind = random_indicators(3000, seed)
+    trends = batch.detect_trend(ind)
+    signals = batch.get_signals(ind)
+    results = batch.build_results([f"S{i}" for i in range(3000)], ind)
+    assert {"BULLISH", "BEARISH", "SIDEWAYS"} <= set(trends) and {"BUY", "SELL", "HOLD"} <= set(signals)
+    for i in range(3000):
+        row = {field: float(values[i]) for field, values in ind.items()}
+        prediction = strategy.get_ai_prediction(row)
+        assert trends[i] == strategy.detect_trend(row), row
+        assert signals[i] == prediction["signal"], row
+        assert results[f"S{i}"]["trend"] == trends[i]
+        assert results[f"S{i}"]["ai_prediction"] == prediction
+
+
+def test_evaluate_matches_the_pandas_pipeline_per_symbol():
+    rng = np.random.default_rng(5)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (200, 50)), axis=1))
+    strategy = StrategyEngine()
+    results = BatchStrategyEngine(strategy).evaluate([f"S{i}" for i in range(200)], closes)
+    for i in range(200):
+        df = strategy.calculate_indicators(pd.DataFrame({"close": closes[i], "high": closes[i] * 1.002,
+                                                         "low": closes[i] * 0.998}))
+        assert results[f"S{i}"]["trend"] == strategy.detect_trend(df)
+        assert results[f"S{i}"]["ai_prediction"]["signal"] == strategy.get_ai_prediction(df)["signal"]
@@ -0,0 +1,59 @@
+import json
+import sys
+
+import pytest
+
+from app import bench
+from app.engine.replay import ReplayBinanceManager, TickRecorder
+
+
+def test_empty_recording_is_rejected(tmp_path):
+    empty = tmp_path / "empty.jsonl"
+    empty.write_text("")
+    with pytest.raises(ValueError):
+        bench.replay_snapshots(str(empty), 10, 100)  # used to loop forever
+    with pytest.raises(ValueError):
+        ReplayBinanceManager(str(empty))
+
+    no_tickers = tmp_path / "no_tickers.jsonl"
+    no_tickers.write_text('{"ts": 1, "tickers": []}\n')
+    with pytest.raises(ValueError):
+        bench.replay_snapshots(str(no_tickers), 10, 100)
+
+
+def test_short_recording_is_looped(tmp_path):
+    path = tmp_path / "ticks.jsonl"
+    recorder = TickRecorder(str(path))
+    for snapshot in bench.synthetic_snapshots(3, 4):
+        recorder.record(snapshot)
+    recorder.close()
+    snapshots = bench.replay_snapshots(str(path), 2, 10)
+    assert len(snapshots) == 10 and all(len(s) == 2 for s in snapshots)
+    assert snapshots[4] == snapshots[0]
+
+
+def test_compare_flags_throughput_and_memory_regressions():
+    baseline = {"10": {"ticks_per_sec": 100.0, "peak_memory_kb": 50.0}, "_meta": {"cpus": 1}}
+    assert bench.compare({"10": {"ticks_per_sec": 85.0, "peak_memory_kb": 55.0}}, baseline, 0.2) == []
+    failures = bench.compare({"10": {"ticks_per_sec": 70.0, "peak_memory_kb": 70.0}}, baseline, 0.2)
+    assert len(failures) == 2
+    assert bench.compare({"100": {"ticks_per_sec": 1.0, "peak_memory_kb": 1.0}}, baseline, 0.2) == []
+
+
+def test_committed_baseline_covers_the_default_suite():
+    with open(bench.BASELINE_PATH) as f:
+        baseline = json.load(f)
+    for size in ("10", "100", "1000"):
+        assert baseline[size]["ticks_per_sec"] > 0 and baseline[size]["peak_memory_kb"] > 0
+
+
+@pytest.mark.parametrize("factor, exit_code", [(0.01, 0), (100.0, 1)])
+def test_baseline_check_exit_code(tmp_path, monkeypatch, factor, exit_code):
+    saved = tmp_path / "baseline.json"
+    monkeypatch.setattr(sys, "argv", ["bench", "--symbols", "5", "--ticks", "20", "--save-baseline", str(saved)])
+    assert bench.run() == 0
+    baseline = json.loads(saved.read_text())
+    baseline["5"]["ticks_per_sec"] *= factor
+    saved.write_text(json.dumps(baseline))
+    monkeypatch.setattr(sys, "argv", ["bench", "--symbols", "5", "--ticks", "20", "--baseline", str(saved)])
+    assert bench.run() == exit_code
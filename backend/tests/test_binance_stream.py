@@ -0,0 +1,145 @@
+import asyncio
+import json
+import time
+
+import pytest
+from aiohttp import WSMsgType, web
+
+from app.engine.binance_client import BinanceManager
+from app.engine.binance_stream import BinanceStreamClient
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def book_frame(symbol, bid, ask, event_ms):
+    return json.dumps({"stream": "!bookTicker", "data": {
+        "u": 1, "s": symbol, "b": str(bid), "B": "1.5", "a": str(ask), "A": "2.5", "E": event_ms,
+    }})
+
+
+def mini_frame(prices, event_ms):
+    return json.dumps({"stream": "!miniTicker@arr", "data": [
+        {"e": "24hrMiniTicker", "E": event_ms, "s": symbol, "c": str(price), "o": str(price * 0.9),
+         "h": str(price * 1.1), "l": str(price * 0.8), "v": "100", "q": str(price * 100)}
+        for symbol, price in prices.items()
+    ]})
+
+
+class FakeMarket:
+    """Combined-stream socket that drops the first `drop` connections, plus /api/v3/ticker/price."""
+
+    def __init__(self, frames, drop=1, rest_prices=None):
+        self.frames = frames  # callable -> list of raw frames, sent on each kept connection
+        self.drop = drop
+        self.rest_prices = rest_prices or {}
+        self.connections = 0
+        self.rest_calls = 0
+        self.runner = None
+        self.url = None
+
+    async def stream(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        if self.connections <= self.drop:
+            await ws.close()
+            return ws
+        for frame in self.frames():
+            await ws.send_str(frame)
+        async for msg in ws:
+            if msg.type == WSMsgType.CLOSE:
+                break
+        return ws
+
+    async def ticker_price(self, request):
+        self.rest_calls += 1
+        return web.json_response([{"symbol": s, "price": str(p)} for s, p in self.rest_prices.items()])
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/stream", self.stream)
+        app.router.add_get("/api/v3/ticker/price", self.ticker_price)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.02)
+
+
+def test_frames_update_book_tickers_and_latency():
+    client = BinanceStreamClient(url="ws://unused")
+    now_ms = time.time() * 1000
+    for lag in range(1, 101):
+        client.handle_message(book_frame("BTCUSDT", 100.0, 100.5, now_ms - lag))
+    client.handle_message(mini_frame({"BTCUSDT": 100.2, "ETHUSDT": 50.0}, now_ms - 10))
+
+    assert client.book["BTCUSDT"] == {"bid": 100.0, "bid_qty": 1.5, "ask": 100.5, "ask_qty": 2.5}
+    assert client.tickers["ETHUSDT"]["price"] == 50.0
+    latency = client.latency_percentiles()
+    assert latency["samples"] == 102
+    assert latency["p50"] == pytest.approx(50, abs=5)
+    assert latency["p50"] <= latency["p90"] <= latency["p99"] < 110
+    assert BinanceStreamClient(url="ws://unused").latency_percentiles()["p50"] is None
+
+
+def test_client_reconnects_and_replays_frames():
+    def frames():
+        now_ms = time.time() * 1000
+        return [book_frame("BTCUSDT", 100.0, 100.5, now_ms), mini_frame({"BTCUSDT": 100.2}, now_ms)]
+
+    async def scenario():
+        async with FakeMarket(frames, drop=1) as market:
+            client = BinanceStreamClient(url=f"{market.url}/stream")
+            client.start()
+            try:
+                await wait_for(lambda: "BTCUSDT" in client.tickers)
+                return client, market.connections
+            finally:
+                await client.stop()
+
+    client, connections = run(scenario())
+    assert connections == 2 and client.reconnects == 1
+    assert client.book["BTCUSDT"]["ask"] == 100.5
+    assert client.latency_percentiles()["samples"] == 2
+    assert not client.connected
+
+
+def test_live_snapshots_fall_back_to_rest_while_the_socket_is_down(monkeypatch):
+    monkeypatch.setenv("EXCHANGE_INFO_CACHE", "")
+
+    def frames():
+        now_ms = time.time() * 1000
+        return [book_frame("BTCUSDT", 101.0, 101.2, now_ms), mini_frame({"BTCUSDT": 101.1}, now_ms)]
+
+    async def scenario():
+        async with FakeMarket(frames, drop=1, rest_prices={"BTCUSDT": 99.0}) as market:
+            manager = BinanceManager()
+            manager.base_url = market.url
+            manager.stream = BinanceStreamClient(url=f"{market.url}/stream")
+            stream = manager.get_live_snapshot_stream(["BTCUSDT"], interval=0.05)
+            try:
+                first = await stream.__anext__()  # socket not up yet: one REST poll
+                second = await stream.__anext__()
+                return first, second, market.rest_calls
+            finally:
+                await stream.aclose()
+                await manager.close()
+
+    first, second, rest_calls = run(scenario())
+    assert first[0]["price"] == "99.00" and rest_calls == 1
+    assert second[0]["price"] == "101.10"
+    assert (second[0]["bid"], second[0]["ask"]) == ("101.00", "101.20")
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from app import main
+from app.engine.candles import TIMEFRAMES, CandleAggregator, CandleSeries, ticks_to_bars
+from app.engine.harmonics import HarmonicScanner
+from app.engine.indicators import IndicatorEngine
+from app.engine.tick_store import TickStore
+
+MINUTE = TIMEFRAMES["1m"]
+
+
+def random_ticks(n_minutes, per_minute=6, seed=0, start=1_700_000_040_000 + 20_000):
+    rng = np.random.default_rng(seed)
+    ts = start + np.arange(n_minutes * per_minute, dtype=np.int64) * (MINUTE // per_minute)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, len(ts))))
+    return ts, prices
+
+
+@pytest.fixture
+def bar_state(monkeypatch):
+    """Fresh bar-path globals on 1m bars for main.on_bar_close / main.warm_bars."""
+    agg = CandleAggregator(timeframes=("1m",))
+    agg.on_close(main.on_bar_close)
+    monkeypatch.setattr(main, "candle_agg", agg)
+    monkeypatch.setattr(main, "bar_indicators", IndicatorEngine())
+    monkeypatch.setattr(main, "bar_results", {})
+    monkeypatch.setattr(main, "harmonics", HarmonicScanner())
+    monkeypatch.setattr(main, "STRATEGY_TIMEFRAME", "1m")
+    monkeypatch.setattr(main, "HARMONIC_TIMEFRAME", "1m")
+    monkeypatch.setattr(main, "BAR_WARMUP_BARS", 15)
+    return agg
+
+
+def test_ticks_to_bars_matches_live_series():
+    ts, prices = random_ticks(30)
+    series = CandleSeries("1m")
+    closed = [bar for bar in (series.update(int(t), float(p)) for t, p in zip(ts, prices)) if bar]
+    assert closed[0]["partial"] and not any(bar["partial"] for bar in closed[1:])
+
+    bars = ticks_to_bars(ts, prices, "1m")
+    # first bucket (partial) and last bucket (still forming) are dropped
+    assert len(bars["close"]) == len(closed) - 1
+    for field in ("open_time", "open", "high", "low", "close"):
+        assert bars[field].tolist() == [bar[field] for bar in closed[1:]]
+
+
+def test_ticks_to_bars_needs_a_complete_bucket():
+    ts, prices = random_ticks(1)  # a partial bucket and a forming one
+    assert len(ticks_to_bars(ts, prices, "1m")["close"]) == 0
+    assert len(ticks_to_bars([], [], "1m")["close"]) == 0
+
+
+def test_partial_bar_skipped_and_tick_signal_kept_until_warm(bar_state):
+    ts, prices = random_ticks(20)
+    closes = []
+
+    @bar_state.on_close
+    def check(symbol, timeframe, bar):  # runs after main.on_bar_close
+        if not bar["partial"]:
+            closes.append(bar["close"])
+        assert main.bar_indicators.count(symbol) == len(closes)
+        # no bar signal until BAR_WARMUP_BARS full bars were seen
+        assert (symbol in main.bar_results) == (len(closes) >= main.BAR_WARMUP_BARS)
+
+    for t, p in zip(ts, prices):
+        bar_state.update("BTCUSDT", int(t), float(p))
+    assert closes == ticks_to_bars(ts, prices, "1m")["close"].tolist()
+    assert main.harmonics.trackers["BTCUSDT"].bars == len(closes)
+
+
+def test_warm_bars_from_tick_store(bar_state, tmp_path):
+    store = TickStore(str(tmp_path))
+    ts, prices = random_ticks(40, seed=3)
+    for t, p in zip(ts, prices):
+        store.record("ETHUSDT", int(t), float(p))
+    store.flush()
+
+    assert main.warm_bars(store, now_ms=int(ts[-1]) + 1) == 1
+    bars = ticks_to_bars(ts, prices, "1m")
+    assert main.bar_indicators.count("ETHUSDT") == len(bars["close"])
+    assert "ETHUSDT" in main.bar_results
+    assert main.candle_agg.get_bars("ETHUSDT", "1m")["close"].tolist() == bars["close"].tolist()
+
+    reference = IndicatorEngine()
+    expected = reference.warm("ETHUSDT", bars["close"].tolist(), bars["high"].tolist(), bars["low"].tolist())
+    assert main.bar_results["ETHUSDT"]["indicators"] == expected
+
+    # live ticks after the restart: the first live bar is partial and must not be applied
+    count = main.bar_indicators.count("ETHUSDT")
+    later = int(ts[-1]) + 5 * MINUTE
+    main.candle_agg.update("ETHUSDT", later, 101.0)
+    main.candle_agg.update("ETHUSDT", later + MINUTE, 102.0)
+    assert main.bar_indicators.count("ETHUSDT") == count
+    main.candle_agg.update("ETHUSDT", later + 2 * MINUTE, 103.0)
+    assert main.bar_indicators.count("ETHUSDT") == count + 1
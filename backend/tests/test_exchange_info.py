@@ -0,0 +1,149 @@
+import asyncio
+import json
+
+from aiohttp import web
+
+from app.engine import binance_client
+from app.engine.binance_client import BinanceManager
+from app.engine.exchange_info import ExchangeInfoCache
+from app.engine.rate_limit import RequestWeightTracker
+
+EXCHANGE_INFO = {"symbols": [
+    {"symbol": "BTCUSDT", "status": "TRADING", "baseAsset": "BTC", "quoteAsset": "USDT", "filters": []},
+    {"symbol": "ETHUSDT", "status": "TRADING", "baseAsset": "ETH", "quoteAsset": "USDT", "filters": []},
+    {"symbol": "ETHBTC", "status": "TRADING", "baseAsset": "ETH", "quoteAsset": "BTC", "filters": []},
+    {"symbol": "OLDUSDT", "status": "BREAK", "baseAsset": "OLD", "quoteAsset": "USDT", "filters": []},
+]}
+PRICES = {"BTCUSDT": 95000.0, "ETHUSDT": 3500.0, "SOLUSDT": 210.0, "XRPUSDT": 2.5, "DOGEUSDT": 0.4}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class MockRest:
+    """/api/v3/exchangeInfo and /api/v3/ticker/price with a used-weight header."""
+
+    def __init__(self):
+        self.requests = []  # (path, query)
+        self.used_weight = 0
+        self.runner = None
+        self.url = None
+
+    def _respond(self, body, weight, status=200):
+        self.used_weight += weight
+        return web.json_response(body, status=status, headers={"X-MBX-USED-WEIGHT-1M": str(self.used_weight)})
+
+    async def exchange_info(self, request):
+        self.requests.append((request.path, dict(request.query)))
+        return self._respond(EXCHANGE_INFO, 20)
+
+    async def ticker_price(self, request):
+        self.requests.append((request.path, dict(request.query)))
+        if "symbols" not in request.query:
+            return self._respond([{"symbol": s, "price": str(p)} for s, p in PRICES.items()], 4)
+        symbols = json.loads(request.query["symbols"])
+        if any(s not in PRICES for s in symbols):
+            return self._respond({"code": -1121, "msg": "Invalid symbol."}, 4, status=400)
+        return self._respond([{"symbol": s, "price": str(PRICES[s])} for s in symbols], 4)
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/api/v3/exchangeInfo", self.exchange_info)
+        app.router.add_get("/api/v3/ticker/price", self.ticker_price)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+def manager_for(rest, cache_path=""):
+    manager = BinanceManager()
+    manager.base_url = rest.url
+    manager.exchange_info = ExchangeInfoCache(cache_path)
+    return manager
+
+
+def test_cache_is_trimmed_persisted_and_expires(tmp_path):
+    path = str(tmp_path / "exchange_info.json")
+    cache = ExchangeInfoCache(path, ttl=3600.0)
+    assert not cache.is_fresh()
+    cache.update(EXCHANGE_INFO)
+    assert cache.usdt_pairs() == ["BTCUSDT", "ETHUSDT"]
+    assert "filters" not in cache.symbols[0]
+
+    warm = ExchangeInfoCache(path, ttl=3600.0)
+    assert warm.is_fresh() and warm.symbols == cache.symbols
+    assert not ExchangeInfoCache(path, ttl=0.0).is_fresh()
+    assert not ExchangeInfoCache(str(tmp_path / "missing.json")).is_fresh()
+
+
+def test_exchange_info_is_downloaded_once_and_restarts_start_warm(tmp_path):
+    path = str(tmp_path / "exchange_info.json")
+
+    async def scenario():
+        async with MockRest() as rest:
+            first = manager_for(rest, path)
+            pairs = [await first.get_top_usdt_pairs() for _ in range(3)]
+            await first.close()
+            restarted = manager_for(rest, path)
+            pairs.append(await restarted.get_top_usdt_pairs(limit=1))
+            await restarted.close()
+            return pairs, rest.requests
+
+    pairs, requests = run(scenario())
+    assert pairs == [["BTCUSDT", "ETHUSDT"]] * 3 + [["BTCUSDT"]]
+    assert [path for path, _ in requests] == ["/api/v3/exchangeInfo"]
+
+
+def test_prices_are_requested_in_batches_with_weight_tracking(monkeypatch):
+    monkeypatch.setattr(binance_client, "PRICE_BATCH_SIZE", 2)
+    symbols = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT", "DOGEUSDT"]
+
+    async def scenario():
+        async with MockRest() as rest:
+            manager = manager_for(rest)
+            try:
+                prices = await manager.get_latest_prices_rest(symbols)
+                return prices, rest.requests, manager
+            finally:
+                await manager.close()
+
+    prices, requests, manager = run(scenario())
+    assert prices == {s: PRICES[s] for s in symbols}
+    assert [json.loads(query["symbols"]) for _, query in requests] == [symbols[0:2], symbols[2:4], symbols[4:]]
+    assert manager.weights.snapshot()["used_1m"] == 12 and manager.weights.total == 12
+    assert manager.fallback_symbols == set() and manager.bytes_received > 0
+
+
+def test_unknown_symbol_falls_back_to_all_tickers():
+    async def scenario():
+        async with MockRest() as rest:
+            manager = manager_for(rest)
+            try:
+                prices = await manager.get_latest_prices_rest(["BTCUSDT", "GONEUSDT"])
+                snapshot = manager.rest_snapshot(["BTCUSDT", "GONEUSDT"], prices)
+                return prices, snapshot, rest.requests, manager.fallback_symbols
+            finally:
+                await manager.close()
+
+    prices, snapshot, requests, fallback = run(scenario())
+    assert prices["BTCUSDT"] == PRICES["BTCUSDT"]
+    assert "symbols" in requests[0][1] and requests[1][1] == {}
+    assert fallback == {"GONEUSDT"}
+    assert [t.get("fallback", False) for t in snapshot] == [False, True]
+
+
+def test_weight_tracker_follows_the_exchange_header():
+    tracker = RequestWeightTracker(limit=100, safety=0.5)
+    run(tracker.acquire(10))
+    tracker.update_from_headers({"X-MBX-USED-WEIGHT-1M": "40"})
+    assert tracker.snapshot()["used_1m"] == 40
+    tracker.update_from_headers({"X-MBX-USED-WEIGHT-1M": "5"})  # never trust a lower count mid-window
+    assert tracker.snapshot() == {"used_1m": 40, "limit_1m": 100, "total": 10, "waits": 0}
+    assert tracker.budget == 50
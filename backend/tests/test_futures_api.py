@@ -0,0 +1,62 @@
+from fastapi.testclient import TestClient
+import app.main as main
+
+client = TestClient(main.app)  # no startup: no market data, simulated gateway
+
+
+def test_orders_without_client_id_open_separate_positions():
+    before = main.portfolio.n
+    first = client.post("/api/futures/order", json={"symbol": "BTCUSDT", "side": "BUY", "quantity": 0.5, "price": 60000}).json()
+    second = client.post("/api/futures/order", json={"symbol": "ETHUSDT", "side": "SELL", "quantity": 2, "price": 3000}).json()
+    assert first["status"] == second["status"] == "SUCCESS"
+    assert first["order_id"] != second["order_id"]
+    assert first["position_id"] != second["position_id"]
+    assert main.portfolio.n == before + 2
+    eth = main.portfolio.position(second["position_id"])
+    assert eth["symbol"] == "ETHUSDT" and eth["side"] == "SHORT" and eth["qty"] == 2.0
+
+
+def test_retry_with_same_client_id_keeps_one_position():
+    order = {"symbol": "SOLUSDT", "side": "BUY", "quantity": 3, "price": 150, "client_order_id": "api-retry-1"}
+    first = client.post("/api/futures/order", json=order).json()
+    before = main.portfolio.n
+    again = client.post("/api/futures/order", json=order).json()
+    assert again["order_id"] == first["order_id"]
+    assert again["position_id"] == first["position_id"]
+    assert main.portfolio.n == before
+
+
+def test_quantity_is_required():
+    for body in ({"symbol": "BTCUSDT", "side": "BUY"}, {"symbol": "BTCUSDT", "side": "BUY", "quantity": 0}):
+        response = client.post("/api/futures/order", json=body).json()
+        assert response["status"] == "ERROR"
+
+
+def test_invalid_leverage_is_rejected():
+    for leverage in ("abc", 0, 500):
+        response = client.post("/api/futures/order", json={"symbol": "BTCUSDT", "side": "BUY", "quantity": 1, "leverage": leverage})
+        assert response.status_code == 400 and response.json()["status"] == "ERROR"
+
+
+def test_batch_orders_are_validated_with_the_bad_index():
+    good = {"symbol": "BTCUSDT", "side": "BUY", "quantity": 1}
+    for bad in ({"side": "BUY", "quantity": 1}, {"symbol": "BTCUSDT", "side": "HOLD", "quantity": 1},
+                {"symbol": "BTCUSDT", "side": "SELL", "quantity": -2}, dict(good, leverage="abc"),
+                dict(good, leverage=20)):  # differs from the 10x default of the first BTCUSDT order
+        response = client.post("/api/futures/orders", json={"orders": [good, bad]})
+        assert response.status_code == 400 and response.json()["index"] == 1, bad
+    assert client.post("/api/futures/orders", json={"orders": []}).status_code == 400
+    results = client.post("/api/futures/orders", json={"orders": [good, dict(good, side="sell")]}).json()
+    assert [r["status"] for r in results] == ["SUCCESS", "SUCCESS"]
+
+
+def test_batch_fills_open_positions():
+    before = main.portfolio.n
+    orders = [{"symbol": "ADAUSDT", "side": "BUY", "quantity": 100, "price": 0.5, "stop_loss": 0.4},
+              {"symbol": "XRPUSDT", "side": "SELL", "quantity": 50, "price": 2.0, "leverage": 5},
+              {"symbol": "XRPUSDT", "side": "BUY", "quantity": 50, "price": 2.0, "leverage": 5, "reduce_only": True}]
+    results = client.post("/api/futures/orders", json={"orders": orders}).json()
+    assert main.portfolio.n == before + 2 and results[2]["position_id"] is None
+    ada, xrp = (main.portfolio.position(r["position_id"]) for r in results[:2])
+    assert ada["symbol"] == "ADAUSDT" and ada["user_stop_loss"] == 0.4
+    assert xrp["side"] == "SHORT" and xrp["leverage"] == 5.0
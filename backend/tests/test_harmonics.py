@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.engine.backtest import Backtester
+from app.engine.harmonics import (PIVOT_HIGH, PIVOT_LOW, HarmonicScanner, ZigZagTracker, match_xabcd,
+                                  scan_histories, scan_series)
+
+
+def xabcd(ab, bc, xd, x=100.0, a=120.0):
+    """Bullish XABCD prices from exact ratios (X low, A high, ..., D low)."""
+    xa = a - x
+    b = a - ab * xa
+    c = b + bc * (a - b)
+    d = a - xd * xa
+    return [x, a, b, c, d]
+
+
+# Hand-labelled fixtures: exact ratios inside each pattern's windows
+FIXTURES = {
+    "GARTLEY": xabcd(ab=0.618, bc=0.5, xd=0.786),
+    "BAT": xabcd(ab=0.45, bc=0.886, xd=0.886),
+    "BUTTERFLY": xabcd(ab=0.786, bc=0.886, xd=1.272),
+    "CRAB": xabcd(ab=0.5, bc=0.886, xd=1.618),
+}
+
+
+def as_pivots(prices, bullish=True):
+    kinds = [PIVOT_LOW, PIVOT_HIGH] * 3
+    if not bullish:
+        prices = [200.0 - p for p in prices]  # mirror: D becomes a high
+        kinds = kinds[1:]
+    return [(bar * 5, price, kind) for bar, (price, kind) in enumerate(zip(prices, kinds))]
+
+
+def as_bars(prices, bars_per_leg=5, confirm=0.05):
+    """Straight legs between the pivots, then a move off D big enough to confirm it."""
+    d = prices[-1]
+    points = prices + [d * (1 + confirm) if prices[-2] > d else d * (1 - confirm)]
+    path = [points[0]]
+    for start, end in zip(points, points[1:]):
+        path.extend(np.linspace(start, end, bars_per_leg + 1)[1:].tolist())
+    return np.array(path)
+
+
+@pytest.mark.parametrize("name", FIXTURES)
+@pytest.mark.parametrize("bullish", [True, False])
+def test_exact_ratio_fixtures_match(name, bullish):
+    pattern = match_xabcd(as_pivots(FIXTURES[name], bullish))
+    side = "BULLISH" if bullish else "BEARISH"
+    assert pattern["pattern"] == f"{side}_{name}"
+    assert pattern["error"] == pytest.approx(0.0, abs=1e-12)
+
+
+def test_off_ratio_legs_do_not_match():
+    assert match_xabcd(as_pivots(xabcd(ab=0.3, bc=0.5, xd=0.786))) is None  # AB too shallow for any pattern
+    assert match_xabcd(as_pivots(xabcd(ab=0.618, bc=0.5, xd=0.786))[1:]) is None  # only four pivots
+
+
+def test_zigzag_confirms_alternating_pivots():
+    tracker = ZigZagTracker(threshold_pct=2.0)
+    prices = as_bars(FIXTURES["GARTLEY"])
+    confirmed = [p for p in (tracker.update(price) for price in prices) if p]
+    assert [p[1] for p in confirmed] == pytest.approx(FIXTURES["GARTLEY"])
+    assert [p[2] for p in confirmed] == [PIVOT_LOW, PIVOT_HIGH] * 2 + [PIVOT_LOW]
+
+
+@pytest.mark.parametrize("name", FIXTURES)
+def test_live_scanner_and_batch_scan_agree(name):
+    prices = as_bars(FIXTURES[name])
+    scanner = HarmonicScanner(threshold_pct=2.0)
+    live = [p for p in (scanner.update("XUSDT", price) for price in prices) if p]
+    batch = scan_series(prices)
+    assert [p["pattern"] for p in live] == [p["pattern"] for p in batch] == [f"BULLISH_{name}"]
+    assert live[0]["confirmed_bar"] == batch[0]["confirmed_bar"]
+    assert scanner.active("XUSDT")["pattern"] == f"BULLISH_{name}"
+    histories = scan_histories({"XUSDT": pd.DataFrame({"high": prices, "low": prices}), "YUSDT": (prices, prices)})
+    assert histories["XUSDT"] == histories["YUSDT"] == batch
+
+
+def test_backtester_reports_and_tags_harmonics():
+    prices = as_bars(FIXTURES["GARTLEY"])
+    bars = pd.DataFrame({"close": prices, "high": prices, "low": prices})
+    result = Backtester(warmup=0, harmonic_pct=2.0).run(bars)
+    assert [p["pattern"] for p in result["harmonics"]] == ["BULLISH_GARTLEY"]
+    assert "harmonics" not in Backtester(warmup=0).run(bars)
+
+    backtester = Backtester(harmonic_ttl=10)
+    confirmed = result["harmonics"][0]["confirmed_bar"]
+    trades = [{"entry_index": confirmed - 1}, {"entry_index": confirmed + 3}, {"entry_index": confirmed + 11}]
+    backtester.tag_harmonics(trades, result["harmonics"])
+    assert [t["harmonic"] for t in trades] == [None, "BULLISH_GARTLEY", None]
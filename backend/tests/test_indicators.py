@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.engine.batch_strategy import BatchStrategyEngine
+from app.engine.indicators import IndicatorEngine, IndicatorState
+from app.engine.strategy import StrategyEngine
+
+FIELDS = ("ema_9", "ema_21", "rsi", "MACD_12_26_9", "MACDh_12_26_9", "MACDs_12_26_9",
+          "fib_0", "fib_236", "fib_382", "fib_500", "fib_618", "fib_100")
+
+
+def random_walk(n, seed=3):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    spread = np.abs(rng.normal(0, 0.002, n))
+    return closes, closes * (1 + spread), closes * (1 - spread)
+
+
+def pandas_row(strategy, closes, highs, lows):
+    df = pd.DataFrame({"close": closes, "high": highs, "low": lows})
+    return strategy.calculate_indicators(df).iloc[-1]
+
+
+@pytest.mark.parametrize("window", [30, 50])
+def test_windowed_state_matches_pandas_and_batch_every_tick(window):
+    closes, highs, lows = random_walk(250)
+    strategy = StrategyEngine()
+    batch = BatchStrategyEngine(strategy)
+    state = IndicatorState(window_size=window)
+    for t in range(len(closes)):
+        snapshot = state.update(closes[t], highs[t], lows[t])
+        lo = max(0, t + 1 - window)
+        expected = pandas_row(strategy, closes[lo:t + 1], highs[lo:t + 1], lows[lo:t + 1])
+        vectorized = batch.calculate_indicators(closes[None, lo:t + 1], highs[None, lo:t + 1], lows[None, lo:t + 1])
+        for field in FIELDS:
+            assert snapshot[field] == pytest.approx(expected[field], rel=1e-9, abs=1e-9), (t, field)
+            assert vectorized[field][0] == pytest.approx(expected[field], rel=1e-9, abs=1e-9), (t, field)
+        assert strategy.detect_trend(snapshot) == strategy.detect_trend(expected)
+        assert strategy.get_ai_prediction(snapshot)["signal"] == strategy.get_ai_prediction(expected)["signal"]
+
+
+def test_full_history_state_matches_pandas_over_the_whole_series():
+    closes, highs, lows = random_walk(400, seed=11)
+    strategy = StrategyEngine(ema_fast=7, ema_slow=30)
+    df = strategy.calculate_indicators(pd.DataFrame({"close": closes, "high": highs, "low": lows}))
+    state = IndicatorState(ema_fast=7, ema_slow=30, windowed=False)
+    for t in range(len(closes)):
+        snapshot = state.update(closes[t], highs[t], lows[t])
+        for field in ("ema_9", "ema_21", "rsi", "MACD_12_26_9", "MACDh_12_26_9", "MACDs_12_26_9"):
+            assert snapshot[field] == pytest.approx(df[field].iloc[t], rel=1e-9, abs=1e-9), (t, field)
+
+
+def test_rsi_edges_follow_pandas():
+    strategy = StrategyEngine()
+    for closes in ([100.0] * 20, list(np.linspace(100, 120, 20)), list(np.linspace(120, 100, 20))):
+        state = IndicatorState(window_size=50)
+        for t, close in enumerate(closes):
+            snapshot = state.update(close)
+            arr = np.array(closes[:t + 1])
+            assert snapshot["rsi"] == pytest.approx(pandas_row(strategy, arr, arr * 1.002, arr * 0.998)["rsi"]), t
+
+
+def test_engine_warm_equals_replaying_updates():
+    closes, _, _ = random_walk(120, seed=5)
+    engine = IndicatorEngine(window_size=50)
+    warmed = engine.warm("BTCUSDT", closes)
+    state = IndicatorState(window_size=50)
+    for close in closes:
+        replayed = state.update(close)
+    assert warmed == replayed
+
+
+def test_windowed_state_does_not_drift_over_a_long_run():
+    closes, highs, lows = random_walk(30_000, seed=8)
+    closes, highs, lows = closes * 600, highs * 600, lows * 600  # BTC-sized prices
+    strategy = StrategyEngine()
+    state = IndicatorState(window_size=50)
+    for t in range(len(closes)):
+        snapshot = state.update(closes[t], highs[t], lows[t])
+        if t % 5000 == 4999:
+            expected = pandas_row(strategy, closes[t - 49:t + 1], highs[t - 49:t + 1], lows[t - 49:t + 1])
+            for field in ("ema_9", "ema_21", "MACD_12_26_9", "MACDs_12_26_9"):
+                assert snapshot[field] == pytest.approx(expected[field], rel=1e-9, abs=1e-8), (t, field)
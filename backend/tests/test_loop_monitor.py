@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import numpy as np
+
+from app.engine.batch_strategy import BatchStrategyEngine
+from app.engine.loop_monitor import LoopLagMonitor, StrategyExecutor
+from app.engine.strategy import StrategyEngine
+
+
+def strategy_step(engine, closes):
+    """One CPU-bound strategy pass over a few thousand symbols."""
+    indicators = engine.calculate_indicators(closes, closes * 1.002, closes * 0.998)
+    return engine.get_signals(indicators)
+
+
+def run_with_monitor(job, jobs=5):
+    async def scenario():
+        monitor = LoopLagMonitor(interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        durations = []
+        for _ in range(jobs):
+            started = time.perf_counter()
+            await job()
+            durations.append(time.perf_counter() - started)
+            await asyncio.sleep(0.02)
+        monitor.stop()
+        return monitor, min(durations) * 1000
+
+    return asyncio.run(scenario())
+
+
+def test_monitor_reports_a_blocking_call():
+    async def blocking():
+        time.sleep(0.2)
+
+    monitor, _ = run_with_monitor(blocking, jobs=2)
+    assert monitor.max_lag >= 150
+    stats = monitor.percentiles()
+    assert stats["samples"] == len(monitor.lags) and stats["max"] == monitor.max_lag
+
+
+def test_strategy_on_the_executor_keeps_the_loop_responsive():
+    engine = BatchStrategyEngine(StrategyEngine())
+    closes = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.004, (4000, 200)), axis=1))
+    executor = StrategyExecutor()
+
+    async def inline():
+        strategy_step(engine, closes)
+
+    async def offloaded():
+        await executor.submit(strategy_step, engine, closes)
+
+    blocked, duration = run_with_monitor(inline)
+    assert blocked.max_lag >= 0.5 * duration  # sanity: the step is long enough to matter
+    responsive, _ = run_with_monitor(offloaded)
+    executor.shutdown()
+    assert executor.completed == 5 and executor.in_flight == 0
+    assert responsive.percentiles()["p99"] < max(25.0, 0.25 * duration), (responsive.percentiles(), duration)
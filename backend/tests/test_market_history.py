@@ -0,0 +1,58 @@
+import asyncio
+import random
+
+import numpy as np
+
+from app import main
+from app.engine.binance_client import BinanceManager
+from app.engine.market_history import MarketHistoryManager
+from app.engine.tick_store import TickStore
+
+
+def test_short_history_does_not_shrink_the_matrix(tmp_path):
+    store = TickStore(str(tmp_path))
+    for i in range(3):
+        store.record("NEWUSDT", 1_000 + i, 10.0 + i)
+    store.flush()
+
+    history = MarketHistoryManager(window_size=50, rng=random.Random(0))
+    for i in range(60):
+        history.add_price("BTCUSDT", 100.0 + i)
+    assert history.warm_from_store(store, ["NEWUSDT"]) == 1
+
+    matrix = history.get_matrix(["BTCUSDT", "NEWUSDT"], "close", 50)
+    assert matrix.shape == (2, 50)
+    np.testing.assert_array_equal(matrix[0], history.get_closes("BTCUSDT"))
+    # the 3 stored ticks, left-padded with the oldest one
+    np.testing.assert_array_equal(matrix[1], [10.0] * 48 + [11.0, 12.0])
+    assert history.get_matrix(["NEWUSDT"], "close", 50).shape == (1, 3)
+
+
+def test_emergency_seed_prices_are_flagged():
+    manager = BinanceManager()
+
+    async def fail(*args, **kwargs):
+        raise RuntimeError("offline")
+
+    manager._get_json = fail
+    prices = asyncio.run(manager.get_latest_prices_rest(["BTCUSDT", "ETHUSDT"]))
+    snapshot = manager.rest_snapshot(["BTCUSDT", "ETHUSDT"], prices)
+    assert [t.get("fallback") for t in snapshot] == [True, True]
+
+    async def ok(*args, **kwargs):
+        return 200, [{"symbol": "BTCUSDT", "price": "65000.5"}]
+
+    manager._get_json = ok
+    prices = asyncio.run(manager.get_latest_prices_rest(["BTCUSDT", "ETHUSDT"]))
+    snapshot = manager.rest_snapshot(["BTCUSDT", "ETHUSDT"], prices)
+    assert [t.get("fallback") for t in snapshot] == [None, True]  # ETHUSDT missing from the response
+
+
+def test_fallback_ticks_never_reach_the_tick_store(tmp_path, monkeypatch):
+    store = TickStore(str(tmp_path))
+    monkeypatch.setattr(main, "tick_store", store)
+    real = BinanceManager.format_ticker("STOREAUSDT", 2.0)
+    seeded = dict(BinanceManager.format_ticker("STOREBUSDT", 100.0), fallback=True)
+    main.process_snapshot([real, seeded])
+    store.flush()
+    assert store.symbols() == ["STOREAUSDT"]
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.engine.market_hub import MarketHub
+
+SYMBOLS = [f"HUB{i}USDT" for i in range(100)]
+
+
+def make_tick(n):
+    return {s: {"symbol": s, "current_price": 100.0 + n, "n": n} for s in SYMBOLS}
+
+
+def test_hub_fans_out_filters_and_drops_the_oldest_for_slow_consumers():
+    async def run():
+        hub = MarketHub(queue_size=2)
+        everything = hub.subscribe()
+        two = hub.subscribe(["HUB0USDT", "HUB1USDT"])
+        none_of_them = hub.subscribe(["OTHERUSDT"])
+        assert hub.client_count == 3
+        hub.publish(make_tick(0))
+        assert len(await everything.get()) == len(SYMBOLS)
+        assert set(await two.get()) == {"HUB0USDT", "HUB1USDT"}
+        assert none_of_them.queue.empty()  # no matching symbols: nothing queued
+
+        for n in range(1, 6):  # `two` is not reading: it keeps only the newest 2 ticks
+            hub.publish(make_tick(n))
+        assert two.dropped == 3 and everything.dropped == 3
+        assert [(await two.get())["HUB0USDT"]["n"] for _ in range(2)] == [4, 5]
+
+        hub.unsubscribe(two)
+        hub.unsubscribe(two)  # twice is harmless
+        hub.publish(make_tick(6))
+        assert two.queue.empty() and hub.client_count == 2
+
+        late = hub.subscribe(["HUB5USDT"])  # new clients start from the latest state
+        assert (await late.get()) == {"HUB5USDT": make_tick(6)["HUB5USDT"]}
+
+    asyncio.run(run())
+
+
+def test_500_clients_against_a_stand_in_feed():
+    n_ticks = 50
+
+    async def client(hub, symbols, slow, received):
+        sub = hub.subscribe(symbols)
+        try:
+            while True:
+                tick = await sub.get()
+                received.append(tick)
+                if next(iter(tick.values()))["n"] == n_ticks - 1:
+                    return sub
+                if slow:
+                    await asyncio.sleep(0.01)
+        finally:
+            hub.unsubscribe(sub)
+
+    async def run():
+        hub = MarketHub(queue_size=4)
+        clients = []
+        for i in range(500):
+            symbols = SYMBOLS[i % 20:i % 20 + 5] if i % 2 else None  # half follow 5 symbols
+            clients.append((symbols, i % 10 == 0, []))  # every 10th client is slow
+        tasks = [asyncio.create_task(client(hub, symbols, slow, received)) for symbols, slow, received in clients]
+        await asyncio.sleep(0)
+        assert hub.client_count == 500
+        started = time.perf_counter()
+        for n in range(n_ticks):
+            hub.publish(make_tick(n))
+            await asyncio.sleep(0.001)  # the feed, one tick per poll
+        subs = await asyncio.wait_for(asyncio.gather(*tasks), timeout=30)
+        return clients, subs, time.perf_counter() - started, hub
+
+    clients, subs, elapsed, hub = asyncio.run(run())
+    assert hub.client_count == 0
+    for (symbols, slow, received), sub in zip(clients, subs):
+        assert next(iter(received[-1].values()))["n"] == 49  # everyone ends on the latest tick
+        if symbols:
+            assert all(set(tick) == set(symbols) for tick in received)
+        else:
+            assert all(len(tick) == len(SYMBOLS) for tick in received)
+        if slow:
+            assert sub.dropped > 0 and len(received) + sub.dropped == 50
+        else:
+            assert sub.dropped == 0 and [next(iter(t.values()))["n"] for t in received] == list(range(50))
+    assert elapsed < 20
+
+
+def test_v1_socket_sends_a_whole_tick_without_pacing(monkeypatch):
+    hub = MarketHub()
+    monkeypatch.setattr(main, "market_hub", hub)
+    hub.publish(make_tick(0))
+    client = TestClient(main.app)
+    started = time.perf_counter()
+    with client.websocket_connect("/ws/trading") as ws:
+        messages = [json.loads(ws.receive_text()) for _ in SYMBOLS]
+    # previously 0.2 s per symbol: 20 s for one 100-symbol tick
+    assert time.perf_counter() - started < 5
+    assert [m["symbol"] for m in messages] == SYMBOLS
+    assert messages[0]["news"] and all(m["current_price"] == 100.0 for m in messages)
@@ -0,0 +1,37 @@
+import threading
+import time
+
+from app.engine.metrics import SamplingProfiler
+
+
+def busy_loop(stop, depth=0):
+    if depth < 30:
+        return busy_loop(stop, depth + 1)  # many distinct stack depths -> many new keys
+    while not stop.is_set():
+        sum(range(200))
+
+
+def test_report_while_sampling():
+    stop = threading.Event()
+    workers = [threading.Thread(target=busy_loop, args=(stop,)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    profiler = SamplingProfiler(interval=0.0005)
+    profiler.start()
+    try:
+        deadline = time.time() + 0.5
+        reports = 0
+        while time.time() < deadline:
+            report = profiler.report(limit=5)  # used to race the sampler: "dictionary changed size"
+            assert report["running"]
+            reports += 1
+    finally:
+        profiler.stop()
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+    report = profiler.report(limit=5)
+    assert reports > 10 and report["samples"] > 0
+    assert any(name.endswith(":busy_loop") for name, _ in report["top_functions"])
+    assert sum(n for _, n in profiler.report(limit=None)["top_stacks"]) >= report["samples"]
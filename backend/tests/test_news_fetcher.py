@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.engine.news_fetcher import FALLBACK_NEWS, NewsFetcher, SentimentScorer
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "SHIBUSDT", "NOTUSDT", "ONEUSDT", "PEOPLEUSDT", "THEUSDT", "SUSDT", "OPUSDT"]
+
+
+@pytest.fixture
+def scorer():
+    scorer = SentimentScorer()
+    scorer.set_symbols(SYMBOLS)
+    return scorer
+
+
+@pytest.mark.parametrize("text", [
+    "Why NOT buy the dip? ONE analyst says PEOPLE are THE problem",
+    "Markets are not the one thing people watch",
+    "THE S&P 500 closes higher",
+    "OP-ED: regulation is coming",
+    "eth and btc in lowercase prose",
+])
+def test_common_words_are_not_tickers(scorer, text):
+    assert scorer.score([text])[0][1] == []
+
+
+@pytest.mark.parametrize("text, tags", [
+    ("BTC and ETH rally", ["BTC", "ETH"]),
+    ("Bitcoin and ethereum rally", ["BTC", "ETH"]),
+    ("$NOT surges after listing", ["NOT"]),
+    ("NOT/USDT and ONEUSDT perpetuals go live", ["NOT", "ONE"]),
+    ("$S and OP-USDT volumes spike", ["OP", "S"]),
+    ("Binance adds a SHIB/EUR pair", ["SHIB"]),
+])
+def test_tickers_names_and_pairs_are_tagged(scorer, text, tags):
+    assert scorer.score([text])[0][1] == tags
+
+
+def test_batch_keeps_tags_and_sentiment_per_article(scorer):
+    results = scorer.score(["BTC bullish breakout", "People sell everything", "$THE crash"])
+    assert results == [("POSITIVE", ["BTC"]), ("NEGATIVE", []), ("NEGATIVE", ["THE"])]
+
+
+class StubNewsApi:
+    """Answers like the news API: 304 while the client's ETag is current."""
+
+    def __init__(self):
+        self.etag = '"v1"'
+        self.titles = ["BTC bullish breakout"]
+        self.requests = []
+
+    def handler(self, request):
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304)
+        data = [{"title": t, "body": "", "url": f"https://news/{i}"} for i, t in enumerate(self.titles)]
+        return httpx.Response(200, json={"Data": data}, headers={"ETag": self.etag})
+
+
+def stub_fetcher(api, **kwargs):
+    fetcher = NewsFetcher(**kwargs)
+    fetcher.set_symbols(["BTCUSDT", "ETHUSDT"])
+    fetcher.client = httpx.AsyncClient(transport=httpx.MockTransport(api.handler))
+    return fetcher
+
+
+def test_refresh_is_conditional_and_304_keeps_the_articles():
+    api = StubNewsApi()
+    fetcher = stub_fetcher(api)
+
+    async def scenario():
+        first = await fetcher.refresh()
+        again = await fetcher.refresh()
+        await fetcher.stop()
+        return first, again
+
+    first, again = asyncio.run(scenario())
+    assert "If-None-Match" not in api.requests[0].headers
+    assert api.requests[1].headers["If-None-Match"] == '"v1"'
+    assert again == first == [{"title": "BTC bullish breakout", "sentiment": "POSITIVE",
+                               "url": "https://news/0", "symbols": ["BTC"]}]
+    assert fetcher.version == 1 and fetcher.get_cached_news() == first
+
+
+def test_expired_cache_is_refetched():
+    api = StubNewsApi()
+    fetcher = stub_fetcher(api, refresh_interval=60.0, ttl=300.0)
+
+    async def scenario():
+        await fetcher.fetch_latest_news()
+        await fetcher.fetch_latest_news()  # fresh: served from the cache
+        assert len(api.requests) == 1
+        api.etag, api.titles = '"v2"', ["ETH crash"]
+        fetcher.fetched_at = time.time() - 61
+        news = await fetcher.fetch_latest_news()
+        await fetcher.stop()
+        return news
+
+    news = asyncio.run(scenario())
+    assert len(api.requests) == 2 and api.requests[1].headers["If-None-Match"] == '"v1"'
+    assert news[0]["title"] == "ETH crash" and fetcher.version == 2
+    fetcher.fetched_at = time.time() - 301
+    assert fetcher.get_cached_news() == FALLBACK_NEWS  # past the TTL nothing stale is served
+
+
+def test_api_workers_load_the_ingest_cache():
+    api = StubNewsApi()
+    ingest = stub_fetcher(api)
+    asyncio.run(ingest.refresh())
+    worker = NewsFetcher()
+    worker.load(ingest.state())
+    assert worker.get_cached_news() == ingest.get_cached_news() and worker.version == 1
+    ingest.fetched_at += 10  # a 304: same articles, newer timestamp
+    worker.load(ingest.state())
+    assert worker.fetched_at == ingest.fetched_at
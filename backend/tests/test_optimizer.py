@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.engine import optimizer
+from app.engine.optimizer import StrategyOptimizer
+
+
+@pytest.fixture
+def opt(tmp_path):
+    rng = np.random.default_rng(0)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.003, 600)))
+    bars = pd.DataFrame({"close": closes, "high": closes * 1.002, "low": closes * 0.998})
+    with StrategyOptimizer(bars, max_workers=1, cache_dir=str(tmp_path / "cache")) as opt:
+        yield opt
+
+
+def test_random_search_gives_up_on_an_invalid_space(opt):
+    with pytest.raises(ValueError):
+        opt.random_search({"ema_fast": [30, 40], "ema_slow": [10, 21]}, n_iter=5)  # used to loop forever
+    with pytest.raises(ValueError):
+        opt.grid_search({"ema_fast": [30], "ema_slow": [10]})
+    # a mostly invalid space still returns the valid draws
+    results = opt.random_search({"ema_fast": (5, 60), "ema_slow": [6]}, n_iter=3)
+    assert results and all(r["params"]["ema_fast"] < 6 for r in results)
+
+
+def test_cache_key_changes_with_the_code(opt, monkeypatch):
+    params = {"ema_fast": 5, "ema_slow": 21}
+    key = opt._cache_key(params, 0, 600)
+    assert key == opt._cache_key(dict(params), 0, 600)
+    monkeypatch.setattr(optimizer, "_code_version", "edited-strategy")
+    assert opt._cache_key(params, 0, 600) != key
+
+
+def test_cached_results_are_reused_until_the_code_changes(opt, monkeypatch):
+    grid = {"ema_fast": [5, 9], "signal_rsi": [45.0, 55.0]}
+    first = opt.grid_search(grid)
+    assert len(first) == 4
+
+    def fail(*args, **kwargs):
+        raise AssertionError("should have been served from the cache")
+
+    monkeypatch.setattr(optimizer, "run_backtest", fail)
+    assert opt.grid_search(grid) == first
+    monkeypatch.setattr(optimizer, "_code_version", "edited-strategy")
+    with pytest.raises(AssertionError):
+        opt.grid_search(grid)
@@ -0,0 +1,188 @@
+import asyncio
+import random
+import time
+
+import pytest
+from aiohttp import web
+
+from app.engine.binance_client import BinanceManager
+from app.engine.exchange_info import ExchangeInfoCache
+from app.engine.order_book import BookSide, LocalOrderBook, OrderBookManager
+
+
+class ReferenceExchange:
+    """Dict-based book that emits Binance-style diff-depth events and snapshots."""
+
+    def __init__(self, symbol="BTCUSDT", seed=1):
+        self.symbol = symbol
+        self.rng = random.Random(seed)
+        self.bids = {round(99.9 - i * 0.1, 1): 1.0 + i for i in range(20)}
+        self.asks = {round(100.1 + i * 0.1, 1): 1.0 + i for i in range(20)}
+        self.update_id = 100
+        self.history = {}  # {update id: snapshot after it}
+
+    def snapshot(self, limit=1000):
+        return {
+            "lastUpdateId": self.update_id,
+            "bids": [[str(p), str(q)] for p, q in sorted(self.bids.items(), reverse=True)[:limit]],
+            "asks": [[str(p), str(q)] for p, q in sorted(self.asks.items())[:limit]],
+        }
+
+    def event(self):
+        changes = {"b": [], "a": []}
+        for side, book, prices in (("b", self.bids, (95.0, 99.9)), ("a", self.asks, (100.1, 105.0))):
+            for _ in range(self.rng.randint(1, 4)):
+                price = round(self.rng.uniform(*prices), 1)
+                qty = 0.0 if price in book and self.rng.random() < 0.3 else round(self.rng.uniform(0.1, 5.0), 3)
+                if qty:
+                    book[price] = qty
+                else:
+                    book.pop(price, None)
+                changes[side].append([str(price), str(qty)])
+        first = self.update_id + 1
+        self.update_id += self.rng.randint(1, 3)  # one event can cover several update ids
+        self.history[self.update_id] = self.snapshot()
+        return {"e": "depthUpdate", "E": int(time.time() * 1000), "s": self.symbol,
+                "U": first, "u": self.update_id, **changes}
+
+
+def book_levels(book, n=1000):
+    return book.bids.levels(n), book.asks.levels(n)
+
+
+def expected_levels(snapshot):
+    return ([(float(p), float(q)) for p, q in snapshot["bids"]], [(float(p), float(q)) for p, q in snapshot["asks"]])
+
+
+def test_book_side_matches_a_sorted_dict():
+    rng = random.Random(4)
+    for is_bid in (True, False):
+        side = BookSide(is_bid, capacity=30)
+        reference = {}
+        for _ in range(3000):
+            price = round(rng.uniform(90, 110), 1)
+            qty = 0.0 if rng.random() < 0.3 else rng.uniform(0.1, 5)
+            side.set(price, qty)
+            if qty:
+                reference[price] = qty
+            else:
+                reference.pop(price, None)
+            best = sorted(reference.items(), reverse=is_bid)
+            if len(best) > 30:
+                # A full side keeps the best 30 levels; whatever fell off the end is gone for good
+                reference = dict(best[:30])
+                best = best[:30]
+            assert side.levels(30) == best
+
+
+def test_snapshot_applies_buffered_events_after_it():
+    exchange = ReferenceExchange()
+    book = LocalOrderBook("BTCUSDT")
+    events = [exchange.event() for _ in range(10)]
+    snapshot_id = events[3]["u"]
+    for event in events:
+        assert book.on_event(event) is False  # buffered until the snapshot arrives
+    assert book.features() is None
+
+    assert book.load_snapshot(exchange.history[snapshot_id])
+    assert book.last_update_id == events[-1]["u"] and book.updates == 6
+    assert book_levels(book) == expected_levels(exchange.history[events[-1]["u"]])
+    for _ in range(200):
+        assert book.on_event(exchange.event())
+    assert book_levels(book) == expected_levels(exchange.snapshot())
+    assert book.on_event(events[0])  # stale events are ignored
+    assert book_levels(book) == expected_levels(exchange.snapshot())
+
+
+def test_gap_unsyncs_the_book_until_a_new_snapshot():
+    exchange = ReferenceExchange()
+    book = LocalOrderBook("BTCUSDT")
+    book.load_snapshot(exchange.snapshot())
+    assert book.on_event(exchange.event())
+    exchange.event()  # lost
+    assert book.on_event(exchange.event()) is False
+    assert not book.synced and book.gaps == 1 and book.features() is None
+
+    later = [exchange.event() for _ in range(3)]
+    for event in later:
+        book.on_event(event)
+    assert book.load_snapshot(exchange.history[later[0]["u"]])
+    assert book.synced and book_levels(book) == expected_levels(exchange.snapshot())
+
+
+def test_features_from_a_hand_built_book():
+    book = LocalOrderBook("BTCUSDT", bands_bps=(10, 100))
+    book.load_snapshot({
+        "lastUpdateId": 1,
+        "bids": [["99.95", "2"], ["99.5", "4"], ["98", "100"]],
+        "asks": [["100.05", "1"], ["100.5", "1"], ["102", "100"]],
+    })
+    features = book.features()
+    assert (features["bid"], features["ask"], features["bid_qty"], features["ask_qty"]) == (99.95, 100.05, 2.0, 1.0)
+    assert features["spread"] == pytest.approx(0.1) and features["spread_bps"] == pytest.approx(10.0)
+    # 10bps band: 99.9-100.1 holds the top level of each side
+    assert features["bid_depth_10bps"] == pytest.approx(2 * 100.0)
+    assert features["ask_depth_10bps"] == pytest.approx(1 * 100.0)
+    assert features["imbalance_10bps"] == pytest.approx(1 / 3)
+    # 100bps band: 99-101 adds the second levels
+    assert book.depth(100) == (pytest.approx(6 * 100.0), pytest.approx(2 * 100.0))
+    assert book.imbalance(100) == pytest.approx(0.5)
+    assert book.depth(30) == (pytest.approx(2 * 100.0), pytest.approx(1 * 100.0))  # not a band: computed
+
+
+def test_manager_resyncs_from_rest_after_a_gap():
+    exchange = ReferenceExchange()
+
+    class MockDepth:
+        def __init__(self):
+            self.snapshot_id = None
+            self.requests = []
+
+        async def depth(self, request):
+            self.requests.append(dict(request.query))
+            return web.json_response(exchange.history[self.snapshot_id])
+
+    async def wait_synced(book, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not book.synced:
+            assert time.monotonic() < deadline, "book never resynced"
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        mock = MockDepth()
+        app = web.Application()
+        app.router.add_get("/api/v3/depth", mock.depth)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        binance = BinanceManager()
+        binance.exchange_info = ExchangeInfoCache("")
+        binance.base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        manager = OrderBookManager(binance, limit=100)
+        try:
+            events = [exchange.event() for _ in range(5)]
+            mock.snapshot_id = events[1]["u"]
+            for event in events:
+                manager.on_event(event)
+            book = manager.books["BTCUSDT"]
+            await wait_synced(book)
+            for _ in range(20):
+                manager.on_event(exchange.event())
+            exchange.event()  # lost during a reconnect
+            after_gap = [exchange.event() for _ in range(3)]
+            mock.snapshot_id = after_gap[0]["u"]
+            for event in after_gap:
+                manager.on_event(event)
+            assert not book.synced
+            await wait_synced(book)
+            return manager, book, mock.requests
+        finally:
+            await binance.close()
+            await runner.cleanup()
+
+    manager, book, requests = asyncio.run(scenario())
+    assert requests == [{"symbol": "BTCUSDT", "limit": "100"}] * 2
+    assert book_levels(book) == expected_levels(exchange.snapshot())
+    assert manager.status() == {"books": 1, "synced": 1, "resyncs": 2, "gaps": 1, "updates": book.updates}
+    assert manager.features("BTCUSDT")["bid"] == book.best_bid()
@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import hmac
+from urllib.parse import parse_qsl
+import pytest
+from aiohttp import web
+from app.engine.order_gateway import DUPLICATE_CLIENT_ORDER_ID, OrderError, OrderGateway
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_orders_without_client_id_get_distinct_ids():
+    async def scenario():
+        gateway = OrderGateway(api_key="", api_secret="")
+        first = await gateway.submit({"symbol": "BTCUSDT", "side": "BUY", "quantity": 1, "client_order_id": None})
+        second = await gateway.submit({"symbol": "ETHUSDT", "side": "SELL", "quantity": 2, "client_order_id": ""})
+        return first, second
+
+    first, second = run(scenario())
+    assert first["clientOrderId"] != second["clientOrderId"]
+    assert first["orderId"] != second["orderId"]
+    assert second["symbol"] == "ETHUSDT"
+
+
+def test_resubmitting_a_client_id_returns_the_original_order():
+    async def scenario():
+        gateway = OrderGateway(api_key="", api_secret="")
+        order = {"symbol": "BTCUSDT", "side": "BUY", "quantity": 1, "client_order_id": "retry-1"}
+        first = await gateway.submit(dict(order))
+        again = await gateway.submit(dict(order))
+        batch = await gateway.submit_batch([dict(order), {"symbol": "BTCUSDT", "side": "SELL", "quantity": 1}])
+        return first, again, batch
+
+    first, again, batch = run(scenario())
+    assert again["orderId"] == first["orderId"]
+    assert batch[0]["orderId"] == first["orderId"]
+    assert batch[1]["orderId"] != first["orderId"]
+
+
+class MockExchange:
+    """Just enough of /fapi/v1 to check signing, duplicates and lost responses."""
+
+    def __init__(self, gateway):
+        self.gateway = gateway
+        self.orders = {}
+        self.drop_next_response = None  # "error" (503) or "timeout" for the next order
+        self.posts = 0
+
+    def app(self):
+        app = web.Application()
+        app.router.add_route("*", "/fapi/v1/{name}", self.handle)
+        return app
+
+    async def handle(self, request):
+        query = request.rel_url.raw_query_string
+        unsigned, _, signature = query.rpartition("&signature=")
+        assert hmac.new(self.gateway.api_secret.encode(), unsigned.encode(), hashlib.sha256).hexdigest() == signature
+        params = dict(parse_qsl(unsigned))
+        name = request.match_info["name"]
+        if name == "order" and request.method == "POST":
+            self.posts += 1
+            cid = params["newClientOrderId"]
+            if cid in self.orders:
+                return web.json_response({"code": DUPLICATE_CLIENT_ORDER_ID, "msg": "Duplicate"}, status=400)
+            self.orders[cid] = {"orderId": len(self.orders) + 1, "clientOrderId": cid, "status": "NEW", "symbol": params["symbol"]}
+            if self.drop_next_response == "error":
+                self.drop_next_response = None
+                return web.Response(status=503, text="Service Unavailable")
+            if self.drop_next_response == "timeout":
+                self.drop_next_response = None
+                await asyncio.sleep(1.0)
+            return web.json_response(self.orders[cid])
+        if name == "order" and request.method == "GET":
+            order = self.orders.get(params["origClientOrderId"])
+            return web.json_response(order or {"code": -2013, "msg": "Order does not exist."})
+        if name == "leverage":
+            return web.json_response({"symbol": params["symbol"], "leverage": int(params["leverage"])})
+        return web.json_response({"code": -1, "msg": "unsupported"}, status=400)
+
+
+@pytest.mark.parametrize("lose_response", [None, "error", "timeout"])
+def test_retries_against_the_exchange_never_duplicate(lose_response):
+    async def scenario():
+        gateway = OrderGateway(api_key="key", api_secret="secret", timeout=0.3)
+        exchange = MockExchange(gateway)
+        runner = web.AppRunner(exchange.app())
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        gateway.base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        exchange.drop_next_response = lose_response
+        try:
+            order = {"symbol": "BTCUSDT", "side": "BUY", "quantity": 1, "client_order_id": "cid-1"}
+            first = await gateway.submit(dict(order))
+            # A fresh gateway (e.g. after a restart) retries the same id: the exchange copy wins
+            retry_gateway = OrderGateway(api_key="key", api_secret="secret", base_url=gateway.base_url)
+            exchange.gateway = retry_gateway
+            retried = await retry_gateway.submit(dict(order))
+            await retry_gateway.close()
+            return first, retried, exchange
+        finally:
+            await gateway.close()
+            await runner.cleanup()
+
+    first, retried, exchange = run(scenario())
+    assert first["orderId"] == retried["orderId"] == 1
+    assert len(exchange.orders) == 1
+
+
+def test_rejections_carry_the_client_order_id():
+    async def scenario():
+        gateway = OrderGateway(api_key="", api_secret="")
+
+        async def reject(*args):
+            raise OrderError(-2019, "Margin is insufficient.")
+
+        gateway.simulated = False
+        gateway._request = reject
+        with pytest.raises(OrderError) as info:
+            await gateway.submit({"symbol": "BTCUSDT", "side": "BUY", "quantity": 1, "client_order_id": "cid-x"})
+        return info.value, gateway.orders["cid-x"]["status"]
+
+    error, status = run(scenario())
+    assert error.client_order_id == "cid-x"
+    assert status == "REJECTED"
+
+
+def test_short_batch_response_fails_the_missing_orders():
+    async def scenario():
+        gateway = OrderGateway(api_key="key", api_secret="secret")
+
+        async def short_reply(method, path, params):
+            return [{"orderId": 1, "clientOrderId": "a", "status": "NEW"}]  # two orders sent, one answered
+
+        gateway._request = short_reply
+        orders = [{"symbol": "BTCUSDT", "side": "BUY", "quantity": 1, "client_order_id": cid} for cid in ("a", "b")]
+        return await asyncio.wait_for(gateway.submit_batch(orders), 1.0)
+
+    first, second = run(scenario())
+    assert first["orderId"] == 1
+    assert isinstance(second, OrderError) and second.client_order_id == "b"
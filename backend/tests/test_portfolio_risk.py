@@ -0,0 +1,90 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.engine.portfolio_risk import PortfolioRiskEngine
+
+
+def test_open_and_close_keep_the_table_dense():
+    engine = PortfolioRiskEngine(capacity=2)
+    ids = [engine.open_position(f"S{i}USDT", "BUY", 1.0, 100.0 + i) for i in range(5)]  # grows past capacity
+    assert engine.n == 5 and engine.capacity >= 5
+    assert engine.close_position(ids[1]) and not engine.close_position(ids[1])
+    assert engine.n == 4 and engine.position(ids[1]) is None
+    # the last row moved into the freed slot and is still addressable by id
+    assert engine.position(ids[4])["entry_price"] == 104.0
+    engine.on_tick({f"S{i}USDT": 100.0 + i for i in range(5)})
+    assert sorted(p["id"] for p in engine.summary()["positions"]) == [ids[0], ids[2], ids[3], ids[4]]
+
+
+def test_long_stop_is_hit():
+    engine = PortfolioRiskEngine()
+    pid = engine.open_position("XUSDT", "BUY", 2.0, 100.0)
+    assert engine.position(pid)["stop_loss"] == pytest.approx(98.5)
+    assert engine.on_tick({"XUSDT": 99.0}) == []
+    assert engine.on_tick({"XUSDT": 98.4}) == [(pid, "EXIT_STOP_LOSS")]
+    assert engine.position(pid)["pnl"] == pytest.approx(-3.2)
+
+
+def test_short_trailing_stop_is_hit():
+    engine = PortfolioRiskEngine()
+    pid = engine.open_position("XUSDT", "SELL", 1.0, 100.0, take_profit=50.0)
+    assert engine.on_tick({"XUSDT": 97.0}, {"XUSDT": "BEARISH"}) == []
+    # 3% in profit with the trend: trail 1% above the mark, and never loosen again
+    assert engine.position(pid)["stop_loss"] == pytest.approx(97.97)
+    assert engine.on_tick({"XUSDT": 97.5}, {"XUSDT": "SIDEWAYS"}) == []
+    assert engine.position(pid)["stop_loss"] == pytest.approx(97.97)
+    assert engine.on_tick({"XUSDT": 98.0}) == [(pid, "EXIT_STOP_LOSS")]
+
+
+def test_take_profit_and_exposure():
+    engine = PortfolioRiskEngine()
+    long_id = engine.open_position("XUSDT", "BUY", 1.0, 100.0, leverage=10)
+    engine.open_position("XUSDT", "SELL", 3.0, 100.0, stop_loss=110.0)
+    assert engine.on_tick({"XUSDT": 103.0}) == [(long_id, "EXIT_TAKE_PROFIT")]
+    engine.mark_closing([long_id])
+    assert engine.on_tick({"XUSDT": 103.5}) == []  # in flight: not re-triggered
+    assert engine.exposure()["XUSDT"] == {"net": pytest.approx(-207.0), "gross": pytest.approx(414.0)}
+    assert engine.position(long_id)["liquidation"] == pytest.approx(100.0 * (1 - (0.1 - 0.004)))
+
+
+def test_user_stop_is_not_moved_by_the_default_distance():
+    engine = PortfolioRiskEngine()
+    pid = engine.open_position("XUSDT", "BUY", 1.0, 100.0, stop_loss=90.0)
+    assert engine.on_tick({"XUSDT": 99.0}) == []
+    assert engine.position(pid)["stop_loss"] == 90.0
+    assert engine.on_tick({"XUSDT": 95.0}) == []  # 98.5 would have closed it here
+    # the dynamic rules may still tighten it once the position is in profit
+    engine.on_tick({"XUSDT": 101.5})
+    assert engine.position(pid)["stop_loss"] == pytest.approx(100.2)
+    assert engine.position(pid)["user_stop_loss"] == 90.0
+
+    short = engine.open_position("YUSDT", "SELL", 1.0, 100.0, stop_loss=110.0)
+    engine.on_tick({"YUSDT": 101.0})
+    assert engine.position(short)["stop_loss"] == 110.0
+
+
+def test_10k_positions_recompute_under_a_millisecond():
+    rng = np.random.default_rng(0)
+    engine = PortfolioRiskEngine(capacity=16384)
+    symbols = [f"S{i}USDT" for i in range(100)]
+    base = rng.uniform(1, 1000, 100)
+    for i in range(10_000):
+        s = i % 100
+        engine.open_position(symbols[s], "BUY" if i % 2 else "SELL", 1.0, base[s] * rng.uniform(0.995, 1.005),
+                             leverage=10)
+    trends = {s: ["BULLISH", "BEARISH", "SIDEWAYS"][i % 3] for i, s in enumerate(symbols)}
+    ticks = [{s: float(p) for s, p in zip(symbols, base * (1 + 0.01 * np.sin(k / 50 + np.arange(100))))}
+             for k in range(300)]
+
+    p99s = []
+    for _ in range(3):  # best of 3 passes: one shared core is noisy
+        timings = []
+        for prices in ticks:
+            started = time.perf_counter()
+            exits = engine.on_tick(prices, trends)
+            timings.append(time.perf_counter() - started)
+            engine.mark_closing([pid for pid, _ in exits])  # as the producer does while the exit order is out
+        p99s.append(np.percentile(timings, 99) * 1000)
+    assert min(p99s) < 1.0, f"on_tick p99 {p99s} ms"
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from app import bench
+from app.engine.protocol import DeltaEncoder, msgpack, orjson
+
+
+def apply_frame(state, frame):
+    """What a v2 client does with a frame."""
+    if frame["type"] == "snapshot":
+        return {symbol: dict(payload) for symbol, payload in frame["symbols"].items()}
+    for symbol, diff in frame["symbols"].items():
+        state.setdefault(symbol, {}).update(diff)
+    for symbol, fields in frame.get("removed", {}).items():
+        for field in fields:
+            state[symbol].pop(field, None)
+    return state
+
+
+def test_timestamp_alone_is_not_a_change():
+    encoder = DeltaEncoder(snapshot_every=100)
+    encoder.build_frame({"BTCUSDT": {"price": 1.0, "timestamp": "t0"}})
+    assert encoder.build_frame({"BTCUSDT": {"price": 1.0, "timestamp": "t1"}}) is None
+
+    frame = encoder.build_frame({"BTCUSDT": {"price": 2.0, "timestamp": "t2"}})
+    assert frame["symbols"] == {"BTCUSDT": {"price": 2.0, "timestamp": "t2"}}
+
+
+def test_removed_fields_are_sent():
+    encoder = DeltaEncoder(snapshot_every=100)
+    encoder.build_frame({"BTCUSDT": {"price": 1.0, "harmonic": {"pattern": "BULLISH_BAT"}}})
+    frame = encoder.build_frame({"BTCUSDT": {"price": 1.0}})
+    assert frame["type"] == "delta"
+    assert frame["symbols"] == {}
+    assert frame["removed"] == {"BTCUSDT": ["harmonic"]}
+    # a field set to None is a change, not a removal
+    frame = encoder.build_frame({"BTCUSDT": {"price": 1.0, "whale_alert": None}})
+    assert frame["symbols"] == {"BTCUSDT": {"whale_alert": None}} and "removed" not in frame
+
+
+def test_client_state_follows_the_server():
+    ticks = bench.protocol_ticks(n_symbols=20, n_ticks=60)
+    for n, tick in enumerate(ticks):
+        if n % 7 == 3:
+            for payload in tick.values():
+                payload["harmonic"] = {"pattern": "BEARISH_CRAB"}  # appears now and then
+    encoder = DeltaEncoder(snapshot_every=25)
+    state = {}
+    for tick in ticks:
+        frame = encoder.build_frame(tick)
+        if frame is None:
+            continue
+        state = apply_frame(state, frame)
+        volatile_free = {s: {k: v for k, v in p.items() if k != "timestamp"} for s, p in state.items()}
+        assert volatile_free == {s: {k: v for k, v in p.items() if k != "timestamp"} for s, p in tick.items()}
+    assert encoder.seq > 0
+
+
+@pytest.mark.parametrize("encoding, module, loads", [
+    ("json", json, json.loads),
+    ("orjson", orjson, lambda data: orjson.loads(data)),
+    ("msgpack", msgpack, lambda data: msgpack.unpackb(data, raw=False)),
+])
+def test_encodings_round_trip(encoding, module, loads):
+    if module is None:
+        pytest.skip(f"{encoding} is not installed")
+    encoder = DeltaEncoder(encoding)
+    frame = encoder.build_frame(bench.protocol_ticks(n_symbols=3, n_ticks=1)[0], news=[{"title": "x"}])
+    data, is_binary = encoder.encode(frame)
+    assert is_binary == (encoding != "json")
+    assert loads(data) == frame
+
+
+def test_v2_sends_far_fewer_bytes_than_v1():
+    results = bench.protocol_bench(n_symbols=50, n_ticks=60)
+    v1 = results["v1_json"]["bytes"]
+    for name, result in results.items():
+        if name != "v1_json":
+            assert result["bytes"] < v1 / 3, results
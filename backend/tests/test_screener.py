@@ -0,0 +1,94 @@
+import json
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.engine.market_hub import MarketHub
+from app.engine.screener import SCREENER_METRICS, MarketScreener
+
+
+def random_row(rng):
+    row = {metric: rng.uniform(-50, 150) for metric in SCREENER_METRICS}
+    if rng.random() < 0.1:
+        row["volume"] = None  # missing values drop out of that index
+    row["signal"] = rng.choice(["BUY", "SELL", "HOLD"])
+    row["trend"] = rng.choice(["BULLISH", "BEARISH", "SIDEWAYS"])
+    return row
+
+
+def brute_force(rows, metric, k, order, filters):
+    matching = [
+        (row[metric], symbol) for symbol, row in rows.items()
+        if row.get(metric) is not None and MarketScreener._matches(row, filters)
+    ]
+    matching.sort(reverse=order == "desc")
+    return [symbol for _, symbol in matching[:k]]
+
+
+def test_incremental_indexes_match_a_full_sort():
+    rng = random.Random(5)
+    screener = MarketScreener()
+    rows = {}
+    for tick in range(30):
+        updates = {f"S{i}USDT": random_row(rng) for i in rng.sample(range(200), 60)}
+        screener.update_many(updates)
+        rows.update(updates)
+        if tick % 10 == 9:
+            gone = rng.choice(sorted(rows))
+            screener.remove(gone)
+            del rows[gone]
+        for metric in SCREENER_METRICS:
+            for order in ("asc", "desc"):
+                for filters in ({}, {"signal": "BUY"}, {"min_rsi": 30.0, "max_rsi": 70.0}):
+                    got = [r["symbol"] for r in screener.query(metric, 7, order, filters)]
+                    assert got == brute_force(rows, metric, 7, order, filters)
+
+
+@pytest.mark.parametrize("k, order", [(0, "desc"), (-3, "desc"), (5, "sideways")])
+def test_invalid_queries_are_rejected(k, order):
+    screener = MarketScreener()
+    screener.update("BTCUSDT", {"confidence": 80.0})
+    with pytest.raises(ValueError):
+        screener.query("confidence", k, order)
+
+
+def test_rest_query_reports_errors(monkeypatch):
+    screener = MarketScreener()
+    screener.update("BTCUSDT", {"confidence": 80.0, "signal": "BUY"})
+    monkeypatch.setattr(main, "screener", screener)
+    client = TestClient(main.app)
+    assert client.get("/api/screener?k=0").json()["status"] == "ERROR"
+    assert client.get("/api/screener?metric=nope").json()["status"] == "ERROR"
+    assert client.get("/api/screener?signal=buy").json()["results"][0]["symbol"] == "BTCUSDT"
+
+
+@pytest.fixture
+def screener_app(monkeypatch):
+    screener = MarketScreener()
+    screener.update_many({
+        "BTCUSDT": {"confidence": 80.0, "signal": "BUY"},
+        "ETHUSDT": {"confidence": 60.0, "signal": "SELL"},
+    })
+    hub = MarketHub()
+    hub.publish({"BTCUSDT": {}, "ETHUSDT": {}})  # new subscribers get this tick right away
+    monkeypatch.setattr(main, "screener", screener)
+    monkeypatch.setattr(main, "market_hub", hub)
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("url", ["/ws/screener?k=abc", "/ws/screener?k=0", "/ws/screener?metric=nope"])
+def test_ws_rejects_an_invalid_url_query(screener_app, url):
+    with screener_app.websocket_connect(url) as ws:
+        assert ws.receive_json()["type"] == "error"
+
+
+def test_ws_replies_to_bad_messages_and_keeps_the_query(screener_app):
+    with screener_app.websocket_connect("/ws/screener?k=1") as ws:
+        frame = ws.receive_json()
+        assert frame["type"] == "screener" and [r["symbol"] for r in frame["results"]] == ["BTCUSDT"]
+        for message in ("not json", json.dumps([1, 2]), json.dumps({"k": 0}), json.dumps({"k": "many"}),
+                        json.dumps({"filters": "BUY"}), json.dumps({"metric": "nope"})):
+            ws.send_text(message)
+            assert ws.receive_json()["type"] == "error"
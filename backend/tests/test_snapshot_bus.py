@@ -0,0 +1,148 @@
+import asyncio
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from app import bench, main
+from app.engine.portfolio_risk import PortfolioRiskEngine
+from app.engine.snapshot_bus import SnapshotPublisher, SnapshotSubscriber
+
+
+@pytest.fixture
+def bus_name():
+    return f"test_bus_{os.getpid()}_{time.monotonic_ns()}"
+
+
+def test_subscriber_reads_latest_message_once(bus_name):
+    publisher = SnapshotPublisher(bus_name, size=64 * 1024)
+    subscriber = SnapshotSubscriber(bus_name)
+    try:
+        assert subscriber.poll() is None
+        publisher.publish({"seq": 1})
+        publisher.publish({"seq": 2})
+        assert subscriber.poll() == {"seq": 2}
+        assert subscriber.poll() is None
+    finally:
+        subscriber.close()
+        publisher.close()
+
+
+def test_subscriber_reattaches_to_a_restarted_publisher(bus_name):
+    first = SnapshotPublisher(bus_name, size=64 * 1024)
+    subscriber = SnapshotSubscriber(bus_name, stale_after=0.05)
+    try:
+        for i in range(5):
+            first.publish({"from": "first", "i": i})
+        assert subscriber.poll() == {"from": "first", "i": 4}
+        first.close()
+
+        # the restarted ingest process has a new segment with a sequence starting over
+        second = SnapshotPublisher(bus_name, size=64 * 1024)
+        try:
+            second.publish({"from": "second", "i": 0})
+            time.sleep(0.1)
+            assert subscriber.poll() is None  # the old mapping stopped advancing: detach
+            assert subscriber.poll() == {"from": "second", "i": 0}
+            assert subscriber.reattaches == 2
+        finally:
+            second.close()
+    finally:
+        subscriber.close()
+
+
+def test_subscriber_follows_a_renamed_segment(bus_name):
+    a = SnapshotPublisher(bus_name + "_a", size=64 * 1024)
+    b = SnapshotPublisher(bus_name + "_b", size=64 * 1024)
+    subscriber = SnapshotSubscriber(bus_name + "_a")
+    try:
+        a.publish({"bus": "a"})
+        b.publish({"bus": "b"})
+        assert subscriber.poll() == {"bus": "a"}
+        subscriber.name = bus_name + "_b"
+        assert subscriber.poll() == {"bus": "b"}
+    finally:
+        subscriber.close()
+        a.close()
+        b.close()
+
+
+def test_bus_ticks_check_worker_positions(monkeypatch):
+    portfolio = PortfolioRiskEngine(main.risk_mgr)
+    monkeypatch.setattr(main, "portfolio", portfolio)
+    pid = portfolio.open_position("BUSUSDT", "BUY", 1.0, 100.0, take_profit=105.0)
+    # the fields screen_tick and check_positions read from a bus tick
+    tick = {"BUSUSDT": {
+        "current_price": 106.0,
+        "rsi": 60.0,
+        "trend": "BULLISH",
+        "ai_prediction": {"confidence_score": 88.0, "signal": "BUY"},
+    }}
+
+    async def run():
+        main.publish_from_bus({"tick": tick, "news": main.news_fetcher.state()})
+        await asyncio.sleep(0.05)  # the reduce-only exit runs as a task
+
+    asyncio.run(run())
+    assert portfolio.position(pid) is None
+    assert main.order_gateway.orders[f"exit-{pid}"]["request"]["reduce_only"] is True
+
+
+def bus_messages(n):
+    """What the ingest process publishes: dashboard-shaped ticks plus the news cache."""
+    news = {"version": 3, "fetched_at": 1_700_000_000.0, "articles": [{"title": "BTC bullish", "symbols": ["BTC"]}]}
+    return [{"seq": i, "tick": tick, "news": news} for i, tick in enumerate(bench.protocol_ticks(n_symbols=100, n_ticks=n))]
+
+
+def _read_until_last(name, last_seq, results):
+    subscriber = SnapshotSubscriber(name)
+    seen = []
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline and (not seen or seen[-1]["seq"] != last_seq):
+        try:
+            message = subscriber.poll()
+        except FileNotFoundError:
+            message = None
+        if message is None:
+            time.sleep(0.0005)
+        else:
+            seen.append(message)
+    subscriber.close()
+    results.put(seen)
+
+
+def test_worker_processes_read_exactly_what_was_published(bus_name):
+    expected = bus_messages(60)
+    publisher = SnapshotPublisher(bus_name, size=1024 * 1024)
+    results = multiprocessing.Queue()
+    readers = [multiprocessing.Process(target=_read_until_last, args=(bus_name, len(expected) - 1, results))
+               for _ in range(2)]
+    try:
+        for reader in readers:
+            reader.start()
+        for message in expected:
+            publisher.publish(message)
+            time.sleep(0.005)
+        seen = [results.get(timeout=30) for _ in readers]
+        for reader in readers:
+            reader.join()
+    finally:
+        publisher.close()
+    for messages in seen:
+        # the bus keeps only the latest message, so a reader may skip some, never tear or reorder them
+        assert messages and messages[-1] == expected[-1]
+        seqs = [m["seq"] for m in messages]
+        assert seqs == sorted(set(seqs))
+        assert all(m == expected[m["seq"]] for m in messages)
+
+
+def test_bus_fan_out_across_worker_processes():
+    results = {workers: bench.bus_throughput(workers, clients=400, seconds=1.0, rate=300) for workers in (1, 2)}
+    for result in results.values():
+        assert result["torn_reads"] == 0
+        assert result["min_seen"] > 0
+    if (os.cpu_count() or 1) < 3:
+        pytest.skip(f"worker scaling needs spare cores (have {os.cpu_count()}): {results}")
+    # each worker is CPU bound on its clients, so a second worker on a free core adds capacity
+    assert results[2]["deliveries_per_sec"] > 1.5 * results[1]["deliveries_per_sec"]
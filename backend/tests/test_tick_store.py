@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+
+from app.engine.tick_store import TICK_DTYPE, TickStore
+
+
+def ticks(first_ts, n):
+    records = np.zeros(n, dtype=TICK_DTYPE)
+    records["ts"] = first_ts + np.arange(n) * 1000
+    records["close"] = 100.0 + np.arange(n)
+    records["high"] = records["close"] + 1
+    records["low"] = records["close"] - 1
+    return records
+
+
+def test_round_trip_through_buffered_ticks(tmp_path):
+    store = TickStore(str(tmp_path))
+    for i in range(5):
+        store.record("BTCUSDT", 1000 * i, 100.0 + i)
+    store.flush()
+    data = TickStore(str(tmp_path)).read("BTCUSDT")  # a fresh store reads it back from disk
+    assert data["ts"].tolist() == [0, 1000, 2000, 3000, 4000]
+    assert data["close"].tolist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+    assert data["high"][0] == 100.0 * 1.002 and data["low"][0] == 100.0 * 0.998
+    assert store.symbols() == ["BTCUSDT"]
+
+
+def test_segments_roll_over_and_ranges_span_them(tmp_path):
+    store = TickStore(str(tmp_path), segment_records=4)
+    store.append("BTCUSDT", ticks(0, 6))
+    store.append("BTCUSDT", ticks(6000, 5))
+    assert [s["file"] for s in store.index["BTCUSDT"]] == ["seg_0.bin", "seg_4000.bin", "seg_8000.bin"]
+    assert TickStore(str(tmp_path)).read("BTCUSDT")["ts"].tolist() == list(range(0, 11000, 1000))
+    assert store.read("BTCUSDT", 3000, 9000)["ts"].tolist() == [3000, 4000, 5000, 6000, 7000, 8000]
+    assert store.read("BTCUSDT", 5000, 6000)["ts"].tolist() == [5000]  # inside one segment
+    assert store.tail("BTCUSDT", 6)["ts"].tolist() == [5000, 6000, 7000, 8000, 9000, 10000]
+
+
+def test_torn_tail_is_cut_before_the_next_append(tmp_path):
+    store = TickStore(str(tmp_path))
+    store.append("BTCUSDT", ticks(0, 3))
+    path = os.path.join(str(tmp_path), "BTCUSDT", "seg_0.bin")
+    with open(path, "ab") as f:
+        f.write(ticks(3000, 1).tobytes()[:13])  # the process died mid-record
+
+    reopened = TickStore(str(tmp_path))
+    assert reopened.read("BTCUSDT")["ts"].tolist() == [0, 1000, 2000]
+    reopened.append("BTCUSDT", ticks(3000, 2))
+    data = reopened.read("BTCUSDT")
+    assert data["ts"].tolist() == [0, 1000, 2000, 3000, 4000]
+    assert data["close"].tolist() == [100.0, 101.0, 102.0, 100.0, 101.0]
+    assert os.path.getsize(path) == 5 * TICK_DTYPE.itemsize
@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from app.engine.whale_detector import AggTradeStreamClient, LogHistogramSketch, WhaleDetector, replay_trades
+
+START_MS = 1_700_000_000_000
+
+
+def agg_trade(symbol, price, qty, ts_ms, buyer_is_maker):
+    return {"stream": f"{symbol.lower()}@aggTrade", "data": {
+        "e": "aggTrade", "E": ts_ms, "s": symbol, "a": ts_ms, "p": f"{price:.8f}", "q": f"{qty:.8f}",
+        "f": 1, "l": 1, "T": ts_ms, "m": buyer_is_maker, "M": True,
+    }}
+
+
+@pytest.fixture
+def trade_file(tmp_path):
+    """Two symbols of log-normal trade sizes with a few hand-placed whales after warm-up."""
+    rng = np.random.default_rng(11)
+    whales = set()
+    path = tmp_path / "trades.jsonl"
+    with open(path, "w") as f:
+        for n in range(6000):
+            symbol, price = ("BTCUSDT", 50_000.0) if n % 2 == 0 else ("ETHUSDT", 2_500.0)
+            notional = float(rng.lognormal(np.log(2_000.0), 1.0))
+            if n >= 2000 and n % 997 == 0:
+                notional = 5_000_000.0
+                whales.add(n)
+            f.write(json.dumps(agg_trade(symbol, price, notional / price, START_MS + n * 10, n % 3 == 0)) + "\n")
+    return str(path), whales
+
+
+def test_sketch_quantiles_stay_within_a_bucket():
+    values = np.random.default_rng(3).lognormal(np.log(1_000.0), 1.5, 50_000)
+    sketch = LogHistogramSketch(per_decade=50)
+    for value in values:
+        sketch.add(value)
+    bucket = 10 ** (1 / 50)
+    for q in (0.5, 0.9, 0.99, 0.999):
+        exact = np.quantile(values, q)
+        assert exact / bucket <= sketch.quantile(q) <= exact * bucket * bucket
+    assert LogHistogramSketch().quantile(0.5) is None
+
+
+def test_replayed_file_flags_the_whales(trade_file):
+    path, whales = trade_file
+    detector = WhaleDetector(min_notional=1_000.0)
+    alerts = detector.replay(path)
+
+    whale_times = {START_MS + n * 10 for n in whales}
+    assert whale_times <= {a["time"] for a in alerts}
+    assert len(alerts) - len(whales) <= 0.005 * detector.trades  # tail of the regular flow only
+    for symbol in ("BTCUSDT", "ETHUSDT"):
+        threshold = detector.symbols[symbol]["threshold"]
+        # 99.9th percentile of log-normal(2000, sigma=1) is ~44k
+        assert 25_000 < threshold < 80_000
+    assert detector.recent_alerts("BTCUSDT")[0]["symbol"] == "BTCUSDT"
+    assert detector.recent_alerts(limit=1) == [alerts[-1]]
+
+
+def test_async_replay_matches_the_file_replay(trade_file):
+    path, _ = trade_file
+    expected = WhaleDetector(min_notional=1_000.0)
+    expected.replay(path)
+    detector = WhaleDetector(min_notional=1_000.0)
+    asyncio.run(replay_trades(path, detector))
+    assert list(detector.alerts) == list(expected.alerts)
+    assert detector.flow("BTCUSDT") == expected.flow("BTCUSDT")
+
+
+def test_threshold_never_drops_below_the_floor():
+    detector = WhaleDetector(min_notional=50_000.0, min_trades=100)
+    for n in range(200):
+        detector.add_trade("XUSDT", 1.0, 100.0, START_MS + n, False)
+    assert detector.symbols["XUSDT"]["threshold"] == 50_000.0
+    assert detector.add_trade("XUSDT", 1.0, 49_000.0, START_MS + 200, False) is None
+    assert detector.add_trade("XUSDT", 1.0, 60_000.0, START_MS + 201, True)["side"] == "SELL"
+
+
+def test_flow_windows_and_alert_ttl_follow_trade_time():
+    detector = WhaleDetector(min_notional=1_000.0, min_trades=1, flow_window=60, alert_ttl=30.0)
+    detector.trade_clock = True
+    detector.add_trade("XUSDT", 10.0, 10.0, START_MS, False)  # 100 bought: threshold sits at the floor
+    detector.add_trade("XUSDT", 10.0, 200.0, START_MS, False)  # 2000 bought, raises the alert
+    detector.add_trade("XUSDT", 10.0, 50.0, START_MS + 20_000, True)  # 500 sold
+    assert detector.flow("XUSDT") == {"buy_usdt": 2_100.0, "sell_usdt": 500.0, "net_usdt": 1_600.0}
+    assert detector.flow("XUSDT", window=10) == {"buy_usdt": 0.0, "sell_usdt": 500.0, "net_usdt": -500.0}
+    assert detector.whale_alert("XUSDT")["active"] and detector.whale_alert("XUSDT")["side"] == "BUY"
+
+    detector.add_trade("YUSDT", 1.0, 1.0, START_MS + 70_000, False)  # only moves the clock
+    assert not detector.whale_alert("XUSDT")["active"]
+    assert detector.flow("XUSDT") == {"buy_usdt": 0.0, "sell_usdt": 500.0, "net_usdt": -500.0}
+    assert detector.flow("NOPEUSDT")["net_usdt"] == 0.0
+
+
+def test_sketch_decays_on_trade_time():
+    detector = WhaleDetector(min_notional=1.0, min_trades=1, refresh_every=1, halflife=3600.0)
+    detector.trade_clock = True
+    detector.add_trade("XUSDT", 1.0, 100.0, START_MS, False)
+    detector.add_trade("XUSDT", 1.0, 100.0, START_MS + 3_600_000, False)  # an hour later in the replay
+    assert detector.symbols["XUSDT"]["sketch"].total == pytest.approx(1.0)  # both counts halved once
+
+
+def test_stream_client_feeds_the_detector_and_records_frames(tmp_path):
+    record = tmp_path / "recorded.jsonl"
+    detector = WhaleDetector(min_notional=1_000.0, min_trades=1)
+    client = AggTradeStreamClient(["BTCUSDT", "ETHUSDT"], detector, record_path=str(record), url="ws://unused/?streams=")
+    assert client.url == "ws://unused/?streams=btcusdt@aggTrade/ethusdt@aggTrade"
+    frames = [json.dumps(agg_trade("BTCUSDT", 50_000.0, 0.1 * (n + 1), START_MS + n, False)) for n in range(5)]
+    for frame in frames:
+        client.handle_message(frame)
+    client.handle_message(json.dumps({"stream": "btcusdt@trade", "data": {"e": "trade"}}))
+    asyncio.run(client.stop())
+
+    assert detector.trades == 5 and len(client.latencies) == 5
+    replayed = WhaleDetector(min_notional=1_000.0, min_trades=1)
+    replayed.replay(str(record))
+    assert replayed.trades == 5 and list(replayed.alerts) == list(detector.alerts)